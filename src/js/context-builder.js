@@ -4,6 +4,10 @@
  * 根据游戏状态和行动上下文构建 LLM 消息
  */
 
+import { buildSpeechSummary } from "./speech-index.js";
+import { buildRoleSummary } from "./role-solver.js";
+import { normalizeRole } from "./roles.js";
+
 /**
  * 构建 LLM 消息上下文
  * @param gameStatus - 游戏状态
@@ -77,25 +81,23 @@ function buildSystemPrompt(gameStatus, actionContext, task = null) {
   // 存活玩家列表
   prompt += `存活玩家编号：${alivePlayerIndexes.join(", ")}\n\n`;
 
-  // 角色特殊信息（兼容大小写）
-  const myRoleLower = String(myRole).toLowerCase();
-  if (myRoleLower === "witch" || myRole === "WITCH") {
+  // 角色特殊信息（兼容大小写和中文名）
+  const role = normalizeRole(myRole);
+  if (role === "WITCH") {
     const hasHeal = gameStatus.myHasHealPotion ? "有" : "无";
     const hasPoison = gameStatus.myHasPoisonPotion ? "有" : "无";
     prompt += `女巫药水状态：解药${hasHeal}，毒药${hasPoison}\n\n`;
   }
 
-  // 狼人队友信息（兼容大小写）
-  if (myRoleLower === "werewolf" || myRole === "WEREWOLF") {
+  // 狼人队友信息
+  if (role === "WEREWOLF") {
     const teammates = players
-      .filter((p) => {
-        const role = String(p.role || "").toLowerCase();
-        return (
-          (role === "werewolf" || p.role === "WEREWOLF") &&
+      .filter(
+        (p) =>
+          normalizeRole(p.role) === "WEREWOLF" &&
           p.playerIndex !== myPlayerIndex &&
           p.isAlive
-        );
-      })
+      )
       .map((p) => p.playerIndex);
     if (teammates.length > 0) {
       prompt += `你的狼人队友：${teammates.join(", ")} 号玩家\n\n`;
@@ -106,7 +108,7 @@ function buildSystemPrompt(gameStatus, actionContext, task = null) {
 }
 
 /**
- * 构建历史消息内容
+ * 构建历史消息内容（末尾附发言要点摘要和身份推算）
  */
 function buildHistoryContent(gameStatus) {
   const { history } = gameStatus;
@@ -127,6 +129,9 @@ function buildHistoryContent(gameStatus) {
     content += `[${time}] ${dayInfo} ${phaseInfo} ${playerInfo}: ${msg.content}\n`;
   }
 
+  content += buildSpeechSummary(history);
+  content += buildRoleSummary(gameStatus);
+
   return content;
 }
 
@@ -163,8 +168,7 @@ function buildActionPrompt(gameStatus, actionContext, task = null) {
     }
     // 沉默村民任务：村民不能发言
     if (task.type === "silent_villager" && actionType === "speech") {
-      const myRoleLower = String(gameStatus.myRole).toLowerCase();
-      if (myRoleLower === "villager" || gameStatus.myRole === "VILLAGER") {
+      if (normalizeRole(gameStatus.myRole) === "VILLAGER") {
         prompt += `⚠️ 任务提醒：${task.description}。你不能发言，请返回空内容！\n\n`;
       }
     }
@@ -198,7 +202,7 @@ function buildActionPrompt(gameStatus, actionContext, task = null) {
       break;
   }
 
-  prompt += `\n请根据以上信息做出决策，并严格按照以下格式回复：\n`;
+  prompt += `\n请根据以上信息做出决策，并严格按照以下 JSON 格式回复（只输出 JSON，不要输出分析过程）：\n`;
   prompt += getActionFormat(actionType);
 
   return prompt;
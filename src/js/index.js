@@ -7,7 +7,7 @@ const PLAYER_INDEX = process.env.WEREWOLF_PLAYER_INDEX;
 const PLAYER_ROLE = process.env.WEREWOLF_PLAYER_ROLE;
 const GAME_TOKEN = process.env.WEREWOLF_GAME_TOKEN;
 const API_BASE_URL = process.env.WEREWOLF_API_BASE_URL;
-const POLL_INTERVAL = 2000;
+const POLL_INTERVAL = Number(process.env.WEREWOLF_POLL_INTERVAL || 2000);
 
 // 任务信息(可能不存在任务，所以需要判断)
 const TASK_TYPE = process.env.PLAYER_TASK_TYPE;
@@ -18,7 +18,9 @@ const TASK_REWARD = process.env.PLAYER_TASK_REWARD;
 // 模型调用的Key（DeepSeek）
 const MODEL_KEY = process.env.DEEPSEEK_KEY; // DeepSeek API Key
 const MODEL_NAME = "deepseek-v3"; // DeepSeek 模型名
+// LLM_API_URL 可指向其他 OpenAI 兼容服务（例如 conformance.py 启动的本地替身）
 const DEEPSEEK_API_URL =
+  process.env.LLM_API_URL ||
   "https://ep-llm-test.zhenguanyu.com/gateway-cn-test/openai-compatible/v1/chat/completions";
 
 // 构建任务信息（如果有）
@@ -0,0 +1,293 @@
+/**
+ * 身份推算
+ *
+ * 枚举 6 人局全部 180 种身份分配（位掩码），按已知硬事实过滤，得到每个玩家是狼人的精确概率。
+ * 配置了胜负规则时再用“游戏还在进行”缩小可能（规则只是假设，默认不用）。
+ * 与 Python 版 role_solver.py 保持一致（提示词中的摘要逐字相同）。
+ */
+
+import { normalizeRole } from "./roles.js";
+
+// 人数 -> [狼人数, 预言家数, 女巫数]，其余为村民
+const ROLE_COUNTS = { 6: [2, 1, 1] };
+// 可选的胜负规则：side 屠边，parity 狼人数不少于好人数时狼人胜
+export const WIN_RULES = ["side", "parity"];
+const PHASES = new Set([
+  "game_setting",
+  "night",
+  "day_speech",
+  "day_vote",
+  "pk_speech",
+  "pk_vote",
+  "game_over",
+]);
+
+function* combinations(items, k, start = 0, picked = []) {
+  if (picked.length === k) {
+    yield picked;
+    return;
+  }
+  for (let i = start; i < items.length; i++) {
+    yield* combinations(items, k, i + 1, [...picked, items[i]]);
+  }
+}
+
+const toMask = (seats) => seats.reduce((mask, s) => mask | (1 << s), 0);
+
+/**
+ * 枚举所有身份分配
+ * @returns {Array<[number, number, number]>} [狼人位掩码, 预言家位掩码, 女巫位掩码]
+ */
+export function enumerateWorlds(size, wolves, seers, witches) {
+  const seats = [...Array(size).keys()];
+  const worlds = [];
+  for (const wolfSeats of combinations(seats, wolves)) {
+    const wolf = toMask(wolfSeats);
+    const rest = seats.filter((s) => !((wolf >> s) & 1));
+    for (const seerSeats of combinations(rest, seers)) {
+      const seer = toMask(seerSeats);
+      const rest2 = rest.filter((s) => !((seer >> s) & 1));
+      for (const witchSeats of combinations(rest2, witches)) {
+        worlds.push([wolf, seer, toMask(witchSeats)]);
+      }
+    }
+  }
+  return worlds;
+}
+
+function hasRole([wolf, seer, witch], bit, role) {
+  if (role === "WEREWOLF") return Boolean(wolf & bit);
+  if (role === "SEER") return Boolean(seer & bit);
+  if (role === "WITCH") return Boolean(witch & bit);
+  return !((wolf | seer | witch) & bit);
+}
+
+const bitCount = (mask) => mask.toString(2).split("1").length - 1;
+
+/** 按胜负规则，存活玩家为 alive 时这种分配下游戏是否还在进行 */
+function gameContinues([wolf, seer, witch], alive, winRule) {
+  if (!(wolf & alive)) return false;
+  if (winRule === "side") return Boolean((seer | witch) & alive) && Boolean(~(wolf | seer | witch) & alive);
+  return bitCount(wolf & alive) < bitCount(~wolf & alive);
+}
+
+export class RoleSolver {
+  /**
+   * @param {string|null} [winRule] - 胜负规则（WIN_RULES 之一，可选）
+   */
+  constructor(winRule = null) {
+    if (winRule !== null && !WIN_RULES.includes(winRule)) {
+      throw new Error(`未知的胜负规则: ${winRule}`);
+    }
+    this.winRule = winRule;
+    this.reset();
+  }
+
+  reset() {
+    this.players = [];
+    this.playersKey = "";
+    /** @type {Map<number, number>} 玩家 -> 位 */
+    this.bits = new Map();
+    this.allMask = 0;
+    this.worlds = [];
+    this.knownRoles = new Set();
+    this.seenCount = 0;
+    this.lastId = undefined;
+    this.phase = null;
+    this.deadMask = 0;
+    // 最近一次阶段转换时已公布的死亡（之后游戏仍在进行）
+    this.settledDead = 0;
+    this.nightStartDead = 0;
+    this.nightDead = 0;
+    this.finished = false;
+    this.conflicts = 0;
+  }
+
+  get enabled() {
+    return this.worlds.length > 0;
+  }
+
+  setup(players) {
+    const indexes = players
+      .map((p) => p.playerIndex)
+      .filter((i) => i !== undefined && i !== null)
+      .sort((a, b) => a - b);
+    const key = indexes.join(",");
+    if (key === this.playersKey) return this.enabled;
+    this.reset();
+    this.players = indexes;
+    this.playersKey = key;
+    const counts = ROLE_COUNTS[indexes.length];
+    if (!counts) return false;
+    indexes.forEach((player, seat) => this.bits.set(player, 1 << seat));
+    this.allMask = (1 << indexes.length) - 1;
+    this.worlds = enumerateWorlds(indexes.length, ...counts);
+    return true;
+  }
+
+  constrain(keep) {
+    const kept = this.worlds.filter(keep);
+    if (!kept.length) {
+      this.conflicts += 1;
+      return false;
+    }
+    this.worlds = kept;
+    return true;
+  }
+
+  fixRole(player, role) {
+    const bit = this.bits.get(player);
+    const key = `${player}:${role}`;
+    if (bit === undefined || !role || this.knownRoles.has(key)) return;
+    this.knownRoles.add(key);
+    this.constrain((w) => hasRole(w, bit, role));
+  }
+
+  fixGood(player) {
+    const bit = this.bits.get(player);
+    if (bit !== undefined) this.constrain((w) => !(w[0] & bit));
+  }
+
+  markDead(player) {
+    const bit = this.bits.get(player) ?? 0;
+    this.deadMask |= bit;
+    if (bit && (this.phase === "night" || this.phase === "day_speech") && !(this.nightDead & bit)) {
+      this.nightDead |= bit;
+      // 一夜两人死亡：女巫用了毒药，夜里开始时女巫还活着
+      if (bitCount(this.nightDead) === 2) {
+        const before = this.nightStartDead;
+        this.constrain((w) => !(w[2] & before));
+      }
+    }
+  }
+
+  /**
+   * 处理新增的历史消息和可见身份
+   * @param {Object} gameStatus - 游戏状态
+   * @returns {number} 本次新处理的消息数
+   */
+  update(gameStatus) {
+    const history = gameStatus.history || [];
+    const players = gameStatus.players || [];
+    let known = this.seenCount;
+    // 历史只追加；前缀对不上时整体重建
+    if (known > history.length || (known && history[known - 1].id !== this.lastId)) {
+      this.playersKey = null;
+      known = 0;
+    }
+    if (!this.setup(players)) return 0;
+    this.fixRole(gameStatus.myPlayerIndex, normalizeRole(gameStatus.myRole));
+    for (const player of players) {
+      this.fixRole(player.playerIndex, normalizeRole(player.role));
+    }
+    if (gameStatus.status === "finished" || String(gameStatus.phase ?? "").toLowerCase() === "game_over") {
+      this.finished = true;
+    }
+    for (const msg of history.slice(known)) {
+      this.apply(msg);
+    }
+    if (history.length > known) {
+      this.seenCount = history.length;
+      this.lastId = history[history.length - 1].id;
+    }
+    // 玩家列表里的死亡状态（不依赖死亡消息的格式）
+    for (const player of players) {
+      if (!player.isAlive) this.deadMask |= this.bits.get(player.playerIndex) ?? 0;
+    }
+    return history.length - known;
+  }
+
+  apply(msg) {
+    const metadata = msg.metadata || {};
+    const metatype = String(metadata.metatype ?? "").toLowerCase();
+    const speaker = msg.playerIndex ?? null;
+    if (metatype === "phase_transition") {
+      const phase = String(metadata.toPhase ?? "").trim().toLowerCase();
+      this.phase = PHASES.has(phase) ? phase : null;
+      this.settledDead = this.deadMask;
+      if (this.phase === "night") {
+        this.nightStartDead = this.deadMask;
+        this.nightDead = 0;
+      } else if (this.phase === "game_over") {
+        this.finished = true;
+      }
+    } else if (metatype === "check" && speaker !== null) {
+      this.fixRole(speaker, "SEER");
+      if (String(metadata.result ?? "").toLowerCase() === "werewolf") {
+        this.fixRole(metadata.target, "WEREWOLF");
+      } else {
+        this.fixGood(metadata.target);
+      }
+    } else if (metatype === "kill" && speaker !== null) {
+      this.fixRole(speaker, "WEREWOLF");
+    } else if ((metatype === "heal" || metatype === "poison") && speaker !== null) {
+      this.fixRole(speaker, "WITCH");
+    } else if (metatype === "player_dead") {
+      this.markDead("playerIndex" in metadata ? metadata.playerIndex : speaker);
+    }
+  }
+
+  /** 加上“游戏还在进行”的约束后的可能（未配置胜负规则、游戏结束后或约束矛盾时不加） */
+  aliveWorlds() {
+    if (this.winRule === null || this.finished || !this.settledDead) return this.worlds;
+    const alive = this.allMask & ~this.settledDead;
+    const kept = this.worlds.filter((w) => gameContinues(w, alive, this.winRule));
+    return kept.length ? kept : this.worlds;
+  }
+
+  /**
+   * 每个玩家是狼人的可能数
+   * @returns {{counts: Map<number, number>, total: number}}
+   */
+  solve() {
+    const worlds = this.aliveWorlds();
+    const counts = new Map(this.players.map((p) => [p, 0]));
+    for (const [wolf] of worlds) {
+      for (const [player, bit] of this.bits) {
+        if (wolf & bit) counts.set(player, counts.get(player) + 1);
+      }
+    }
+    return { counts, total: worlds.length };
+  }
+
+  /**
+   * 每个玩家是狼人的精确概率
+   * @returns {Map<number, number>}
+   */
+  probabilities() {
+    if (!this.enabled) return new Map();
+    const { counts, total } = this.solve();
+    return new Map([...counts].map(([player, count]) => [player, count / total]));
+  }
+
+  /**
+   * 提示词用的简短摘要，推算未启用或概率全部相同时返回空字符串
+   * @param {number} myIndex - 我的编号（不列出）
+   * @param {Array<number>} [alive] - 存活玩家编号
+   * @returns {string}
+   */
+  summary(myIndex, alive) {
+    if (!this.enabled) return "";
+    const { counts, total } = this.solve();
+    const aliveList = alive ?? this.players.filter((p) => !(this.deadMask & this.bits.get(p)));
+    const listed = aliveList.filter((p) => p !== myIndex && counts.has(p));
+    if (new Set(listed.map((p) => counts.get(p))).size <= 1) return "";
+    // 整数运算四舍五入，与 Python 版一致
+    const parts = listed.map(
+      (p) => `${p} 号 ${Math.floor((counts.get(p) * 200 + total) / (2 * total))}%`
+    );
+    return `\n身份推算（按已知事实穷举，共 ${total} 种可能）：\n- 狼人概率：${parts.join("，")}\n`;
+  }
+}
+
+/**
+ * 构建身份推算摘要
+ * @param {Object} gameStatus - 游戏状态
+ * @param {string|null} [winRule] - 胜负规则（可选）
+ * @returns {string}
+ */
+export function buildRoleSummary(gameStatus, winRule = null) {
+  const solver = new RoleSolver(winRule);
+  solver.update(gameStatus);
+  return solver.summary(gameStatus.myPlayerIndex, gameStatus.alivePlayerIndexes || []);
+}
@@ -0,0 +1,29 @@
+/**
+ * 角色名归一化
+ *
+ * 兼容大小写和中文名，与 Python 版 game_view.Role 一致
+ */
+
+const ROLE_ALIASES = {
+  werewolf: "WEREWOLF",
+  wolf: "WEREWOLF",
+  狼人: "WEREWOLF",
+  狼: "WEREWOLF",
+  seer: "SEER",
+  预言家: "SEER",
+  witch: "WITCH",
+  女巫: "WITCH",
+  villager: "VILLAGER",
+  平民: "VILLAGER",
+  村民: "VILLAGER",
+};
+
+/**
+ * 把角色统一成大写英文，无法识别时返回 null
+ * @param {*} role - 原始角色值
+ * @returns {string|null}
+ */
+export function normalizeRole(role) {
+  if (!role) return null;
+  return ROLE_ALIASES[String(role).trim().toLowerCase()] ?? null;
+}
@@ -0,0 +1,240 @@
+/**
+ * 发言要点索引
+ *
+ * 从发言的自由文本里提取身份声明、报验人结果和指认，按消息 id 增量索引。
+ * 与 Python 版 speech_index.py 保持一致（提示词中的摘要逐字相同）。
+ */
+
+const ROLE_NAMES = {
+  预言家: "SEER",
+  女巫: "WITCH",
+  平民: "VILLAGER",
+  村民: "VILLAGER",
+  好人: "GOOD",
+};
+const ROLE_LABELS = { SEER: "预言家", WITCH: "女巫", VILLAGER: "平民", GOOD: "好人" };
+const CHECK_RESULTS = {
+  好人: "good",
+  金水: "good",
+  狼人: "werewolf",
+  狼: "werewolf",
+  查杀: "werewolf",
+};
+
+const ROLE = "预言家|女巫|平民|村民|好人";
+const NUM = String.raw`(\d+)\s*号?\s*(?:玩家)?`;
+// 第一人称声明，身份紧跟在“是 / 作为”后面；“如果我是女巫”之类的假设不算，引号里的话见 isQuoted
+const SELF_CLAIM = new RegExp(
+  String.raw`(?<!如果)(?<!假如)(?<!要是)(?<!假设)我(?:的身份)?(?:才|就|其实|确实|真的)?是(?:一?个|一名)?(?:真的?)?(` +
+    ROLE +
+    String.raw`)|我作为(?:\d+\s*号)?(?:玩家)?的?(` +
+    ROLE +
+    String.raw`)|作为\d+\s*号(?:玩家)?的?(` +
+    ROLE +
+    ")",
+  "g"
+);
+const CHECK_PATTERNS = [
+  new RegExp(
+    String.raw`(?:查验|验)了?\s*` +
+      NUM +
+      String.raw`[，,]?\s*(?:他|她|结果)?(?:是|为)?\s*(?:一?[个张匹头只名])?(好人|金水|狼人|查杀|狼)`,
+    "g"
+  ),
+  new RegExp(String.raw`给\s*` + NUM + "发?了?一?[个张]?(金水|查杀)", "g"),
+  new RegExp(NUM + "是我的?(金水|查杀)", "g"),
+  new RegExp(String.raw`(查杀)\s*` + NUM.replace(String.raw`(\d+)`, String.raw`(?<target>\d+)`), "g"),
+];
+// 报验人的主语：紧挨在报验说法前面的“我（昨晚）”，或者另一名玩家（转述别人的报验）
+const FIRST_PERSON = /我(?:昨晚|昨天晚上|昨天|今晚|首夜|第一晚|晚上|刚才|已经|也|就)*\s*$/;
+const OTHER_SUBJECT = /\d+\s*号(?:玩家)?\s*$/;
+const CLAUSE_END = /[，。！？,.!?；;\n]/g;
+// 引用别人的话：在引号里，或者紧跟在“说（：）”后面
+const QUOTE_PAIRS = [
+  ["“", "”"],
+  ["「", "」"],
+  ["『", "』"],
+  ["‘", "’"],
+];
+const REPORTED_SPEECH = /说[：:]?\s*$/;
+const ACCUSATIONS = [
+  new RegExp(
+    NUM +
+      String.raw`(?:[^，。！？,.!?\d]{0,4})(?:是|像|就是|肯定是|应该是|铁)(?:一?[个张匹头只名])?(?:狼人?|查杀)`,
+    "g"
+  ),
+  new RegExp(String.raw`(?:怀疑|投|出|票|归票给?)\s*` + NUM, "g"),
+];
+const SPEECH_METATYPES = ["say", "last_words", "speech"];
+
+/**
+ * 某个位置是不是在引用别人的话（引号里，或者紧跟在“说”后面）
+ */
+function isQuoted(content, position) {
+  const prefix = content.slice(0, position);
+  if (REPORTED_SPEECH.test(prefix)) return true;
+  if (QUOTE_PAIRS.some(([left, right]) => prefix.lastIndexOf(left) > prefix.lastIndexOf(right))) return true;
+  // 英文引号不分左右，按个数的奇偶判断
+  return prefix.split('"').length % 2 === 0 || prefix.split("'").length % 2 === 0;
+}
+
+export class SpeechIndex {
+  constructor() {
+    this.reset();
+  }
+
+  reset() {
+    // 已索引的消息数和最后一条消息 id（只用于前缀校验）
+    this.seenCount = 0;
+    this.lastId = undefined;
+    /** @type {Map<number, string>} 玩家 -> 最近一次声明的身份 */
+    this.claims = new Map();
+    this.checkReports = [];
+    this.accusations = [];
+    this.summaryCache = null;
+  }
+
+  /**
+   * 索引新增的消息
+   * @param {Array<Object>} history - 完整历史消息
+   * @returns {number} 本次新索引的消息数
+   */
+  update(history) {
+    let known = this.seenCount;
+    // 历史只追加；前缀对不上时整体重建
+    if (known > history.length || (known && history[known - 1].id !== this.lastId)) {
+      this.reset();
+      known = 0;
+    }
+    for (const msg of history.slice(known)) {
+      this.indexMessage(msg);
+    }
+    if (history.length > known) {
+      this.seenCount = history.length;
+      this.lastId = history[history.length - 1].id;
+      this.summaryCache = null;
+    }
+    return history.length - known;
+  }
+
+  indexMessage(msg) {
+    const metatype = String(msg.metadata?.metatype ?? "").toLowerCase();
+    if (!SPEECH_METATYPES.includes(metatype)) return;
+    const speaker = msg.playerIndex;
+    const content = msg.content || "";
+    if (speaker === undefined || speaker === null || !content) return;
+
+    for (const match of content.matchAll(SELF_CLAIM)) {
+      if (isQuoted(content, match.index)) continue;
+      const role = ROLE_NAMES[match[1] || match[2] || match[3]];
+      // “好人”声明不覆盖具体身份
+      if (role === "GOOD" && this.claims.has(speaker)) continue;
+      this.claims.set(speaker, role);
+    }
+
+    const reported = new Set();
+    for (const pattern of CHECK_PATTERNS) {
+      for (const match of content.matchAll(pattern)) {
+        const named = match.groups?.target;
+        const target = Number(named ?? match[1]);
+        const word = named ? match[1] : match[2];
+        if (target === speaker || reported.has(target)) continue;
+        if (pattern !== CHECK_PATTERNS[2] && !this.reportsOwnCheck(speaker, content, match.index)) continue;
+        reported.add(target);
+        const result = CHECK_RESULTS[word];
+        // 同一发言者对同一目标的同一结果只记一次
+        if (
+          !this.checkReports.some(
+            (r) => r.speaker === speaker && r.target === target && r.result === result
+          )
+        ) {
+          this.checkReports.push({ speaker, target, result, day: msg.day });
+        }
+      }
+    }
+
+    const accused = new Set();
+    for (const pattern of ACCUSATIONS) {
+      for (const match of content.matchAll(pattern)) {
+        const target = Number(match[1]);
+        if (target === speaker || accused.has(target)) continue;
+        // 已经作为查杀报过的不再重复记为指认
+        if (
+          this.checkReports.some(
+            (r) => r.speaker === speaker && r.target === target && r.result === "werewolf"
+          )
+        ) {
+          continue;
+        }
+        accused.add(target);
+        // 同一对（发言者, 目标）只记一次，day 为最近一次
+        const existing = this.accusations.find((a) => a.speaker === speaker && a.target === target);
+        if (existing) {
+          existing.day = msg.day;
+        } else {
+          this.accusations.push({ speaker, target, day: msg.day });
+        }
+      }
+    }
+  }
+
+  /**
+   * 报验说法是不是发言者自己的验人结果：主语是“我”，或者发言者声称预言家且没有转述别人
+   */
+  reportsOwnCheck(speaker, content, position) {
+    let clauseStart = 0;
+    for (const end of content.slice(0, position).matchAll(CLAUSE_END)) {
+      clauseStart = end.index + 1;
+    }
+    const prefix = content.slice(clauseStart, position);
+    if (OTHER_SUBJECT.test(prefix) || isQuoted(content, position)) return false;
+    return FIRST_PERSON.test(prefix) || this.claims.get(speaker) === "SEER";
+  }
+
+  /**
+   * 提示词用的简短摘要，没有任何要点时返回空字符串
+   * @returns {string}
+   */
+  summary() {
+    if (this.summaryCache === null) {
+      this.summaryCache = this.renderSummary();
+    }
+    return this.summaryCache;
+  }
+
+  renderSummary() {
+    const lines = [];
+    if (this.claims.size) {
+      const byRole = new Map();
+      for (const [player, role] of [...this.claims].sort((a, b) => a[0] - b[0])) {
+        if (!byRole.has(role)) byRole.set(role, []);
+        byRole.get(role).push(String(player));
+      }
+      const parts = [...byRole].map(([role, players]) => `${players.join("、")} 号${ROLE_LABELS[role]}`);
+      lines.push(`- 身份声明：${parts.join("；")}`);
+    }
+    if (this.checkReports.length) {
+      const parts = this.checkReports.map(
+        (r) => `${r.speaker} 号 → ${r.target} 号${r.result === "werewolf" ? "查杀" : "金水"}`
+      );
+      lines.push(`- 报验人：${parts.join("；")}`);
+    }
+    if (this.accusations.length) {
+      const pairs = this.accusations.map((a) => `${a.speaker}→${a.target}`);
+      lines.push(`- 指认 / 怀疑：${pairs.join("，")}`);
+    }
+    if (!lines.length) return "";
+    return "\n发言要点（自动提取，仅供参考）：\n" + lines.join("\n") + "\n";
+  }
+}
+
+/**
+ * 构建发言要点摘要
+ * @param {Array<Object>} history - 历史消息
+ * @returns {string}
+ */
+export function buildSpeechSummary(history) {
+  const index = new SpeechIndex();
+  index.update(history);
+  return index.summary();
+}
@@ -0,0 +1,365 @@
+"""
+行动解析器
+
+从 LLM 的原始输出中提取 JSON 行动对象：
+- 单遍扫描，识别花括号嵌套与字符串边界（发言内容里的括号不会干扰提取）
+- 对常见的小错误做轻量修复（尾逗号、单引号、未加引号的键、Python 字面量）
+- 按行动类型的预编译 schema 校验并规范化字段（与 context_builder.get_action_format 保持一致）
+- 发言达到 max_tokens 被截断（finish_reason 为 length）时，取出已生成的 content 作为发言；
+  没有截断但 content 里有未转义的引号时，取到最后的 "} 为止并补上转义
+"""
+import json
+import re
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# 对象内部需要关注的特殊字符：括号、引号、转义符
+_SPECIAL_CHARS = re.compile(r"[{}\"'\\]")
+# 字符串外部需要修复处理的字符
+_REPAIR_CHARS = re.compile(r"[\"',}\]]|[A-Za-z_一-鿿]")
+_BARE_WORD = re.compile(r"[A-Za-z_一-鿿][\w一-鿿-]*")
+_PYTHON_LITERALS = {"None": "null", "True": "true", "False": "false"}
+_PLAYER_NUMBER = re.compile(r"-?\d+")
+# 发言 content 的开头和整个回复最后的 "}
+_CONTENT_START = re.compile(r'"content"\s*:\s*"')
+_CONTENT_END = re.compile(r'"\s*\}')
+# content 内部没有转义的引号
+_BARE_QUOTE = re.compile(r'(?<!\\)((?:\\\\)*)"')
+_SPEECH_ACTIONS = ("speech", "last_words", "pk_speech")
+
+
+class ActionSchemaError(ValueError):
+    """行动字段不符合 schema"""
+
+
+def iter_json_spans(text: str) -> Iterator[Tuple[int, int]]:
+    """
+    单遍扫描文本，依次产出所有顶层 {...} 片段的 (start, end) 区间
+
+    对象外部的引号视为普通文字（中文发言里常见），对象内部则识别单/双引号字符串及转义，
+    因此字符串中的花括号不会打乱配对。用栈记录未闭合的 {，每个字符最多看一次，整体为线性时间；
+    未闭合的 { 直接丢弃，它内部已经闭合的对象按顶层对象产出（坏片段不会吞掉后面的合法对象）。
+
+    Args:
+        text: LLM 原始输出
+
+    Returns:
+        区间迭代器
+    """
+    opened: List[int] = []
+    # 已闭合的片段；外层闭合时弹出它内部的片段，最后剩下的就是顶层片段
+    spans: List[Tuple[int, int]] = []
+    quote = None
+    i = text.find("{")
+    if i < 0:
+        return
+    while True:
+        match = _SPECIAL_CHARS.search(text, i)
+        if not match:
+            break
+        i = match.start()
+        ch = text[i]
+        if ch == "\\":
+            i += 2
+            continue
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch == "{":
+            opened.append(i)
+        elif not opened:
+            # 对象外部：引号和 } 都是普通文字
+            pass
+        elif ch == '"' or ch == "'":
+            quote = ch
+        elif ch == "}":
+            start = opened.pop()
+            while spans and spans[-1][0] > start:
+                spans.pop()
+            spans.append((start, i + 1))
+        i += 1
+    yield from spans
+
+
+def repair_json(fragment: str) -> str:
+    """
+    对 JSON 片段做轻量修复
+
+    - 去掉 } 和 ] 之前的尾逗号
+    - 单引号字符串转换为双引号字符串
+    - 为未加引号的键补上引号
+    - None/True/False 转换为 null/true/false
+
+    Args:
+        fragment: 待修复的 JSON 片段
+
+    Returns:
+        修复后的字符串（不保证一定合法）
+    """
+    out: List[str] = []
+    i = 0
+    length = len(fragment)
+    while i < length:
+        match = _REPAIR_CHARS.search(fragment, i)
+        if not match:
+            out.append(fragment[i:])
+            break
+        j = match.start()
+        out.append(fragment[i:j])
+        ch = fragment[j]
+        if ch == '"' or ch == "'":
+            k = j + 1
+            chars: List[str] = []
+            while k < length and fragment[k] != ch:
+                if fragment[k] == "\\" and k + 1 < length:
+                    chars.append(fragment[k : k + 2])
+                    k += 2
+                    continue
+                if ch == "'" and fragment[k] == '"':
+                    chars.append('\\"')
+                elif fragment[k] == "\n":
+                    chars.append("\\n")
+                else:
+                    chars.append(fragment[k])
+                k += 1
+            body = "".join(chars)
+            if ch == "'":
+                body = body.replace("\\'", "'")
+            out.append(f'"{body}"')
+            i = k + 1
+        elif ch == ",":
+            k = j + 1
+            while k < length and fragment[k].isspace():
+                k += 1
+            if k < length and fragment[k] in "}]":
+                i = k
+            else:
+                out.append(",")
+                i = j + 1
+        elif ch == "}" or ch == "]":
+            out.append(ch)
+            i = j + 1
+        else:
+            word = _BARE_WORD.match(fragment, j).group(0)
+            k = j + len(word)
+            while k < length and fragment[k].isspace():
+                k += 1
+            if k < length and fragment[k] == ":":
+                out.append(f'"{word}"')
+            else:
+                literal = _PYTHON_LITERALS.get(word, word)
+                out.append(literal if literal in ("null", "true", "false") else f'"{word}"')
+            i = j + len(word)
+    return "".join(out)
+
+
+def loads_lenient(fragment: str) -> Optional[Any]:
+    """先按标准 JSON 解析，失败后修复再试一次，仍失败返回 None"""
+    try:
+        return json.loads(fragment)
+    except ValueError:
+        pass
+    try:
+        return json.loads(repair_json(fragment))
+    except ValueError:
+        return None
+
+
+def _coerce_player(value: Any) -> int:
+    """把 3、"3"、"3号" 之类的值转换为玩家编号"""
+    if isinstance(value, bool):
+        raise ActionSchemaError(f"无效的玩家编号: {value!r}")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        match = _PLAYER_NUMBER.search(value)
+        if match:
+            return int(match.group(0))
+    raise ActionSchemaError(f"无效的玩家编号: {value!r}")
+
+
+def _coerce_text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    return str(value)
+
+
+# 每种行动的字段定义: 字段名 -> (类型, 是否必需, 是否可为 null, 枚举值)
+# 必需字段缺失一律视为解析失败；可为 null 只表示允许显式写 null
+_SCHEMA_SPECS: Dict[str, Dict[str, Tuple[str, bool, bool, Optional[Tuple[str, ...]]]]] = {
+    "kill": {"target": ("player", True, False, None)},
+    "check": {"target": ("player", True, False, None)},
+    "witch_action": {
+        "action": ("enum", True, False, ("heal", "poison", "skip")),
+        "target": ("player", False, True, None),
+    },
+    "last_words": {"content": ("text", True, False, None)},
+    "speech": {"content": ("text", True, False, None)},
+    "vote": {"target": ("player", True, True, None)},
+    "pk_speech": {"content": ("text", True, False, None)},
+    "pk_vote": {"target": ("player", True, True, None)},
+    "skip": {},
+}
+
+
+def _compile_schema(action_type: str, spec: Dict[str, Tuple[str, bool, bool, Optional[Tuple[str, ...]]]]):
+    """把字段定义编译为一个校验 + 规范化函数"""
+    fields = []
+    for name, (kind, required, nullable, choices) in spec.items():
+        if kind == "player":
+            coerce = _coerce_player
+        elif kind == "text":
+            coerce = _coerce_text
+        else:
+
+            def coerce(value: Any, _name=name, _choices=choices) -> str:
+                text = str(value).strip().lower()
+                if text not in _choices:
+                    raise ActionSchemaError(f"{_name} 取值无效: {value!r}，可选: {'|'.join(_choices)}")
+                return text
+
+        fields.append((name, coerce, required, nullable))
+
+    def validate(parsed: Dict[str, Any]) -> Dict[str, Any]:
+        action: Dict[str, Any] = {"actionType": action_type}
+        for name, coerce, required, nullable in fields:
+            if name not in parsed:
+                # 可为 null 的必需字段（投票的 target）也必须显式写出 null 才算弃票，
+                # 缺少字段多半是解析到了模型的分析草稿，交给重问或兜底
+                if required:
+                    raise ActionSchemaError(f"缺少字段: {name}")
+                continue
+            value = parsed[name]
+            if coerce is _coerce_text:
+                # 空发言是合法的（例如寡言村民任务）
+                action[name] = coerce(value)
+                continue
+            if value is None or value == "":
+                if not nullable and required:
+                    raise ActionSchemaError(f"字段 {name} 不能为空")
+                action[name] = None
+                continue
+            action[name] = coerce(value)
+        if action_type == "witch_action":
+            if action["action"] == "poison" and action.get("target") is None:
+                raise ActionSchemaError("毒人时必须指定 target")
+            if action["action"] != "poison":
+                action.pop("target", None)
+        return action
+
+    return validate
+
+
+ACTION_VALIDATORS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    action_type: _compile_schema(action_type, spec) for action_type, spec in _SCHEMA_SPECS.items()
+}
+
+
+def validate_action_schema(parsed: Dict[str, Any], action_type: str) -> Dict[str, Any]:
+    """
+    按行动类型的 schema 校验并规范化行动对象
+
+    Args:
+        parsed: 解析出来的字典
+        action_type: 行动类型
+
+    Returns:
+        只包含 schema 字段的新行动对象
+
+    Raises:
+        ActionSchemaError: 字段缺失或取值无效
+    """
+    validator = ACTION_VALIDATORS.get(action_type)
+    if validator is None:
+        return dict(parsed, actionType=action_type)
+    return validator(parsed)
+
+
+def parse_action(text: str, expected_action_type: str, truncated: bool = False) -> Dict[str, Any]:
+    """
+    从 LLM 输出中提取、修复并校验行动
+
+    多个候选对象时，优先选择 actionType 与期望一致且通过校验的对象；
+    否则使用第一个通过校验的对象（actionType 会被改写为期望的类型）。
+
+    Args:
+        text: LLM 原始输出
+        expected_action_type: 期望的行动类型
+        truncated: 输出是否因 max_tokens 被截断（finish_reason 为 length）
+
+    Returns:
+        规范化后的行动对象
+
+    Raises:
+        ActionSchemaError: 找不到可用的行动对象
+    """
+    fallback = None
+    last_error = None
+    for start, end in iter_json_spans(text):
+        parsed = loads_lenient(text[start:end])
+        if not isinstance(parsed, dict):
+            continue
+        try:
+            action = validate_action_schema(parsed, expected_action_type)
+        except ActionSchemaError as error:
+            last_error = error
+            continue
+        if parsed.get("actionType") == expected_action_type:
+            return action
+        # 带 actionType 的候选优先于不带的（后者可能只是模型的分析草稿）
+        if fallback is None or (fallback[1] is None and "actionType" in parsed):
+            fallback = (action, parsed.get("actionType"))
+
+    if fallback is not None:
+        action, got_type = fallback
+        print(
+            f"[解析] ⚠ LLM 返回的 actionType ({got_type}) 与期望的 ({expected_action_type}) 不匹配，使用期望的类型"
+        )
+        return action
+    if last_error is not None:
+        raise last_error
+    if expected_action_type in _SPEECH_ACTIONS:
+        content = _recover_content(text, truncated)
+        if content:
+            if truncated:
+                print(f"[解析] ⚠ 发言被截断，使用已生成的 {len(content)} 字")
+            else:
+                print("[解析] ⚠ 发言 content 中有未转义的引号，已修复")
+            return validate_action_schema({"content": content}, expected_action_type)
+    raise ActionSchemaError("响应中没有找到 JSON 对象")
+
+
+def _recover_content(text: str, truncated: bool) -> Optional[str]:
+    """
+    从不合法的发言 JSON 中取出 content：截断时取到结尾，否则取到最后的 "} 为止；
+    其中没有转义的引号（模型直接引用别人的话）补上转义后再解码
+
+    Args:
+        text: LLM 原始输出
+        truncated: 输出是否被截断
+
+    Returns:
+        发言内容，取不到时返回 None
+    """
+    start = _CONTENT_START.search(text)
+    if not start:
+        return None
+    if truncated:
+        # 截断可能落在转义序列中间，去掉结尾不完整的转义
+        body = re.sub(r"\\(?:u[0-9a-fA-F]{0,3})?$", "", text[start.end() :])
+    else:
+        end = None
+        for end in _CONTENT_END.finditer(text, start.end()):
+            pass
+        if end is None:
+            return None
+        body = text[start.end() : end.start()]
+    body = _BARE_QUOTE.sub(lambda m: m.group(1) + '\\"', body)
+    try:
+        content = json.loads(f'"{body}"', strict=False)
+    except ValueError:
+        content = body
+    return content.strip() or None
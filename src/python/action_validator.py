@@ -0,0 +1,143 @@
+"""
+行动校验器
+
+在提交前按 actionContext 校验行动是否合法，避免把非法目标发给服务器白白消耗
+每秒 1 次的请求额度和本回合的截止时间
+"""
+from typing import Dict, Any, List, Optional, Union
+
+try:
+    from .fallback_strategy import decide_fallback_action
+    from .game_view import GameView, ActionContextView, as_view, as_context
+except ImportError:
+    from fallback_strategy import decide_fallback_action
+    from game_view import GameView, ActionContextView, as_view, as_context
+
+
+def validate_action(action: Dict[str, Any], action_context: Union[ActionContextView, Dict[str, Any]]) -> List[str]:
+    """
+    校验行动是否符合当前行动上下文
+
+    Args:
+        action: 待提交的行动
+        action_context: 行动上下文（ActionContextView 或原始字典）
+
+    Returns:
+        错误描述列表，为空表示合法
+    """
+    context = as_context(action_context)
+    errors = []
+    expected_type = context.action_type
+    action_type = action.get("actionType")
+    if action_type != expected_type:
+        return [f"actionType 应为 {expected_type}，实际为 {action_type}"]
+
+    target = action.get("target")
+
+    if action_type in ("kill", "check"):
+        targets = context.available_targets
+        if target not in targets:
+            errors.append(f"目标 {target} 不在可选目标 {targets} 中")
+
+    elif action_type == "vote":
+        targets = context.available_targets
+        if target is not None and target not in targets:
+            errors.append(f"投票目标 {target} 不在可选目标 {targets} 中")
+
+    elif action_type == "pk_vote":
+        candidates = context.pk_candidates
+        if target is not None and target not in candidates:
+            errors.append(f"投票目标 {target} 不在 PK 候选人 {candidates} 中")
+
+    elif action_type == "witch_action":
+        sub_action = action.get("action")
+        if sub_action == "heal":
+            if not context.has_heal_potion:
+                errors.append("解药已用完，不能救人")
+            if context.killed_player is None:
+                errors.append("今晚无人被杀，不能救人")
+        elif sub_action == "poison":
+            if not context.has_poison_potion:
+                errors.append("毒药已用完，不能毒人")
+            poison_targets = context.poison_targets
+            if target not in poison_targets:
+                errors.append(f"毒人目标 {target} 不在可毒目标 {poison_targets} 中")
+        elif sub_action != "skip":
+            errors.append(f"女巫行动 {sub_action} 无效，只能是 heal|poison|skip")
+
+    elif action_type in ("speech", "last_words", "pk_speech"):
+        if not isinstance(action.get("content"), str):
+            errors.append("content 必须是字符串")
+
+    return errors
+
+
+def correct_action(
+    action: Optional[Dict[str, Any]],
+    game_status: Union[GameView, Dict[str, Any]],
+    action_context: Union[ActionContextView, Dict[str, Any]],
+    task: Optional[Dict[str, Any]] = None,
+    speech_index: Any = None,
+    role_solver: Any = None,
+) -> Dict[str, Any]:
+    """
+    修正非法行动：能就地修正的直接修正，否则用兜底策略重新选择
+
+    Args:
+        action: 待修正的行动（可为 None）
+        game_status: 游戏状态（GameView 或原始字典）
+        action_context: 行动上下文（ActionContextView 或原始字典）
+        task: 任务信息（可选）
+        speech_index: 发言要点索引（可选），透传给兜底策略
+        role_solver: 身份推算（可选），透传给兜底策略
+
+    Returns:
+        合法的行动
+    """
+    view = as_view(game_status)
+    context = as_context(action_context)
+    if action is None:
+        return decide_fallback_action(view, context, task, speech_index, role_solver)
+
+    errors = validate_action(action, context)
+    if not errors:
+        return action
+
+    print(f"[校验] ⚠ 行动不合法: {'; '.join(errors)}")
+    corrected = None
+    if action.get("actionType") == "witch_action":
+        # 药水用错时不冒险换目标，直接跳过
+        corrected = {"actionType": "witch_action", "action": "skip"}
+    elif action.get("actionType") == context.action_type and "content" in action:
+        corrected = dict(action, content=str(action.get("content") or ""))
+
+    if corrected is None or validate_action(corrected, context):
+        corrected = decide_fallback_action(view, context, task, speech_index, role_solver)
+    print(f"[校验] 已修正为: {corrected}")
+    return corrected
+
+
+def build_correction_prompt(errors: List[str], action_context: Union[ActionContextView, Dict[str, Any]]) -> str:
+    """
+    构建定向重试提示：告诉模型哪里不合法以及合法的选择范围
+
+    Args:
+        errors: 校验错误列表
+        action_context: 行动上下文
+
+    Returns:
+        追加给 LLM 的提示词
+    """
+    context = as_context(action_context)
+    prompt = "你上一次给出的行动不合法：\n"
+    for error in errors:
+        prompt += f"- {error}\n"
+    for values, label in (
+        (context.available_targets, "可选目标"),
+        (context.pk_candidates, "PK 候选人"),
+        (context.poison_targets, "可毒目标"),
+    ):
+        if values:
+            prompt += f"{label}：{', '.join(map(str, values))}\n"
+    prompt += "请只回复一个修正后的 JSON 对象，不要输出其他内容。"
+    return prompt
@@ -5,14 +5,30 @@ import json
 import asyncio
 import threading
 import time
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple, Union
 
 try:
     from .api_client import ApiClient
     from .strategy import GameStrategy
+    from .action_validator import correct_action
+    from .turn_state import TurnTracker
+    from .generation_settings import default_generation_stats
+    from .opponent_store import open_store
+    from .checkpoint import AgentCheckpoint
+    from .trace_recorder import TraceRecorder, RecordingLLMClient
+    from .status_cache import share_status
+    from .game_view import GameView, as_view
 except ImportError:
     from api_client import ApiClient
     from strategy import GameStrategy
+    from action_validator import correct_action
+    from turn_state import TurnTracker
+    from generation_settings import default_generation_stats
+    from opponent_store import open_store
+    from checkpoint import AgentCheckpoint
+    from trace_recorder import TraceRecorder, RecordingLLMClient
+    from status_cache import share_status
+    from game_view import GameView, as_view
 
 
 class PlayerAgent:
@@ -32,6 +48,15 @@ class PlayerAgent:
                 - gameToken: 游戏访问 token
                 - apiBaseUrl: API 基础地址
                 - pollInterval: 轮询间隔（毫秒），默认 2000
+                - llmRateLimit: LLM API 每秒请求数上限（可选）
+                - llmMaxConcurrency: LLM API 并发上限（可选）
+                - llmJsonMode: LLM 服务端是否支持 JSON 模式（可选）
+                - llmModelProfiles: 多模型配置（可选），见 GameStrategy
+                - llmModelRoutes: 模型路由表（可选），见 GameStrategy
+                - opponentStorePath: 对手画像库 SQLite 文件（可选），同进程的 Agent 共享
+                - winRule: 服务器的胜负规则（可选），见 role_solver.WIN_RULES
+                - checkpointPath: 检查点文件（可选），配置后重启时从检查点恢复
+                - tracePath: 轨迹文件（可选），记录 /status、LLM 请求和提交的行动，见 trace_recorder
         """
         self.game_id = config.get("gameId")
         self.player_id = config.get("playerId")
@@ -47,6 +72,10 @@ class PlayerAgent:
             }
         )
 
+        # 对手画像：启动时加载一次，游戏结束时写回
+        store_path = config.get("opponentStorePath")
+        self.opponent_store = open_store(store_path) if store_path else None
+
         # 创建策略，传递 LLM 配置
         self.strategy = GameStrategy(
             {
@@ -56,19 +85,51 @@ class PlayerAgent:
                 "apiKey": config.get("llmApiKey"),
                 "modelName": config.get("llmModelName"),
                 "apiUrl": config.get("llmApiUrl"),
+                "rateLimit": config.get("llmRateLimit"),
+                "maxConcurrency": config.get("llmMaxConcurrency"),
+                "jsonMode": config.get("llmJsonMode"),
+                "modelProfiles": config.get("llmModelProfiles"),
+                "modelRoutes": config.get("llmModelRoutes"),
+                "opponentStore": self.opponent_store,
+                "winRule": config.get("winRule"),
             }
         )
 
         self.is_running = False
         self.poll_timer = None
 
-        self.last_game_status = None
+        # 上一次轮询的状态视图（每次状态变化时解析一次）
+        self.last_view: Optional[GameView] = None
+
+        # 轨迹记录（可选）
+        trace_path = config.get("tracePath")
+        self.recorder = (
+            TraceRecorder(
+                trace_path,
+                {"gameId": self.game_id, "playerId": self.player_id, "playerIndex": self.player_index},
+            )
+            if trace_path
+            else None
+        )
+        if self.recorder:
+            self.strategy.wrap_llm_clients(lambda client: RecordingLLMClient(client, self.recorder))
 
-        self.action_in_progress = False
+        # 回合状态机：跟踪当前回合的决策/提交进度，阶段切换时取消过期回合
+        self.turn_tracker = TurnTracker()
 
         # 记录已提交的 action 回合信息，避免重复提交
         self.last_submitted_turn_key = None
 
+        # 检查点：每次状态变化后原子写盘，重启后恢复
+        checkpoint_path = config.get("checkpointPath")
+        self.checkpoint = AgentCheckpoint(checkpoint_path) if checkpoint_path else None
+        self.ready_sent = False
+
+    @property
+    def action_in_progress(self) -> bool:
+        """是否有回合正在决策或提交"""
+        return self.turn_tracker.is_active
+
     def start(self):
         """启动 Agent"""
         if self.is_running:
@@ -78,20 +139,79 @@ class PlayerAgent:
         print("[Agent] ✓ Player Agent 启动成功")
         print(f"[Agent]   游戏 ID: {self.game_id}")
         print(f"[Agent]   玩家 ID: {self.player_id}")
-        # 发送准备就绪信号
-        self.send_ready()
+
+        # 从检查点恢复时已经发送过准备信号，直接用一次 /status 对齐状态
+        if not self.restore_checkpoint() or not self.ready_sent:
+            self.send_ready()
 
         # 开始轮询
         self.poll()
 
+    def get_checkpoint_state(self) -> Tuple[Dict[str, Any], str]:
+        """
+        当前需要持久化的状态
+
+        Returns:
+            (状态, 已渲染的历史文本)；历史文本只追加增长，检查点只写入新增部分
+        """
+        strategy_state, history_text = self.strategy.get_checkpoint_state()
+        state = {
+            "gameId": self.game_id,
+            "playerId": self.player_id,
+            "playerIndex": self.player_index,
+            "readySent": self.ready_sent,
+            "lastSubmittedTurnKey": self.last_submitted_turn_key,
+            "strategy": strategy_state,
+        }
+        return state, history_text
+
+    def save_checkpoint(self):
+        """写入检查点（未配置时什么都不做，写入失败不影响游戏）"""
+        if not self.checkpoint:
+            return
+        try:
+            self.checkpoint.save(*self.get_checkpoint_state())
+        except Exception as error:
+            print(f"[Agent] ⚠ 检查点写入失败: {error}")
+
+    def restore_checkpoint(self) -> bool:
+        """
+        从检查点恢复状态
+
+        Returns:
+            是否恢复成功（检查点属于同一局、同一玩家）
+        """
+        if not self.checkpoint:
+            return False
+        loaded = self.checkpoint.load()
+        if not loaded:
+            return False
+        state, history_text = loaded
+        if state.get("gameId") != self.game_id or state.get("playerId") != self.player_id:
+            print("[Agent] 检查点属于其他对局，忽略")
+            return False
+        self.ready_sent = bool(state.get("readySent"))
+        self.last_submitted_turn_key = state.get("lastSubmittedTurnKey")
+        self.strategy.restore_checkpoint_state(state.get("strategy") or {}, history_text)
+        builder_state = (state.get("strategy") or {}).get("promptBuilder") or {}
+        print(
+            f"[Agent] ✓ 从检查点恢复: 已提交回合 {self.last_submitted_turn_key}，"
+            f"已渲染历史 {builder_state.get('historyCount', 0)} 条"
+        )
+        return True
+
     def send_ready(self):
         """发送准备就绪信号"""
         try:
             print("\n[Agent] ========== 发送准备信号 ==========")
             response = self.api_client.send_ready(self.game_id)
+            if self.recorder:
+                self.recorder.record("ready", response=response)
 
             if response.get("success"):
                 print(f"[Agent] ✓ 准备信号发送成功: {response.get('message', '')}")
+                self.ready_sent = True
+                self.save_checkpoint()
             else:
                 print("[Agent] ✗ 准备信号发送失败")
             print("[Agent] =========================================\n")
@@ -111,6 +231,13 @@ class PlayerAgent:
             self.poll_timer.cancel()
             self.poll_timer = None
 
+        if self.recorder:
+            self.recorder.close()
+
+        # 释放整局状态和提示词缓存（多座位宿主里 Agent 对象可能在结束后继续存在）
+        self.last_view = None
+        self.strategy.release()
+
         print("[Agent] Player Agent 已停止")
 
     def poll(self):
@@ -118,44 +245,93 @@ class PlayerAgent:
         if not self.is_running:
             return
 
+        self.poll_once()
+
+        # 安排下次轮询
+        self.schedule_next_poll()
+
+    def poll_once(self) -> Optional[threading.Thread]:
+        """
+        拉取一次状态，需要行动时在新线程中开始决策
+
+        Returns:
+            本次启动的决策线程，没有开始新回合时返回 None
+        """
         try:
             # 获取游戏状态
+            start_time = time.time()
             response = self.api_client.get_game_status(self.game_id)
+            if self.recorder:
+                self.recorder.record_status(response, int((time.time() - start_time) * 1000))
 
             if not response.get("success"):
                 print("[Agent] 获取游戏状态失败")
-                self.schedule_next_poll()
-                return
+                return None
 
-            game_status = response.get("data", {})
-            self.last_game_status = game_status
+            if response.get("unchanged") and self.last_view is None:
+                # 本地没有状态可复用（例如刚启动），下次强制拉取完整状态
+                self.api_client.reset_status_cache()
+                return None
 
-            # 打印游戏状态
-            self.log_game_status(game_status)
-
-            # 检查游戏是否结束
-            if game_status.get("status") == "finished":
-                print("[Agent] 游戏已结束")
-                self.stop()
-                return
+            if response.get("unchanged"):
+                # 状态没有变化：跳过解析、日志和结束判断，只保留回合检查（之前的决策可能失败了需要重试）
+                view = self.last_view
+            else:
+                # 复用上一次状态中未变化的历史消息，驻留玩家名、阶段等字符串，然后解析一次视图
+                previous = self.last_view.raw if self.last_view else None
+                view = GameView(share_status(previous, response.get("data", {})))
+                self.last_view = view
+
+                # 打印游戏状态
+                self.log_game_status(view)
+
+                # 检查游戏是否结束
+                if view.status == "finished":
+                    print("[Agent] 游戏已结束")
+                    if self.checkpoint:
+                        self.checkpoint.clear()
+                    for line in default_generation_stats.format_lines():
+                        print(f"[Agent] 生成统计 {line}")
+                    if self.opponent_store:
+                        try:
+                            self.opponent_store.record_game(view)
+                        except Exception as e:
+                            print(f"[Agent] ⚠ 对手画像写入失败: {e}")
+                    self.stop()
+                    return None
+
+                # 游戏已开始说明准备信号已生效（恢复时检查点可能早于 ready 的确认）
+                if view.status == "running":
+                    self.ready_sent = True
+                self.save_checkpoint()
 
             # 检查是否需要行动
-            # 检查是否已经提交过当前回合的 action
-            my_turn = game_status.get("myTurn", {})
-            if my_turn.get("canAct") and not self.action_in_progress:
-                turn_key = self.get_turn_key(game_status)
+            turn_key = view.turn_key if view.turn.can_act else None
+
+            # 阶段或天数已经变化：取消仍在决策的旧回合
+            expired_key = self.turn_tracker.expire_stale(turn_key)
+            if expired_key:
+                print(f"[Agent] ⏹ 回合 {expired_key} 已过期，取消进行中的决策")
+
+            if turn_key:
+                # 检查是否已经提交过当前回合的 action
                 if self.last_submitted_turn_key == turn_key:
                     # 已经提交过当前回合的 action，跳过
                     print("[Agent] 当前回合的 action 已提交，跳过重复提交")
                 else:
-                    # 使用线程处理异步操作
-                    threading.Thread(target=self.handle_my_turn_async, args=(game_status,), daemon=True).start()
+                    cancel_event = self.turn_tracker.begin(turn_key)
+                    if cancel_event:
+                        # 使用线程处理异步操作
+                        thread = threading.Thread(
+                            target=self.handle_my_turn_async, args=(view, cancel_event), daemon=True
+                        )
+                        thread.start()
+                        return thread
 
         except Exception as error:
             print(f"[Agent] 轮询出错: {str(error)}")
 
-        # 安排下次轮询
-        self.schedule_next_poll()
+        return None
 
     def schedule_next_poll(self):
         """安排下次轮询"""
@@ -169,69 +345,94 @@ class PlayerAgent:
         self.poll_timer = threading.Timer(self.poll_interval, poll_wrapper)
         self.poll_timer.start()
 
-    def get_turn_key(self, game_status: Dict[str, Any]) -> str:
+    def get_turn_key(self, game_status: Union[GameView, Dict[str, Any]]) -> str:
         """
         获取回合的唯一标识
         使用 day + phase + actionType 确保唯一性
         注意：这是客户端 agent，只控制一个玩家，所以不需要包含 myPlayerIndex
 
         Args:
-            game_status: 游戏状态
+            game_status: 游戏状态（GameView 或原始字典）
 
         Returns:
             回合唯一标识字符串
         """
-        day = game_status.get("day")
-        phase = game_status.get("phase")
-        my_turn = game_status.get("myTurn", {})
-        action_type = my_turn.get("actionType", "")
-        return f"{day}-{phase}-{action_type}"
+        return as_view(game_status).turn_key
 
-    def handle_my_turn_async(self, game_status: Dict[str, Any]):
+    def handle_my_turn_async(
+        self, game_status: Union[GameView, Dict[str, Any]], cancel_event: Optional[threading.Event] = None
+    ):
         """异步处理我的回合（在线程中运行）"""
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
         try:
-            loop.run_until_complete(self.handle_my_turn(game_status))
+            loop.run_until_complete(self.handle_my_turn(game_status, cancel_event))
         finally:
             loop.close()
 
-    async def handle_my_turn(self, game_status: Dict[str, Any]):
+    async def handle_my_turn(
+        self, game_status: Union[GameView, Dict[str, Any]], cancel_event: Optional[threading.Event] = None
+    ):
         """处理我的回合"""
-        self.action_in_progress = True
-        turn_key = self.get_turn_key(game_status)
+        view = as_view(game_status)
+        turn_key = view.turn_key
+        if cancel_event is None:
+            cancel_event = self.turn_tracker.begin(turn_key)
+            if cancel_event is None:
+                return
+        submitted = False
 
         try:
             print("\n[Agent] ========== 轮到我行动 ==========")
 
             # 使用策略决定行动（异步）
-            action = await self.strategy.decide_action(game_status)
+            action = await self.strategy.decide_action(view, cancel_event)
 
             if not action:
                 print("[Agent] 策略决定不行动")
-                self.action_in_progress = False
                 return
 
             # 验证 actionType 是否匹配当前状态（防止基于过期状态提交错误的 action）
-            my_turn = game_status.get("myTurn", {})
-            expected_action_type = my_turn.get("actionType")
+            expected_action_type = view.turn.action_type
             if action.get("actionType") != expected_action_type:
                 print(
                     f"[Agent] ⚠ 行动类型不匹配！期望: {expected_action_type}, 实际: {action.get('actionType')}"
                 )
                 print("[Agent] 可能是阶段切换，跳过提交")
-                self.action_in_progress = False
+                return
+
+            # 最后一道本地校验，非法目标不上线
+            action = correct_action(
+                action,
+                view,
+                view.turn.context,
+                self.task,
+                self.strategy.speech_index,
+                self.strategy.role_solver,
+            )
+
+            # 决策期间回合可能已经过期
+            if not self.turn_tracker.mark_submitting(turn_key):
+                print(f"[Agent] 回合 {turn_key} 已过期，跳过提交")
                 return
 
             # 提交行动
             print(f"[Agent] 提交行动: {json.dumps(action, ensure_ascii=False, indent=2)}")
-            response = self.api_client.submit_action(self.game_id, action)
+            try:
+                response = self.api_client.submit_action(self.game_id, action)
+            except Exception as error:
+                if self.recorder:
+                    self.recorder.record("action", turnKey=turn_key, action=action, error=str(error))
+                raise
+            if self.recorder:
+                self.recorder.record("action", turnKey=turn_key, action=action, response=response)
 
             if response.get("success"):
                 print(f"[Agent] ✓ 行动提交成功: {response.get('message', '')}")
 
                 # 记录已提交的回合，避免重复提交
                 self.last_submitted_turn_key = turn_key
+                submitted = True
 
                 # 如果是验人，显示结果
                 if action.get("actionType") == "check" and response.get("result"):
@@ -248,35 +449,29 @@ class PlayerAgent:
             if "already submitted" in error_msg or "Action already submitted" in error_msg:
                 print("[Agent] 检测到重复提交错误，记录当前回合以避免后续重复提交")
                 self.last_submitted_turn_key = turn_key
+                submitted = True
             # 如果错误是因为 actionType 不匹配，记录回合信息（可能是阶段切换）
             elif "Action type mismatch" in error_msg or "actionType" in error_msg:
                 print("[Agent] 检测到 actionType 不匹配错误，可能是阶段切换，记录当前回合")
                 self.last_submitted_turn_key = turn_key
+                submitted = True
         finally:
-            self.action_in_progress = False
+            self.turn_tracker.finish(turn_key, submitted)
+            if submitted:
+                self.save_checkpoint()
 
-    def log_game_status(self, game_status: Dict[str, Any]):
+    def log_game_status(self, view: GameView):
         """打印游戏状态"""
-        status = game_status.get("status")
-        day = game_status.get("day")
-        phase = game_status.get("phase")
-        my_player_index = game_status.get("myPlayerIndex")
-        my_role = game_status.get("myRole")
-        my_is_alive = game_status.get("myIsAlive")
-        alive_player_indexes = game_status.get("alivePlayerIndexes", [])
-        my_turn = game_status.get("myTurn", {})
-
         print("\n[状态] ==================== 游戏状态 ====================")
-        print(f"[状态] 游戏状态: {status} | 第 {day} 天 | 阶段: {phase}")
+        print(f"[状态] 游戏状态: {view.status} | 第 {view.day} 天 | 阶段: {view.phase_text}")
         print(
-            f"[状态] 我的信息: {my_player_index} 号 | 角色: {my_role} | 存活: {'是' if my_is_alive else '否'}"
+            f"[状态] 我的信息: {view.my_index} 号 | 角色: {view.my_role_text} | "
+            f"存活: {'是' if view.my_is_alive else '否'}"
         )
-        print(f"[状态] 存活玩家: [{', '.join(map(str, alive_player_indexes))}]")
+        print(f"[状态] 存活玩家: [{', '.join(map(str, view.alive))}]")
 
-        if my_turn.get("canAct"):
-            print(
-                f"[状态] 轮到我行动: {my_turn.get('actionType')} | 剩余时间: {my_turn.get('remainingTime')}秒"
-            )
+        if view.turn.can_act:
+            print(f"[状态] 轮到我行动: {view.turn.action_type} | 剩余时间: {view.turn.remaining_time}秒")
         else:
             print("[状态] 等待中...")
 
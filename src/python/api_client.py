@@ -3,10 +3,49 @@ API 客户端
 
 与 ai-werewolf 服务器通信
 """
+import hashlib
 import json
+import re
 import time
 import requests
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+# 每次轮询都会变化但不代表状态变化的字段（剩余秒数、响应时间戳），计算摘要前去掉
+_VOLATILE_FIELDS = re.compile(rb'"(?:remainingTime|timestamp)":\s*-?\d+(?:\.\d+)?')
+
+
+def status_digest(raw: bytes) -> bytes:
+    """
+    计算状态响应原始字节的摘要（忽略易变字段）
+
+    Args:
+        raw: 响应体原始字节
+
+    Returns:
+        16 字节摘要
+    """
+    return hashlib.blake2b(_VOLATILE_FIELDS.sub(b"", raw), digest_size=16).digest()
+
+
+def describe_status(response: Dict[str, Any]) -> str:
+    """
+    状态响应的单行摘要（用于日志）
+
+    Args:
+        response: 状态接口的响应
+
+    Returns:
+        摘要文本
+    """
+    data = response.get("data")
+    if not isinstance(data, dict):
+        return json.dumps(response, ensure_ascii=False)[:500]
+    my_turn = data.get("myTurn") or {}
+    turn = my_turn.get("actionType") if my_turn.get("canAct") else "-"
+    return (
+        f"success={response.get('success')} status={data.get('status')} day={data.get('day')} "
+        f"phase={data.get('phase')} myTurn={turn} history={len(data.get('history') or [])}"
+    )
 
 
 class ApiClient:
@@ -24,6 +63,11 @@ class ApiClient:
         self.api_base_url = config.get("apiBaseUrl")
         self.game_token = config.get("gameToken")
 
+        # 状态变化检测：上一次成功（success 为 true）的状态的 ETag / 版本号 / 响应体摘要
+        self.status_etag: Optional[str] = None
+        self.status_version: Optional[str] = None
+        self.status_digest: Optional[bytes] = None
+
     def get_game_status(self, game_id: str) -> Dict[str, Any]:
         """
         获取游戏状态
@@ -32,9 +76,16 @@ class ApiClient:
             game_id: 游戏 ID
 
         Returns:
-            游戏状态响应
+            游戏状态响应；状态与上一次成功的状态相比没有变化时返回 {"success": True, "unchanged": True}，
+            此时不会解析响应体。success 为 false 的响应不作为比较基准，重复的失败每次都原样返回
         """
         url = f"{self.api_base_url}/api/player-agent/game/{game_id}/status"
+        headers = {
+            "Authorization": f"Bearer {self.game_token}",
+            "Content-Type": "application/json",
+        }
+        if self.status_etag:
+            headers["If-None-Match"] = self.status_etag
 
         print("[API] 📤 发送请求:")
         print("  URL:", url)
@@ -46,26 +97,30 @@ class ApiClient:
 
         start_time = time.time()
         try:
-            response = requests.get(
-                url,
-                headers={
-                    "Authorization": f"Bearer {self.game_token}",
-                    "Content-Type": "application/json",
-                },
-                timeout=10,
-            )
+            response = requests.get(url, headers=headers, timeout=10)
 
             elapsed = int((time.time() - start_time) * 1000)
 
+            if response.status_code == 304:
+                print(f"[API] ✅ 状态未变化: 304 ({elapsed}ms)")
+                return {"success": True, "unchanged": True}
+
             if not response.ok:
                 print(
                     f"[API] ❌ 响应失败: {response.status_code} {response.reason} ({elapsed}ms)"
                 )
                 raise Exception(f"HTTP {response.status_code}: {response.reason}")
 
+            if self.is_status_unchanged(response):
+                print(f"[API] ✅ 状态未变化: {response.status_code} ({elapsed}ms)")
+                return {"success": True, "unchanged": True}
+
             data = response.json()
+            if data.get("success"):
+                self.remember_status(response)
             print(f"[API] ✅ 响应成功: {response.status_code} ({elapsed}ms)")
-            print("[API] 📥 响应数据:", json.dumps(data, ensure_ascii=False, indent=2))
+            # 完整状态随历史变长，不再整段格式化输出，只打印摘要
+            print("[API] 📥 响应数据:", describe_status(data))
 
             return data
         except requests.exceptions.RequestException as e:
@@ -73,6 +128,43 @@ class ApiClient:
             print(f"[API] ❌ 请求失败 ({elapsed}ms): {str(e)}")
             raise
 
+    def is_status_unchanged(self, response: requests.Response) -> bool:
+        """
+        判断状态响应是否与上一次成功的状态相同（不记录本次，见 remember_status）
+
+        优先使用服务器提供的版本号，否则比较响应体摘要
+
+        Args:
+            response: 状态接口的 HTTP 成功响应
+
+        Returns:
+            是否未变化
+        """
+        version = response.headers.get("X-Status-Version")
+        if version is not None:
+            return version == self.status_version
+        return self.status_digest is not None and status_digest(response.content) == self.status_digest
+
+    def remember_status(self, response: requests.Response):
+        """
+        记录成功状态的 ETag / 版本号 / 摘要，作为之后轮询的比较基准
+
+        Args:
+            response: success 为 true 的状态响应
+        """
+        self.status_etag = response.headers.get("ETag") or self.status_etag
+        version = response.headers.get("X-Status-Version")
+        if version is not None:
+            self.status_version = version
+        else:
+            self.status_digest = status_digest(response.content)
+
+    def reset_status_cache(self):
+        """清除变化检测缓存，下一次轮询一定返回完整状态"""
+        self.status_etag = None
+        self.status_version = None
+        self.status_digest = None
+
     def send_ready(self, game_id: str) -> Dict[str, Any]:
         """
         发送准备就绪信号
@@ -0,0 +1,144 @@
+"""
+行动解析基准测试
+
+对比旧版正则解析与 action_parser 的成功率和耗时。
+
+用法:
+    python bench_action_parser.py                 # 使用内置语料
+    python bench_action_parser.py corpus.jsonl    # 每行 {"actionType": ..., "response": ...}
+"""
+import contextlib
+import io
+import json
+import re
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from action_parser import ActionSchemaError, parse_action
+
+# 内置语料：收集自实际对局中模型的典型“脏”输出
+BUILTIN_CORPUS: List[Tuple[str, str]] = [
+    ("vote", '{"actionType": "vote", "target": 3}'),
+    ("vote", '我认为3号最可疑。\n```json\n{"actionType": "vote", "target": 3}\n```'),
+    ("vote", '```\n{"actionType": "vote", "target": "3号"}\n```\n以上是我的决定。'),
+    ("speech", '{"actionType": "speech", "content": "我觉得{2号}和{4号}发言矛盾"}'),
+    ("speech", '分析如下：{局势}不明朗。\n{"actionType": "speech", "content": "我是好人，过。"}'),
+    ("speech", "{'actionType': 'speech', 'content': '2号的发言有问题，大家注意'}"),
+    ("kill", '{actionType: "kill", target: 4}'),
+    ("kill", '{"actionType": "kill", "target": 4,}'),
+    ("check", '先排除队友 {"note": "5号发言划水"}，最终决定：{"actionType": "check", "target": 5}'),
+    ("witch_action", '{"actionType": "witch_action", "action": "skip", "target": null}'),
+    ("witch_action", '{"actionType": "witch_action", "action": "poison", "target": 2, }'),
+    ("witch_action", "{'actionType': 'witch_action', 'action': 'heal', 'target': None}"),
+    ("last_words", '{"actionType": "last_words", "content": "我是预言家，\n2号是狼"}'),
+    ("pk_vote", '候选 {2, 3}\n{"actionType": "pk_vote", "target": 2}'),
+    ("pk_speech", '{"actionType":"pk_speech","content":"请相信我 :) {真诚}"}'),
+    ("vote", '{"actionType": "speech", "content": "..."} {"actionType": "vote", "target": 6}'),
+    ("speech", "好的" + "。" * 2000 + '{"actionType": "speech", "content": "' + "分析" * 500 + '"}'),
+    ("vote", '思路：{先看2号的发言 {"actionType": "vote", "target": 2}'),
+    ("vote", "{" * 20000 + '{"actionType": "vote", "target": 4}'),
+    ("speech", '{"actionType":"speech","content":"我觉得2号的"金水"有问题"}'),
+]
+
+# 发言内容回归：(行动类型, 输出, 是否截断, 期望的 content)
+CONTENT_CASES: List[Tuple[str, str, bool, str]] = [
+    # content 里直接引用别人的话，引号没有转义，不能在第一个引号处截断
+    ("speech", '{"actionType":"speech","content":"我觉得2号的"金水"有问题"}', False, '我觉得2号的"金水"有问题'),
+    (
+        "speech",
+        '{"actionType": "speech", "content": "3号说"我是预言家"，但他昨天说"我是平民"。"}',
+        False,
+        '3号说"我是预言家"，但他昨天说"我是平民"。',
+    ),
+    ("last_words", '{"actionType":"last_words","content":"记住"5号是狼"\n就这样"}\n', False, '记住"5号是狼"\n就这样'),
+    # 达到 max_tokens 被截断的发言
+    (
+        "speech",
+        '{"actionType": "speech", "content": "我是预言家，昨晚验了3号，他是好人。我建议大家先听',
+        True,
+        "我是预言家，昨晚验了3号，他是好人。我建议大家先听",
+    ),
+    ("pk_speech", '{"actionType": "pk_speech", "content": "4号说"相信我"，可是\\u59', True, '4号说"相信我"，可是'),
+]
+
+# 不应解析成功的输出：缺少 target 的投票不能当作弃票
+REJECT_CORPUS: List[Tuple[str, str]] = [
+    ("vote", '{"decision": {"target": 3}}'),
+    ("vote", '{"分析": "2号和5号都可疑"}'),
+    ("pk_vote", "{" * 20000),
+]
+
+
+def legacy_parse(response: str, expected_action_type: str) -> Optional[Dict[str, Any]]:
+    """旧版 GameStrategy.parse_llm_response 的解析逻辑（用于对比）"""
+    try:
+        json_str = response.strip()
+        json_match = re.search(r"```(?:json)?\s*(\{[\s\S]*?\})\s*```", json_str)
+        if json_match:
+            json_str = json_match.group(1)
+        else:
+            json_obj_match = re.search(r"\{[\s\S]*\}", json_str)
+            if json_obj_match:
+                json_str = json_obj_match.group(0)
+        parsed = json.loads(json_str)
+        parsed["actionType"] = expected_action_type
+        return parsed
+    except Exception:
+        return None
+
+
+def new_parse(response: str, expected_action_type: str) -> Optional[Dict[str, Any]]:
+    try:
+        return parse_action(response, expected_action_type)
+    except ActionSchemaError:
+        return None
+
+
+def load_corpus(path: str) -> List[Tuple[str, str]]:
+    corpus = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                item = json.loads(line)
+                corpus.append((item["actionType"], item["response"]))
+    return corpus
+
+
+def run(name: str, parser, corpus: List[Tuple[str, str]], rounds: int) -> None:
+    ok = sum(1 for action_type, text in corpus if parser(text, action_type) is not None)
+    # 计时时不输出解析器的提示日志
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for action_type, text in corpus:
+                parser(text, action_type)
+        elapsed = time.perf_counter() - start
+    per_parse_us = elapsed / (rounds * len(corpus)) * 1e6
+    print(f"{name:<8} 成功 {ok}/{len(corpus)}  平均 {per_parse_us:.1f}µs/次")
+
+
+def main():
+    corpus = load_corpus(sys.argv[1]) if len(sys.argv) > 1 else BUILTIN_CORPUS
+    rounds = 200
+    run("legacy", legacy_parse, corpus, rounds)
+    run("parser", new_parse, corpus, rounds)
+    wrong = [text[:40] for action_type, text in REJECT_CORPUS if new_parse(text, action_type) is not None]
+    print(f"parser   拒绝 {len(REJECT_CORPUS) - len(wrong)}/{len(REJECT_CORPUS)}" + (f"  误收: {wrong}" if wrong else ""))
+    failed = 0
+    for action_type, text, truncated, expected in CONTENT_CASES:
+        try:
+            content = parse_action(text, action_type, truncated).get("content")
+        except ActionSchemaError as error:
+            content = f"<{error}>"
+        if content != expected:
+            failed += 1
+            print(f"parser   ✗ {text[:40]!r}\n  期望: {expected!r}\n  实际: {content!r}")
+    print(f"parser   发言内容 {len(CONTENT_CASES) - failed}/{len(CONTENT_CASES)}")
+    if wrong or failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+生成参数基准测试
+
+用模拟对局收集各行动类型的真实提示词，分别以两种方式调用 LLM，按行动类型对比生成 token 数和耗时：
+- baseline: 只发送 model 和 messages
+- tuned:    按 generation_settings 设置 max_tokens、stop 和 JSON 模式
+同时统计解析成功率，确认收紧输出后行动仍然可用。
+
+需要 DEEPSEEK_KEY（或用 --api-url 指向其他 OpenAI 兼容服务）。
+
+用法:
+    python bench_generation.py [--per-type 5] [--model deepseek-v3] [--no-json-mode]
+"""
+import argparse
+import contextlib
+import os
+from typing import Dict, List
+
+from action_parser import ActionSchemaError, parse_action
+from generation_settings import GenerationStats, get_generation_settings
+from llm_client import LLMClient
+from llm_scheduler import Priority
+from simulator import SimulatedGame
+from strategy import GameStrategy
+from tournament import DEFAULT_API_URL, DEFAULT_MODEL
+
+
+class PromptRecorder:
+    """不联网的记录器：按行动类型保存提示词，返回空响应让策略走兜底"""
+
+    def __init__(self, prompts: Dict[str, List[List[Dict[str, str]]]]):
+        self.prompts = prompts
+
+    def chat(self, messages, cancel_event=None, priority=None, generation=None) -> str:
+        action_type = (generation or {}).get("actionType", "unknown")
+        self.prompts.setdefault(action_type, []).append(messages)
+        return ""
+
+
+def collect_prompts(games: int) -> Dict[str, List[List[Dict[str, str]]]]:
+    """跑几局模拟对局收集提示词"""
+    prompts: Dict[str, List[List[Dict[str, str]]]] = {}
+
+    def factory(index, role):
+        strategy = GameStrategy({"playerIndex": index, "playerRole": role})
+        strategy.llm_client = PromptRecorder(prompts)
+        return strategy
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for seed in range(games):
+            SimulatedGame(factory, seed=seed, game_id=f"bench-{seed}").run()
+    return prompts
+
+
+def run(client: LLMClient, prompts, per_type: int, tuned: bool):
+    stats = GenerationStats()
+    client.stats = stats
+    parsed = 0
+    total = 0
+    for action_type, samples in sorted(prompts.items()):
+        generation = get_generation_settings(action_type)
+        for messages in samples[:per_type]:
+            total += 1
+            if tuned:
+                response = client.chat(messages, priority=Priority.BACKGROUND, generation=generation)
+            else:
+                # 不带生成参数也要按行动类型统计
+                response = client._chat(messages, None, {"actionType": action_type})
+            try:
+                parsed += parse_action(response, action_type) is not None
+            except ActionSchemaError:
+                pass
+    return stats, parsed, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成参数基准测试")
+    parser.add_argument("--per-type", type=int, default=5, help="每个行动类型的样本数")
+    parser.add_argument("--games", type=int, default=3, help="收集提示词的模拟对局数")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--api-url", default=DEFAULT_API_URL)
+    parser.add_argument("--no-json-mode", action="store_true", help="服务端不支持 response_format 时使用")
+    args = parser.parse_args()
+
+    api_key = os.getenv("DEEPSEEK_KEY")
+    if not api_key:
+        raise SystemExit("需要设置 DEEPSEEK_KEY")
+
+    prompts = collect_prompts(args.games)
+    client = LLMClient(
+        {"apiKey": api_key, "modelName": args.model, "apiUrl": args.api_url, "jsonMode": not args.no_json_mode}
+    )
+
+    for label, tuned in (("baseline", False), ("tuned", True)):
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            stats, parsed, total = run(client, prompts, args.per_type, tuned)
+        print(f"[{label}] 解析成功 {parsed}/{total}")
+        for line in stats.format_lines():
+            print(f"[{label}]   {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Agent 内存基准测试
+
+合成一局很长的游戏（默认 40 天，约 500 条历史消息），在同一进程里同时运行多个 PlayerAgent
+（模拟多座位宿主），每次轮询都重新解析一份完整状态 JSON，与真实轮询一致。
+用 tracemalloc 统计整个过程的峰值内存和最后一次对局进行中的轮询之后仍被持有的内存（此时 Agent 还没有
+收到 finished 状态、没有释放任何东西，反映长局中常驻的内存），按 Agent 平均。
+峰值超过 --max-peak-kb 时退出码为 1；默认上限 640 KB 低于优化前的 697 KB，内存回退到优化前的水平会失败。
+
+LLM 使用离线替身（StubLLMClient），提示词构建、发言索引、兜底校验等路径都会被执行。
+
+用法:
+    python bench_memory.py [--days 40] [--agents 6] [--max-peak-kb 640]
+"""
+import argparse
+import contextlib
+import json
+import os
+import tracemalloc
+from typing import Any, Dict, List
+
+from agent import PlayerAgent
+from llm_stubs import StubLLMClient
+
+PLAYER_NAMES = ["林间小鹿", "北风", "阿尔法", "夜行者", "青柠", "老王"]
+SPEECHES = [
+    "我是预言家，昨晚查验了{a}号玩家，他是好人。{b}号发言很可疑，我怀疑{b}号，建议大家投{b}号。",
+    "作为平民我没什么信息，但是{a}号昨天的投票和发言对不上，{b}号像狼，我这轮跟预言家的票。",
+    "我觉得{a}号的逻辑有问题，前后矛盾，{b}号是狼的可能性很大，今天归票给{b}号。",
+    "我是好人，过。不过提醒一下，{a}号一直在带节奏，大家注意一下，我倾向于出{b}号。",
+]
+ACTION_TYPES = {"night": "check", "day_speech": "speech", "day_vote": "vote"}
+
+
+def make_long_game(days: int, my_index: int) -> List[bytes]:
+    """
+    生成一局逐步变长的游戏，每个阶段一份状态 JSON
+
+    Args:
+        days: 天数
+        my_index: 观察者玩家编号
+
+    Returns:
+        编码后的状态列表（字节串，轮询时再解析）
+    """
+    players = [
+        {"playerIndex": i + 1, "name": PLAYER_NAMES[i], "isAlive": True} for i in range(len(PLAYER_NAMES))
+    ]
+    others = [p["playerIndex"] for p in players if p["playerIndex"] != my_index]
+    history: List[Dict[str, Any]] = []
+    statuses = []
+    msg_id = 0
+
+    def add(day: int, phase: str, player: Any, content: str, metatype: str, **extra: Any):
+        nonlocal msg_id
+        msg_id += 1
+        history.append(
+            {
+                "id": msg_id,
+                "day": day,
+                "phase": phase,
+                "playerIndex": player,
+                "content": content,
+                "timestamp": f"2025-11-12T10:{msg_id // 60 % 60:02d}:{msg_id % 60:02d}.000Z",
+                "metadata": dict(extra, metatype=metatype),
+            }
+        )
+
+    for day in range(1, days + 1):
+        for phase in ("night", "day_speech", "day_vote"):
+            if phase == "night":
+                add(day, phase, None, f"第 {day} 天，天黑请闭眼", "phase_transition")
+            elif phase == "day_speech":
+                for player in players:
+                    index = player["playerIndex"]
+                    a, b = others[(day + index) % len(others)], others[(day * 2 + index) % len(others)]
+                    add(day, phase, index, SPEECHES[(day + index) % len(SPEECHES)].format(a=a, b=b), "say")
+            else:
+                for player in players:
+                    index = player["playerIndex"]
+                    target = others[(day + index) % len(others)]
+                    add(day, phase, index, f"{index}号玩家投票给{target}号玩家", "vote", target=target)
+            action_type = ACTION_TYPES[phase]
+            status = {
+                "gameId": "bench-memory",
+                "status": "running",
+                "day": day,
+                "phase": phase,
+                "myPlayerIndex": my_index,
+                "myRole": "SEER",
+                "myIsAlive": True,
+                "alivePlayerIndexes": [p["playerIndex"] for p in players],
+                "players": players,
+                "history": history,
+                "myTurn": {
+                    "canAct": True,
+                    "actionType": action_type,
+                    "remainingTime": 30,
+                    "actionContext": {
+                        "actionType": action_type,
+                        "availableTargets": others,
+                        "deadline": "2099-01-01T00:00:00.000Z",
+                    },
+                },
+            }
+            statuses.append(json.dumps({"success": True, "data": status}, ensure_ascii=False).encode("utf-8"))
+    final = json.loads(statuses[-1])
+    final["data"].update(status="finished", myTurn={"canAct": False})
+    statuses.append(json.dumps(final, ensure_ascii=False).encode("utf-8"))
+    return statuses
+
+
+class SyntheticApiClient:
+    """每次轮询都重新解析状态 JSON 的 ApiClient 替身"""
+
+    def __init__(self, statuses: List[bytes]):
+        self.statuses = statuses
+        self.position = 0
+
+    def get_game_status(self, game_id: str) -> Dict[str, Any]:
+        raw = self.statuses[min(self.position, len(self.statuses) - 1)]
+        self.position += 1
+        return json.loads(raw)
+
+    def reset_status_cache(self):
+        pass
+
+    def send_ready(self, game_id: str) -> Dict[str, Any]:
+        return {"success": True}
+
+    def submit_action(self, game_id: str, action: Dict[str, Any]) -> Dict[str, Any]:
+        return {"success": True, "result": "good" if action.get("actionType") == "check" else None}
+
+
+def run_benchmark(days: int, agents: int) -> Dict[str, Any]:
+    """
+    运行基准测试
+
+    Args:
+        days: 游戏天数
+        agents: 同时运行的 Agent 数
+
+    Returns:
+        {"polls", "historySize", "peakKb", "retainedKb", "finishedKb"}（内存为每个 Agent 的平均值）：
+            retainedKb 为最后一次进行中轮询之后持有的内存，finishedKb 为处理完 finished 状态（已释放）之后
+    """
+    games = [make_long_game(days, seat % len(PLAYER_NAMES) + 1) for seat in range(agents)]
+    history_size = len(json.loads(games[0][-1])["data"]["history"])
+
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    players = []
+    for seat, statuses in enumerate(games):
+        agent = PlayerAgent(
+            {"gameId": "bench-memory", "playerId": f"bench-{seat}", "playerIndex": seat % len(PLAYER_NAMES) + 1}
+        )
+        agent.api_client = SyntheticApiClient(statuses)
+        agent.strategy.llm_client = StubLLMClient(seed=seat)
+        agent.is_running = True
+        players.append(agent)
+
+    polls = 0
+
+    def poll_all():
+        nonlocal polls
+        for agent in players:
+            thread = agent.poll_once()
+            if thread:
+                thread.join()
+            polls += 1
+
+    # 轮流推进所有 Agent，模拟多座位宿主里同时存活的 Agent；最后一份状态是 finished
+    for _ in range(len(games[0]) - 1):
+        poll_all()
+    retained, _ = tracemalloc.get_traced_memory()
+    poll_all()
+    finished, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "polls": polls,
+        "historySize": history_size,
+        "peakKb": (peak - baseline) / 1024 / agents,
+        "retainedKb": (retained - baseline) / 1024 / agents,
+        "finishedKb": (finished - baseline) / 1024 / agents,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent 内存基准测试")
+    parser.add_argument("--days", type=int, default=40)
+    parser.add_argument("--agents", type=int, default=6)
+    parser.add_argument("--max-peak-kb", type=float, default=640, help="每个 Agent 的峰值内存上限")
+    args = parser.parse_args()
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        result = run_benchmark(args.days, args.agents)
+
+    print(
+        f"[内存] {args.agents} 个 Agent，{args.days} 天，历史 {result['historySize']} 条，{result['polls']} 次轮询"
+    )
+    print(
+        f"[内存] 每个 Agent 峰值 {result['peakKb']:.0f} KB，对局中持有 {result['retainedKb']:.0f} KB，"
+        f"结束释放后 {result['finishedKb']:.0f} KB"
+    )
+    if result["peakKb"] > args.max_peak_kb:
+        print(f"[内存] ✗ 峰值超过上限 {args.max_peak_kb:.0f} KB")
+        raise SystemExit(1)
+    print(f"[内存] ✓ 峰值低于上限 {args.max_peak_kb:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
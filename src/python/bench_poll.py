@@ -0,0 +1,88 @@
+"""
+空闲轮询 CPU 开销基准测试
+
+启动本地服务器替身（子进程，不计入本进程 CPU），用 STATUS_DATA.md 的状态反复轮询，
+对比每次空闲轮询（状态无变化）的 CPU 时间：
+- legacy: 每次都解析 JSON、打印完整响应和游戏状态
+- digest: 服务器不提供版本信息，比较响应体摘要
+- etag:   服务器提供 ETag，直接得到 304
+
+用法:
+    python bench_poll.py [轮询次数]
+"""
+import contextlib
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from agent import PlayerAgent
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(no_version: bool):
+    port = _free_port()
+    args = [sys.executable, os.path.join(HERE, "local_server.py"), "--port", str(port)]
+    if no_version:
+        args.append("--no-version")
+    proc = subprocess.Popen(args, stdout=subprocess.PIPE)
+    proc.stdout.readline()
+    return proc, port
+
+
+def _make_agent(port: int) -> PlayerAgent:
+    agent = PlayerAgent(
+        {
+            "gameId": "62",
+            "playerId": "bench",
+            "gameToken": "bench-token-0000000000000000",
+            "apiBaseUrl": f"http://127.0.0.1:{port}",
+        }
+    )
+    agent.is_running = True
+    return agent
+
+
+def _poll_once(agent: PlayerAgent):
+    agent.poll()
+    if agent.poll_timer:
+        agent.poll_timer.cancel()
+
+
+def measure(mode: str, polls: int) -> float:
+    proc, port = _start_server(no_version=(mode != "etag"))
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            agent = _make_agent(port)
+            if mode == "legacy":
+                # 关闭变化检测：每次都当作新状态处理
+                agent.api_client.is_status_unchanged = lambda response: False
+            _poll_once(agent)
+            agent.last_submitted_turn_key = agent.last_view.turn_key
+            start = time.process_time()
+            for _ in range(polls):
+                _poll_once(agent)
+            elapsed = time.process_time() - start
+            agent.is_running = False
+        return elapsed / polls * 1000
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    polls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    for mode in ("legacy", "digest", "etag"):
+        print(f"{mode:<7} {measure(mode, polls):.3f} ms CPU / 空闲轮询")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+提示词构建基准测试
+
+以 STATUS_DATA.md 为起点模拟一局逐步变长的游戏，对比每个回合构建提示词的耗时：
+- builder:  context_builder.build_llm_messages（每次从头拼接）
+- template: prompt_templates.GamePromptBuilder（按局编译、历史增量渲染）
+同时校验两者输出完全一致。
+
+用法:
+    python bench_prompt.py [回合数]
+"""
+import copy
+import sys
+import time
+
+from context_builder import build_llm_messages
+from local_server import DEFAULT_STATUS_FILE, load_status_file
+from prompt_templates import GamePromptBuilder
+
+TASK = {"type": "fearless_seer", "name": "🔮无畏预言", "description": "第一次白天表明自己是预言家", "reward": "50"}
+ACTION_CONTEXTS = [
+    {"actionType": "speech", "deadline": "2025-11-12T10:24:58.104Z", "hint": "请发言"},
+    {"actionType": "vote", "deadline": "2025-11-12T10:24:58.104Z", "availableTargets": [1, 2, 3, 4, 6]},
+    {"actionType": "check", "deadline": "2025-11-12T10:24:58.104Z", "availableTargets": [1, 2, 3, 4, 6]},
+]
+
+
+def make_turns(turns: int):
+    """生成逐步追加历史消息的状态序列"""
+    base = load_status_file(DEFAULT_STATUS_FILE)
+    speeches = [m for m in base["history"] if (m.get("metadata") or {}).get("metatype") == "say"]
+    statuses = []
+    history = list(base["history"])
+    for turn in range(turns):
+        for speech in speeches[:2]:
+            msg = copy.deepcopy(speech)
+            msg["id"] = f"{speech['id']}-{turn}"
+            history.append(msg)
+        status = dict(base, history=list(history), day=1 + turn // 3)
+        statuses.append((status, ACTION_CONTEXTS[turn % len(ACTION_CONTEXTS)]))
+    return statuses
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    statuses = make_turns(turns)
+
+    builder = GamePromptBuilder(TASK)
+    for status, context in statuses:
+        assert builder.build_messages(status, context) == build_llm_messages(status, context, TASK)
+
+    start = time.perf_counter()
+    for status, context in statuses:
+        build_llm_messages(status, context, TASK)
+    legacy_ms = (time.perf_counter() - start) / turns * 1000
+
+    builder = GamePromptBuilder(TASK)
+    start = time.perf_counter()
+    for status, context in statuses:
+        builder.build_messages(status, context)
+    template_ms = (time.perf_counter() - start) / turns * 1000
+
+    print(f"回合数 {turns}，最终历史 {len(statuses[-1][0]['history'])} 条，输出一致")
+    print(f"builder  {legacy_ms:.3f} ms / 回合")
+    print(f"template {template_ms:.3f} ms / 回合")
+
+
+if __name__ == "__main__":
+    main()
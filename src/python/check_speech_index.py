@@ -0,0 +1,132 @@
+"""
+发言要点提取回归检查
+
+用 STATUS_DATA.md 里的真实对局和几条手写发言检查 speech_index 的提取结果，
+并确认 JS 版（src/js/speech-index.js）生成的摘要与 Python 版逐字相同（没有 node 时跳过）。
+有不一致时退出码为 1。
+
+用法:
+    python check_speech_index.py
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+from typing import Any, Dict, List, Tuple
+
+from speech_index import build_speech_index
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+
+def load_status_data_history() -> List[Dict[str, Any]]:
+    """STATUS_DATA.md 中示例状态的历史消息"""
+    with open(os.path.join(ROOT_DIR, "STATUS_DATA.md"), encoding="utf-8") as f:
+        text = f.read()
+    return json.loads(text.split("```json", 1)[1].rsplit("```", 1)[0])["gameStatus"]["history"]
+
+
+def speech(player: int, content: str, msg_id: int) -> Dict[str, Any]:
+    return {"id": f"case-{msg_id}", "day": 1, "playerIndex": player, "content": content, "metadata": {"metatype": "say"}}
+
+
+# (名称, 历史消息, 期望的事实)
+def build_cases() -> List[Tuple[str, List[Dict[str, Any]], Dict[str, Any]]]:
+    return [
+        (
+            "STATUS_DATA.md",
+            load_status_data_history(),
+            {
+                # 4 号“我更倾向于是女巫用了救药”不是声明；1 号转述“2号给3号发金水”不是报验
+                "claims": {2: "SEER", 3: "VILLAGER", 1: "WITCH"},
+                "checkReports": [{"speaker": 2, "target": 3, "result": "good", "day": 1}],
+                "accusations": [],
+            },
+        ),
+        (
+            "假设与转述",
+            [
+                speech(1, "如果我是女巫，昨晚一定会救人。我觉得2号给3号发金水有问题。", 1),
+                speech(2, "我是好人。4号说他验了5号，5号是狼人，我不太信。", 2),
+            ],
+            # 转述里的“5号是狼人”仍算 2 号的指认，但不是 2 号或 4 号的报验
+            {"claims": {2: "GOOD"}, "checkReports": [], "accusations": [{"speaker": 2, "target": 5, "day": 1}]},
+        ),
+        (
+            "引用别人的话",
+            [
+                speech(1, "他说“我是预言家，验了4号是狼人”，我不信。", 1),
+                speech(2, "6号说'我是女巫'，还说我是平民，我是好人。", 2),
+                speech(3, "3号玩家说：我是预言家。其实我才是预言家。", 3),
+            ],
+            # 引号里和“说”后面的声明、报验都是别人的，最后一句才是 3 号自己的声明；指认仍按转述计入
+            {"claims": {2: "GOOD", 3: "SEER"}, "checkReports": [], "accusations": [{"speaker": 1, "target": 4, "day": 1}]},
+        ),
+        (
+            "预言家报验",
+            [
+                speech(3, "我是预言家，昨晚验了4号，他是狼人。", 1),
+                speech(5, "我的身份是女巫。我昨晚查验了6号结果是好人，开玩笑的。2号是我的金水不成立。", 2),
+            ],
+            {
+                "claims": {3: "SEER", 5: "WITCH"},
+                "checkReports": [
+                    {"speaker": 3, "target": 4, "result": "werewolf", "day": 1},
+                    {"speaker": 5, "target": 6, "result": "good", "day": 1},
+                    {"speaker": 5, "target": 2, "result": "good", "day": 1},
+                ],
+                "accusations": [],
+            },
+        ),
+    ]
+
+
+def js_summaries(histories: List[List[Dict[str, Any]]]) -> List[str]:
+    script = (
+        "import('./speech-index.js').then((m) => {"
+        "const input = JSON.parse(require('fs').readFileSync(0, 'utf8'));"
+        "process.stdout.write(JSON.stringify(input.map((h) => m.buildSpeechSummary(h))));"
+        "});"
+    )
+    result = subprocess.run(
+        ["node", "-e", script],
+        cwd=os.path.join(ROOT_DIR, "src", "js"),
+        input=json.dumps(histories, ensure_ascii=False),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout)
+
+
+def main():
+    cases = build_cases()
+    failed = 0
+    for name, history, expected in cases:
+        facts = build_speech_index(history).facts()
+        if facts != expected:
+            failed += 1
+            print(f"[校验] ✗ {name}\n  期望: {expected}\n  实际: {facts}")
+        else:
+            print(f"[校验] ✓ {name}")
+
+    if shutil.which("node"):
+        python_summaries = [build_speech_index(history).summary() for _, history, _ in cases]
+        mismatched = 0
+        for (name, _, _), py, js in zip(cases, python_summaries, js_summaries([h for _, h, _ in cases])):
+            if py != js:
+                mismatched += 1
+                print(f"[对比] ✗ {name} 的 JS 摘要不一致\n  Python: {py!r}\n  JS:     {js!r}")
+        if not mismatched:
+            print("[对比] ✓ JS 摘要一致")
+        failed += mismatched
+    else:
+        print("[对比] 未找到 node，跳过 JS 对比")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
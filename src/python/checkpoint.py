@@ -0,0 +1,173 @@
+"""
+Agent 检查点
+
+把 Agent 的运行状态（是否已发送 ready、已提交的回合、提示词缓存等）保存为 JSON 文件。
+写入先落到同目录的临时文件并 fsync，再用 os.replace 原子替换，进程在任意时刻崩溃都不会留下半个文件。
+容器重启后读回检查点即可跳过 /ready、避免重复提交，并沿用已渲染的历史。
+
+已渲染的历史随对局只追加增长，不放进 JSON，而是写到旁边的 <path>.history：每次只追加新增部分，
+JSON 里记录文件的代号和已提交的字节数。先追加文本再替换 JSON，崩溃时多出来的尾巴在读取时截掉；
+历史被重建（新的一局）时换一个代号整体重写。每次保存的开销只和新增内容有关，与历史总长度无关。
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+CHECKPOINT_VERSION = 2
+# 读取时兼容的版本（版本 1 的历史文本内联在 JSON 里）
+SUPPORTED_VERSIONS = (1, 2)
+# 判断新文本是否是已保存文本的延续时比较的结尾字符数
+_TAIL_CHARS = 64
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def _write_atomic(path: str, data: bytes):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".checkpoint-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class AgentCheckpoint:
+    """单个 Agent 的检查点文件"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: 检查点文件路径（历史文本写在 path + ".history"）
+        """
+        self.path = path
+        self.text_path = path + ".history"
+        self.lock = threading.Lock()
+        # 上次写入的 JSON 的摘要（JSON 里不再有历史文本，很小）
+        self.last_saved: Optional[bytes] = None
+        # 历史文件的代号、已提交的字符数 / 字节数、已提交文本的结尾
+        self.text_id: Optional[str] = None
+        self.text_chars = 0
+        self.text_bytes = 0
+        self.text_tail = ""
+
+    def save(self, state: Dict[str, Any], text: Optional[str] = None) -> bool:
+        """
+        原子写入检查点；内容与上次写入相同时跳过
+
+        Args:
+            state: 可 JSON 序列化的状态
+            text: 只追加增长的历史文本（可选），只写入新增部分
+
+        Returns:
+            是否实际写入
+        """
+        with self.lock:
+            if text is not None:
+                self._save_text(text)
+                state = dict(state, historyFile={"id": self.text_id, "bytes": self.text_bytes})
+            data = json.dumps(dict(state, version=CHECKPOINT_VERSION), ensure_ascii=False, separators=(",", ":"))
+            digest = _digest(data)
+            if digest == self.last_saved:
+                return False
+            _write_atomic(self.path, data.encode("utf-8"))
+            self.last_saved = digest
+            return True
+
+    def _save_text(self, text: str):
+        """追加历史文本的新增部分；不是已保存文本的延续时换代号整体重写"""
+        continues = (
+            self.text_id is not None
+            and len(text) >= self.text_chars
+            and text[max(0, self.text_chars - _TAIL_CHARS) : self.text_chars] == self.text_tail
+        )
+        if continues and len(text) == self.text_chars:
+            return
+        if continues:
+            added = text[self.text_chars :].encode("utf-8")
+            try:
+                with open(self.text_path, "r+b") as f:
+                    # 截掉上次崩溃时追加了但没有提交的部分
+                    f.truncate(self.text_bytes)
+                    f.seek(self.text_bytes)
+                    f.write(added)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self.text_bytes += len(added)
+            except OSError as e:
+                print(f"[检查点] ⚠ 追加历史失败，整体重写: {e}")
+                continues = False
+        if not continues:
+            self.text_id = uuid.uuid4().hex
+            header = f"{self.text_id}\n".encode("ascii")
+            body = text.encode("utf-8")
+            _write_atomic(self.text_path, header + body)
+            self.text_bytes = len(header) + len(body)
+        self.text_chars = len(text)
+        self.text_tail = text[-_TAIL_CHARS:]
+
+    def _load_text(self, info: Dict[str, Any]) -> Optional[str]:
+        """读取 JSON 引用的历史文本，文件缺失或代号不符时返回 None"""
+        try:
+            with open(self.text_path, "rb") as f:
+                raw = f.read(info.get("bytes", 0))
+        except OSError:
+            return None
+        header, _, body = raw.partition(b"\n")
+        if header.decode("ascii", "replace") != info.get("id") or len(raw) != info.get("bytes"):
+            return None
+        text = body.decode("utf-8")
+        self.text_id = info["id"]
+        self.text_chars = len(text)
+        self.text_bytes = len(raw)
+        self.text_tail = text[-_TAIL_CHARS:]
+        return text
+
+    def load(self) -> Optional[Tuple[Dict[str, Any], Optional[str]]]:
+        """
+        读取检查点
+
+        Returns:
+            (状态字典, 历史文本)；文件不存在、损坏或版本不符时返回 None，历史文本不可用时为 None
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = f.read()
+            state = json.loads(data)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"[检查点] ⚠ 读取失败，忽略检查点: {e}")
+            return None
+        if not isinstance(state, dict) or state.get("version") not in SUPPORTED_VERSIONS:
+            print("[检查点] ⚠ 检查点版本不符，忽略")
+            return None
+        with self.lock:
+            self.last_saved = _digest(data) if state["version"] == CHECKPOINT_VERSION else None
+            info = state.get("historyFile")
+            text = self._load_text(info) if isinstance(info, dict) else None
+        return state, text
+
+    def clear(self):
+        """删除检查点（游戏结束时调用）"""
+        with self.lock:
+            self.last_saved = None
+            self.text_id = None
+            self.text_chars = self.text_bytes = 0
+            self.text_tail = ""
+            for path in (self.path, self.text_path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
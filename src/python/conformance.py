@@ -0,0 +1,305 @@
+"""
+Python / JS Agent 一致性与性能对比
+
+用模拟对局生成某个座位的一串行动回合（场景），依次让 Python Agent（main.py）和 JS Agent（src/js/index.js）
+作为子进程跑同一个场景：
+- 游戏服务器：local_server，Agent 提交行动后切换到下一个回合的状态，最后切到 finished
+- LLM 服务器：llm_stubs.start_stub_llm_server，第 i 个请求的响应只取决于 i，两边拿到相同的响应
+
+对比内容：
+- 每个回合发给 LLM 的提示词（逐条消息 diff）和提交的行动
+- 各阶段耗时：启动（进程启动 → /ready）、决策（拿到新状态 → LLM 请求到达）、
+  提交（LLM 响应 → 行动到达）、回合总耗时（拿到新状态 → 行动到达）
+- 内存：/proc/<pid>/status 的 VmHWM（峰值 RSS），运行期间定时采样
+
+用法:
+    python conformance.py [--turns 6] [--seat 1] [--seed 0] [--llm-delay-ms 0] [--poll-interval 200]
+"""
+import argparse
+import contextlib
+import copy
+import difflib
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from llm_stubs import start_stub_llm_server
+from local_server import start_server
+from simulator import ACTION_TIMEOUT_SECONDS, SimulatedGame
+from strategy import GameStrategy
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+AGENT_COMMANDS = {
+    "python": [sys.executable, os.path.join(ROOT_DIR, "src", "python", "main.py")],
+    "js": ["node", os.path.join(ROOT_DIR, "src", "js", "index.js")],
+}
+
+
+class _RecordingStrategy:
+    """记录某个座位每次行动时看到的状态，决策交给兜底策略"""
+
+    def __init__(self, strategy: GameStrategy, statuses: List[Dict[str, Any]]):
+        self.strategy = strategy
+        self.statuses = statuses
+
+    async def decide_action(self, game_status, cancel_event=None):
+        self.statuses.append(copy.deepcopy(game_status))
+        return await self.strategy.decide_action(game_status, cancel_event)
+
+
+def build_scenario(seat: int, seed: int, turns: int) -> List[Dict[str, Any]]:
+    """
+    用模拟对局生成场景：某个座位的前若干个行动回合，外加一个 finished 状态
+
+    Args:
+        seat: 座位号
+        seed: 模拟对局种子
+        turns: 最多回合数
+
+    Returns:
+        游戏状态列表
+    """
+    statuses: List[Dict[str, Any]] = []
+
+    def factory(index, role):
+        strategy = GameStrategy({"playerIndex": index, "playerRole": role})
+        return _RecordingStrategy(strategy, statuses) if index == seat else strategy
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        SimulatedGame(factory, seed=seed, game_id=f"conformance-{seed}").run()
+
+    scenario = statuses[:turns]
+    final = dict(scenario[-1], status="finished", phase="game_over", myTurn={"canAct": False})
+    return scenario + [final]
+
+
+def refresh_deadline(status: Dict[str, Any]) -> Dict[str, Any]:
+    """切换到某个回合时把截止时间设为现在起 15 秒"""
+    my_turn = status.get("myTurn") or {}
+    if not my_turn.get("canAct"):
+        return status
+    deadline = datetime.now(timezone.utc) + timedelta(seconds=ACTION_TIMEOUT_SECONDS)
+    context = dict(my_turn["actionContext"], deadline=deadline.isoformat().replace("+00:00", "Z"))
+    my_turn = dict(my_turn, deadline=int(deadline.timestamp() * 1000), actionContext=context)
+    return dict(status, myTurn=my_turn)
+
+
+def read_memory_kb(pid: int) -> Dict[str, int]:
+    """读取 /proc/<pid>/status 中的 VmHWM / VmRSS（KB），进程不存在时返回空字典"""
+    result = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(("VmHWM:", "VmRSS:")):
+                    key, value = line.split(":", 1)
+                    result[key] = int(value.split()[0])
+    except OSError:
+        pass
+    return result
+
+
+def run_agent(
+    name: str,
+    scenario: List[Dict[str, Any]],
+    seat: int,
+    seed: int,
+    llm_delay_ms: int,
+    poll_interval: int,
+    timeout: float,
+) -> Dict[str, Any]:
+    """
+    让一个 Agent 跑完场景
+
+    Returns:
+        {"prompts", "actions", "stages", "memory", "completed", "log"}
+    """
+    game_server, game = start_server(refresh_deadline(scenario[0]))
+    llm_server, llm = start_stub_llm_server(seed=seed, delay_ms=llm_delay_ms)
+    turn_versions = [game.version]
+
+    def on_action(action):
+        index = len(game.actions)
+        if index < len(scenario):
+            game.set_status(refresh_deadline(scenario[index]))
+            turn_versions.append(game.version)
+        return None
+
+    game.on_action = on_action
+
+    workdir = tempfile.mkdtemp(prefix=f"conformance-{name}-")
+    env = dict(
+        os.environ,
+        WEREWOLF_GAME_ID=str(scenario[0].get("gameId")),
+        WEREWOLF_PLAYER_ID=f"{name}-player",
+        WEREWOLF_PLAYER_INDEX=str(seat),
+        WEREWOLF_PLAYER_ROLE=str(scenario[0].get("myRole")),
+        WEREWOLF_GAME_TOKEN="conformance",
+        WEREWOLF_API_BASE_URL=f"http://127.0.0.1:{game_server.server_address[1]}",
+        WEREWOLF_POLL_INTERVAL=str(poll_interval),
+        DEEPSEEK_KEY="conformance",
+        LLM_API_URL=f"http://127.0.0.1:{llm_server.server_address[1]}/v1/chat/completions",
+        PYTHONUNBUFFERED="1",
+    )
+    for key in ("PLAYER_TASK_TYPE", "PLAYER_TASK_NAME", "PLAYER_TASK_DESCRIPTION", "PLAYER_TASK_REWARD"):
+        env.pop(key, None)
+
+    log_path = os.path.join(workdir, "agent.log")
+    memory: Dict[str, int] = {}
+    started = time.time()
+    with open(log_path, "w") as log:
+        process = subprocess.Popen(AGENT_COMMANDS[name], cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        completed = False
+        while time.time() - started < timeout:
+            sample = read_memory_kb(process.pid)
+            for key, value in sample.items():
+                memory[key] = max(memory.get(key, 0), value)
+            if len(game.actions) >= len(scenario) - 1:
+                completed = True
+                break
+            if process.poll() is not None:
+                break
+            time.sleep(0.05)
+        # 让 Agent 看到 finished 状态自行退出，超时再强制结束
+        deadline = time.time() + max(2.0, poll_interval / 1000 * 3)
+        while process.poll() is None and time.time() < deadline:
+            sample = read_memory_kb(process.pid)
+            for key, value in sample.items():
+                memory[key] = max(memory.get(key, 0), value)
+            time.sleep(0.05)
+        if process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    game_server.shutdown()
+    llm_server.shutdown()
+
+    # 各阶段耗时：按回合把状态首次返回、LLM 请求、行动到达对齐
+    stages: Dict[str, List[float]] = {"startup": [], "decide": [], "submit": [], "turn": []}
+    if game.ready_at:
+        stages["startup"].append((game.ready_at[0] - started) * 1000)
+    requests_by_turn: List[List[Dict[str, Any]]] = [[] for _ in game.actions]
+    for request in llm.requests:
+        for turn, action_at in enumerate(game.action_at):
+            if request["receivedAt"] <= action_at:
+                requests_by_turn[turn].append(request)
+                break
+    for turn, action_at in enumerate(game.action_at):
+        served_at = game.served_at.get(turn_versions[turn]) if turn < len(turn_versions) else None
+        if served_at is None:
+            continue
+        stages["turn"].append((action_at - served_at) * 1000)
+        turn_requests = requests_by_turn[turn]
+        if turn_requests:
+            stages["decide"].append((turn_requests[0]["receivedAt"] - served_at) * 1000)
+            if "respondedAt" in turn_requests[-1]:
+                stages["submit"].append((action_at - turn_requests[-1]["respondedAt"]) * 1000)
+
+    with open(log_path, errors="replace") as f:
+        log_tail = f.read()[-2000:]
+    shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "prompts": [[r["body"].get("messages") for r in turn] for turn in requests_by_turn],
+        "actions": list(game.actions),
+        "stages": stages,
+        "memory": memory,
+        "completed": completed,
+        "log": log_tail,
+    }
+
+
+def diff_messages(left: Optional[List[Dict[str, str]]], right: Optional[List[Dict[str, str]]], limit: int) -> List[str]:
+    """两组消息的逐行 diff（最多 limit 行）"""
+    def lines(messages):
+        result = []
+        for message in messages or []:
+            result.append(f"[{message.get('role')}]")
+            result.extend(str(message.get("content", "")).splitlines())
+        return result
+
+    diff = list(difflib.unified_diff(lines(left), lines(right), "python", "js", lineterm="", n=0))
+    return diff[:limit] + ([f"... 另有 {len(diff) - limit} 行差异"] if len(diff) > limit else [])
+
+
+def _fmt(values: List[float]) -> str:
+    if not values:
+        return "-"
+    return f"{statistics.median(values):.1f} / {max(values):.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Python / JS Agent 一致性与性能对比")
+    parser.add_argument("--turns", type=int, default=6, help="场景中的行动回合数")
+    parser.add_argument("--seat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-delay-ms", type=int, default=0, help="LLM 替身的模拟耗时")
+    parser.add_argument("--poll-interval", type=int, default=200, help="Agent 轮询间隔（毫秒）")
+    parser.add_argument("--timeout", type=float, default=120, help="单个 Agent 的超时（秒）")
+    parser.add_argument("--diff-lines", type=int, default=20, help="每个回合最多显示的 diff 行数")
+    parser.add_argument("--agents", default="python,js")
+    parser.add_argument("--json", help="把完整结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    scenario = build_scenario(args.seat, args.seed, args.turns)
+    turn_names = [f"{s.get('day')}-{s.get('phase')}-{s['myTurn'].get('actionType')}" for s in scenario[:-1]]
+    print(f"[对比] 场景: 座位 {args.seat}（{scenario[0].get('myRole')}），{len(turn_names)} 个回合: {', '.join(turn_names)}")
+
+    names = args.agents.split(",")
+    results = {}
+    for name in names:
+        print(f"[对比] 运行 {name} Agent ...")
+        results[name] = run_agent(
+            name, scenario, args.seat, args.seed, args.llm_delay_ms, args.poll_interval, args.timeout
+        )
+        if not results[name]["completed"]:
+            print(f"[对比] ⚠ {name} Agent 未完成全部回合（{len(results[name]['actions'])}/{len(turn_names)}），日志末尾:")
+            print(results[name]["log"])
+
+    print()
+    print(f"{'阶段 (ms, 中位数 / 最大)':<28}" + "".join(f"{name:>22}" for name in names))
+    for stage in ("startup", "decide", "submit", "turn"):
+        print(f"{stage:<28}" + "".join(f"{_fmt(results[n]['stages'][stage]):>22}" for n in names))
+    for key in ("VmHWM", "VmRSS"):
+        print(f"{key + ' (MB, 峰值)':<28}" + "".join(f"{results[n]['memory'].get(key, 0) / 1024:>22.1f}" for n in names))
+
+    if len(names) == 2:
+        left, right = (results[n] for n in names)
+        print()
+        differences = 0
+        for turn, turn_name in enumerate(turn_names):
+            left_prompts = left["prompts"][turn] if turn < len(left["prompts"]) else []
+            right_prompts = right["prompts"][turn] if turn < len(right["prompts"]) else []
+            left_action = left["actions"][turn] if turn < len(left["actions"]) else None
+            right_action = right["actions"][turn] if turn < len(right["actions"]) else None
+            prompt_diff = diff_messages(
+                left_prompts[0] if left_prompts else None, right_prompts[0] if right_prompts else None, args.diff_lines
+            )
+            if len(left_prompts) != len(right_prompts):
+                print(f"[对比] {turn_name}: LLM 请求次数 {names[0]}={len(left_prompts)} {names[1]}={len(right_prompts)}")
+                differences += 1
+            if prompt_diff:
+                print(f"[对比] {turn_name}: 提示词不一致")
+                for line in prompt_diff:
+                    print(f"    {line}")
+                differences += 1
+            if left_action != right_action:
+                print(f"[对比] {turn_name}: 行动不一致 {names[0]}={left_action} {names[1]}={right_action}")
+                differences += 1
+        print(f"[对比] {'✓ 提示词和行动完全一致' if not differences else f'✗ {differences} 处差异'}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"turns": turn_names, "results": results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+兜底策略
+
+不依赖 LLM 的规则策略：LLM 不可用、超时或给出非法行动时使用，保证总能提交一个合法行动。
+有发言要点索引时，投票、验人和刀人会参考本局的身份声明和报验人结果。
+有身份推算时，投票和验人优先选狼人概率最高的玩家，女巫只毒按硬事实确定是狼人的玩家（不依赖胜负规则的假设）。
+"""
+import random
+from typing import Dict, Any, List, Optional, Union
+
+try:
+    from .game_view import GameView, ActionContextView, Role, as_view, as_context
+except ImportError:
+    from game_view import GameView, ActionContextView, Role, as_view, as_context
+
+
+DEFAULT_SPEECH = "我是好人，过。"
+
+
+def _teammates(view: GameView, context: ActionContextView) -> List[int]:
+    """狼人队友编号（行动上下文优先，其次从玩家列表中的可见角色推断）"""
+    if context.teammates:
+        return list(context.teammates)
+    return view.werewolf_teammates()
+
+
+def _checked_targets(view: GameView) -> List[int]:
+    """我已经验过的玩家"""
+    my_index = view.my_index
+    checked = []
+    for msg in view.history:
+        metadata = msg.get("metadata") or {}
+        if str(metadata.get("metatype", "")).lower() == "check" and msg.get("playerIndex") == my_index:
+            checked.append(metadata.get("target"))
+    return checked
+
+
+def _pick(candidates: List[int], avoid: List[Any]) -> Optional[int]:
+    """优先从不在 avoid 中的候选里随机挑选，都被排除时退回全部候选"""
+    preferred = [c for c in candidates if c not in avoid]
+    pool = preferred or list(candidates)
+    return random.choice(pool) if pool else None
+
+
+def _pick_suspicious(
+    candidates: List[int],
+    avoid: List[Any],
+    hints: Optional[Dict[int, float]] = None,
+    odds: Optional[Dict[int, float]] = None,
+) -> Optional[int]:
+    """
+    先只保留身份推算中狼人概率最高的候选，再优先选本局发言线索得分最高的，否则同 _pick
+
+    Args:
+        candidates: 候选玩家
+        avoid: 尽量避开的玩家
+        hints: 本局发言线索得分（玩家编号 -> 分数，可选）
+        odds: 身份推算的狼人概率（玩家编号 -> 概率，可选）
+    """
+    preferred = [c for c in candidates if c not in avoid] or list(candidates)
+    if odds and preferred:
+        top = max(odds.get(c, 0) for c in preferred)
+        preferred = [c for c in preferred if odds.get(c, 0) == top]
+        candidates, avoid = preferred, []
+    hinted = [(hints[c], c) for c in preferred if hints and hints.get(c, 0) > 0]
+    if hinted:
+        return max(hinted)[1]
+    return _pick(candidates, avoid)
+
+
+def _speech_hints(view: GameView, context: ActionContextView, speech_index: Any) -> Dict[int, float]:
+    """
+    根据发言要点给玩家打分：分数越高越应该被投出（狼人视角下越应该被刀）
+
+    - 好人：被报查杀的玩家加分；给我报查杀的“预言家”必是假的，加更多分；被多人指认的玩家少量加分
+    - 预言家：其他声称预言家的玩家必是假的
+    - 狼人：非队友的预言家、女巫声明者
+    """
+    if speech_index is None:
+        return {}
+    my_index = view.my_index
+    hints: Dict[int, float] = {}
+
+    def add(player: Any, score: float):
+        if player is not None and player != my_index:
+            hints[player] = hints.get(player, 0) + score
+
+    if view.my_role is Role.WEREWOLF:
+        teammates = _teammates(view, context)
+        for player in speech_index.claimants(Role.SEER):
+            if player not in teammates:
+                add(player, 3)
+        for player in speech_index.claimants(Role.WITCH):
+            if player not in teammates:
+                add(player, 2)
+        return hints
+
+    liars = set()
+    if view.my_role is Role.SEER:
+        liars.update(p for p in speech_index.claimants(Role.SEER) if p != my_index)
+    for report in speech_index.check_reports:
+        if report["target"] == my_index and report["result"] == "werewolf":
+            liars.add(report["speaker"])
+    for player in liars:
+        add(player, 3)
+    for report in speech_index.check_reports:
+        if report["result"] == "werewolf" and report["speaker"] not in liars:
+            add(report["target"], 2)
+    for player, count in speech_index.accusation_counts().items():
+        add(player, 0.5 * count)
+    return hints
+
+
+def decide_fallback_action(
+    game_status: Union[GameView, Dict[str, Any]],
+    action_context: Union[ActionContextView, Dict[str, Any]],
+    task: Optional[Dict[str, Any]] = None,
+    speech_index: Any = None,
+    role_solver: Any = None,
+) -> Dict[str, Any]:
+    """
+    规则兜底决策
+
+    Args:
+        game_status: 游戏状态（GameView 或原始字典）
+        action_context: 行动上下文（ActionContextView 或原始字典）
+        task: 任务信息（可选）
+        speech_index: 发言要点索引 SpeechIndex（可选）
+        role_solver: 身份推算 RoleSolver（可选，调用方负责更新），优先于发言要点
+
+    Returns:
+        合法的行动对象
+    """
+    view = as_view(game_status)
+    context = as_context(action_context)
+    action_type = context.action_type
+    my_index = view.my_index
+    day = view.day
+    task_type = (task or {}).get("type")
+    hints = _speech_hints(view, context, speech_index)
+    odds = role_solver.probabilities() if role_solver is not None else {}
+    certain_wolves = role_solver.certain_wolves() if role_solver is not None else []
+
+    if action_type == "kill":
+        targets = context.available_targets
+        if task_type == "self_kill_werewolf" and day == 1 and my_index in targets:
+            return {"actionType": "kill", "target": my_index}
+        avoid = _teammates(view, context) + [my_index]
+        return {"actionType": "kill", "target": _pick_suspicious(targets, avoid, hints)}
+
+    if action_type == "check":
+        targets = context.available_targets
+        return {
+            "actionType": "check",
+            "target": _pick_suspicious(targets, _checked_targets(view) + [my_index], hints, odds),
+        }
+
+    if action_type == "witch_action":
+        killed = context.killed_player
+        can_heal = killed is not None and context.has_heal_potion
+        if task_type == "cold_witch" and day == 1:
+            can_heal = False
+        if task_type == "heal_allergy_witch" and killed == my_index:
+            can_heal = False
+        if can_heal:
+            return {"actionType": "witch_action", "action": "heal"}
+        can_poison = context.has_poison_potion and not (task_type == "cold_witch" and day == 1)
+        certain = [t for t in context.poison_targets if t != my_index and t in certain_wolves]
+        if can_poison and certain:
+            return {"actionType": "witch_action", "action": "poison", "target": certain[0]}
+        return {"actionType": "witch_action", "action": "skip"}
+
+    if action_type == "vote":
+        targets = context.available_targets
+        avoid = _teammates(view, context) + [my_index]
+        return {"actionType": "vote", "target": _pick_suspicious(targets, avoid, hints, odds)}
+
+    if action_type == "pk_vote":
+        candidates = context.pk_candidates
+        avoid = _teammates(view, context) + [my_index]
+        return {"actionType": "pk_vote", "target": _pick_suspicious(candidates, avoid, hints, odds)}
+
+    if action_type in ("speech", "last_words", "pk_speech"):
+        return {"actionType": action_type, "content": DEFAULT_SPEECH}
+
+    return {"actionType": action_type or "skip"}
@@ -0,0 +1,231 @@
+"""
+游戏状态视图
+
+每次轮询把 /status 的 data 解析一次，得到只读的类型化视图：
+- Role / Phase 枚举：角色统一成大写英文（兼容 "werewolf"、"WEREWOLF"、"狼人" 等写法），阶段统一成枚举
+- PlayerView / TurnView / ActionContextView / GameView 使用 __slots__，字段在构造时一次取好，
+  之后各模块直接读属性，不再反复对嵌套字典做链式 .get()
+
+提示词里需要原样输出的字段（角色、阶段原文等）保留在 *_text 属性中，保证提示词与原始数据一致。
+历史消息保持原始字典列表（由提示词构建器和发言索引增量处理）。
+"""
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class Role(str, Enum):
+    """角色"""
+
+    WEREWOLF = "WEREWOLF"
+    SEER = "SEER"
+    WITCH = "WITCH"
+    VILLAGER = "VILLAGER"
+
+    @classmethod
+    def parse(cls, value: Any) -> Optional["Role"]:
+        """
+        解析角色，兼容大小写和中文名
+
+        Args:
+            value: 原始角色值
+
+        Returns:
+            角色，无法识别或为空时返回 None
+        """
+        if not value:
+            return None
+        return _ROLE_ALIASES.get(str(value).strip().lower())
+
+    @property
+    def is_good(self) -> bool:
+        return self is not Role.WEREWOLF
+
+
+_ROLE_ALIASES = {
+    "werewolf": Role.WEREWOLF,
+    "wolf": Role.WEREWOLF,
+    "狼人": Role.WEREWOLF,
+    "狼": Role.WEREWOLF,
+    "seer": Role.SEER,
+    "预言家": Role.SEER,
+    "witch": Role.WITCH,
+    "女巫": Role.WITCH,
+    "villager": Role.VILLAGER,
+    "平民": Role.VILLAGER,
+    "村民": Role.VILLAGER,
+}
+
+
+class Phase(str, Enum):
+    """游戏阶段"""
+
+    GAME_SETTING = "game_setting"
+    NIGHT = "night"
+    DAY_SPEECH = "day_speech"
+    DAY_VOTE = "day_vote"
+    PK_SPEECH = "pk_speech"
+    PK_VOTE = "pk_vote"
+    GAME_OVER = "game_over"
+
+    @classmethod
+    def parse(cls, value: Any) -> Optional["Phase"]:
+        """解析阶段，无法识别时返回 None"""
+        return _PHASES.get(str(value).strip().lower()) if value else None
+
+
+_PHASES = {phase.value: phase for phase in Phase}
+
+
+def _parse_deadline(deadline: Any) -> Optional[float]:
+    """ISO 时间字符串转时间戳，无法解析时返回 None"""
+    if not deadline:
+        return None
+    try:
+        return datetime.fromisoformat(deadline.replace("Z", "+00:00")).timestamp()
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class PlayerView:
+    """玩家"""
+
+    __slots__ = ("index", "name", "is_alive", "role", "role_text")
+
+    def __init__(self, player: Dict[str, Any]):
+        self.index: Any = player.get("playerIndex")
+        self.name: Any = player.get("name")
+        self.is_alive = bool(player.get("isAlive"))
+        # 原始角色文本（只有可见时才有，例如狼人队友、结算时）
+        self.role_text: Any = player.get("role")
+        self.role = Role.parse(self.role_text)
+
+
+class ActionContextView:
+    """行动上下文"""
+
+    __slots__ = (
+        "raw",
+        "action_type",
+        "deadline",
+        "deadline_ts",
+        "hint",
+        "available_targets",
+        "pk_candidates",
+        "teammates",
+        "killed_player",
+        "has_heal_potion",
+        "has_poison_potion",
+        "poison_targets",
+        "death_reason",
+    )
+
+    def __init__(self, context: Optional[Dict[str, Any]] = None):
+        context = context or {}
+        self.raw = context
+        self.action_type: Optional[str] = context.get("actionType")
+        self.deadline: Any = context.get("deadline")
+        self.deadline_ts = _parse_deadline(self.deadline)
+        self.hint: Any = context.get("hint")
+        self.available_targets: List[Any] = context.get("availableTargets") or []
+        self.pk_candidates: List[Any] = context.get("pkCandidates") or []
+        self.teammates: List[Any] = context.get("teammates") or []
+        self.killed_player: Any = context.get("killedPlayer")
+        self.has_heal_potion = bool(context.get("hasHealPotion", False))
+        self.has_poison_potion = bool(context.get("hasPoisonPotion", False))
+        self.poison_targets: List[Any] = context.get("availablePoisonTargets") or []
+        self.death_reason: Any = context.get("deathReason", "")
+
+    def remaining_seconds(self) -> int:
+        """距离截止时间的剩余秒数，没有截止时间时返回 0（提示词展示用）"""
+        if self.deadline_ts is None:
+            return 0
+        return max(0, int(self.deadline_ts - datetime.now().timestamp()))
+
+    def seconds_left(self) -> Optional[int]:
+        """距离截止时间的剩余秒数，没有或无法解析截止时间时返回 None（调度判断用，不当作时间紧张）"""
+        if self.deadline_ts is None:
+            return None
+        return self.remaining_seconds()
+
+
+class TurnView:
+    """我的回合（myTurn）"""
+
+    __slots__ = ("can_act", "action_type", "remaining_time", "context")
+
+    def __init__(self, turn: Optional[Dict[str, Any]] = None):
+        turn = turn or {}
+        self.can_act = bool(turn.get("canAct"))
+        self.action_type: Optional[str] = turn.get("actionType")
+        self.remaining_time: Any = turn.get("remainingTime")
+        self.context = ActionContextView(turn.get("actionContext"))
+
+
+class GameView:
+    """一次 /status 响应的类型化视图"""
+
+    __slots__ = (
+        "raw",
+        "game_id",
+        "status",
+        "day",
+        "phase",
+        "phase_text",
+        "my_index",
+        "my_role",
+        "my_role_text",
+        "my_is_alive",
+        "has_heal_potion",
+        "has_poison_potion",
+        "alive",
+        "players",
+        "history",
+        "turn",
+    )
+
+    def __init__(self, status: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            status: /status 接口返回的 data
+        """
+        status = status or {}
+        self.raw = status
+        self.game_id: Any = status.get("gameId")
+        self.status: Any = status.get("status")
+        self.day: Any = status.get("day")
+        self.phase_text: Any = status.get("phase")
+        self.phase = Phase.parse(self.phase_text)
+        self.my_index: Any = status.get("myPlayerIndex")
+        self.my_role_text: Any = status.get("myRole")
+        self.my_role = Role.parse(self.my_role_text)
+        self.my_is_alive = bool(status.get("myIsAlive"))
+        self.has_heal_potion = bool(status.get("myHasHealPotion"))
+        self.has_poison_potion = bool(status.get("myHasPoisonPotion"))
+        self.alive: List[Any] = status.get("alivePlayerIndexes") or []
+        self.players: Tuple[PlayerView, ...] = tuple(PlayerView(p) for p in status.get("players") or ())
+        self.history: List[Dict[str, Any]] = status.get("history") or []
+        self.turn = TurnView(status.get("myTurn"))
+
+    @property
+    def turn_key(self) -> str:
+        """回合唯一标识：day + phase + actionType"""
+        return f"{self.day}-{self.phase_text}-{self.turn.action_type or ''}"
+
+    def werewolf_teammates(self, alive_only: bool = False) -> List[Any]:
+        """可见的狼人队友编号（不含自己）"""
+        return [
+            p.index
+            for p in self.players
+            if p.role is Role.WEREWOLF and p.index != self.my_index and (p.is_alive or not alive_only)
+        ]
+
+
+def as_view(game_status: Any) -> GameView:
+    """接受 GameView 或原始状态字典，统一返回 GameView（已经是视图时不重复解析）"""
+    return game_status if isinstance(game_status, GameView) else GameView(game_status)
+
+
+def as_context(action_context: Any) -> ActionContextView:
+    """接受 ActionContextView 或原始 actionContext 字典，统一返回 ActionContextView"""
+    return action_context if isinstance(action_context, ActionContextView) else ActionContextView(action_context)
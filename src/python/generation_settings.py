@@ -0,0 +1,140 @@
+"""
+按行动类型的生成参数
+
+只选目标的行动（杀人、验人、女巫、投票）输出是一个很短的扁平 JSON 对象，
+限制 max_tokens 并在第一个 "}" 处停止；服务端支持时开启 JSON 模式（response_format = json_object）。
+发言类行动不开 JSON 模式：JSON 模式下达到 max_tokens 的输出是不合法的 JSON，而不开时解析器还能取出已生成的发言；
+max_tokens 只用来防止失控的长输出，正常发言远达不到。
+
+同时按行动类型统计生成的 token 数和耗时，用于比较调参前后的效果。
+"""
+import threading
+from typing import Any, Dict, List, Optional
+
+# 选目标的行动：{"actionType": "witch_action", "action": "poison", "target": 3} 约 20 个 token
+TARGET_ACTION_SETTINGS: Dict[str, Any] = {"maxTokens": 64, "stop": ["}"], "jsonMode": True}
+# 发言：服务端发言没有字数限制，上限只防失控的长输出；被截断时解析器取出已生成的部分
+SPEECH_SETTINGS: Dict[str, Any] = {"maxTokens": 1024, "stop": None, "jsonMode": False}
+
+GENERATION_SETTINGS: Dict[str, Dict[str, Any]] = {
+    "kill": TARGET_ACTION_SETTINGS,
+    "check": TARGET_ACTION_SETTINGS,
+    "witch_action": TARGET_ACTION_SETTINGS,
+    "vote": TARGET_ACTION_SETTINGS,
+    "pk_vote": TARGET_ACTION_SETTINGS,
+    "speech": SPEECH_SETTINGS,
+    "last_words": SPEECH_SETTINGS,
+    "pk_speech": SPEECH_SETTINGS,
+}
+
+
+def get_generation_settings(action_type: str) -> Dict[str, Any]:
+    """
+    获取某个行动类型的生成参数
+
+    Args:
+        action_type: 行动类型
+
+    Returns:
+        生成参数（含 actionType，供客户端按行动类型统计）：
+            - maxTokens: 最多生成的 token 数
+            - stop: 停止序列列表或 None
+            - jsonMode: 是否请求 JSON 模式（客户端配置了 jsonMode 时才生效）
+    """
+    settings = GENERATION_SETTINGS.get(action_type, SPEECH_SETTINGS)
+    return dict(settings, actionType=action_type)
+
+
+def build_generation_payload(settings: Optional[Dict[str, Any]], json_mode_supported: bool) -> Dict[str, Any]:
+    """
+    把生成参数转换为 OpenAI 兼容接口的请求字段
+
+    Args:
+        settings: 生成参数（可选）
+        json_mode_supported: 服务端是否支持 response_format
+
+    Returns:
+        需要合并进请求体的字段
+    """
+    if not settings:
+        return {}
+    payload: Dict[str, Any] = {}
+    if settings.get("maxTokens"):
+        payload["max_tokens"] = settings["maxTokens"]
+    if settings.get("stop"):
+        payload["stop"] = settings["stop"]
+    if settings.get("jsonMode") and json_mode_supported:
+        payload["response_format"] = {"type": "json_object"}
+    return payload
+
+
+def restore_stop_sequence(content: str, settings: Optional[Dict[str, Any]], finish_reason: Optional[str]) -> str:
+    """
+    停止序列不会出现在输出里：因 "}" 停止时补回结尾的 "}"
+
+    Args:
+        content: 模型输出
+        settings: 本次请求的生成参数
+        finish_reason: 响应中的 finish_reason
+
+    Returns:
+        补全后的输出
+    """
+    if finish_reason == "stop" and settings and "}" in (settings.get("stop") or []):
+        if content.count("{") > content.count("}"):
+            return content + "}"
+    return content
+
+
+class GenerationStats:
+    """按行动类型累计 LLM 调用次数、生成 token 数和耗时"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries: Dict[str, List[int]] = {}
+
+    def record(self, action_type: str, completion_tokens: int, elapsed_ms: int, truncated: bool = False):
+        """
+        记录一次调用
+
+        Args:
+            action_type: 行动类型
+            completion_tokens: 生成的 token 数
+            elapsed_ms: 请求耗时（毫秒）
+            truncated: 是否因 max_tokens 被截断
+        """
+        with self.lock:
+            entry = self.entries.setdefault(action_type, [0, 0, 0, 0])
+            entry[0] += 1
+            entry[1] += completion_tokens
+            entry[2] += elapsed_ms
+            entry[3] += int(truncated)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        每个行动类型的统计
+
+        Returns:
+            行动类型 -> {"calls", "avgTokens", "avgMs", "truncated"}
+        """
+        with self.lock:
+            return {
+                action_type: {
+                    "calls": calls,
+                    "avgTokens": tokens / calls,
+                    "avgMs": elapsed / calls,
+                    "truncated": truncated,
+                }
+                for action_type, (calls, tokens, elapsed, truncated) in sorted(self.entries.items())
+            }
+
+    def format_lines(self) -> List[str]:
+        """用于日志输出的统计行"""
+        return [
+            f"{action_type:<12} {s['calls']:>4} 次  平均 {s['avgTokens']:.0f} tokens  {s['avgMs']:.0f}ms  截断 {s['truncated']}"
+            for action_type, s in self.summary().items()
+        ]
+
+
+# 进程内共享的统计
+default_generation_stats = GenerationStats()
@@ -4,9 +4,23 @@ LLM 客户端
 依据自身的选择进行实现，这里以调用deepseek的API为例（参照提供的接入文档进行实现调整）
 """
 import json
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import requests
-from typing import List, Dict, Any
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Any, Optional, Tuple
+
+try:
+    from .llm_scheduler import AnyEvent, LLMCancelledError, LLMRequestShed, Priority, default_scheduler
+    from .generation_settings import build_generation_payload, restore_stop_sequence, default_generation_stats
+except ImportError:
+    from llm_scheduler import AnyEvent, LLMCancelledError, LLMRequestShed, Priority, default_scheduler
+    from generation_settings import build_generation_payload, restore_stop_sequence, default_generation_stats
+
+
+# 发送请求的工作线程（所有客户端共享，不再每次请求新建线程）
+_POST_EXECUTOR = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-post")
 
 
 class LLMClient:
@@ -21,59 +35,167 @@ class LLMClient:
                 - apiKey: API Key
                 - modelName: 模型名称
                 - apiUrl: API 地址，默认使用提供的地址
+                - scheduler: 请求调度器（可选），默认使用进程内共享的调度器
+                - rateLimit: 该 API 地址每秒请求数上限（可选）
+                - maxConcurrency: 该 API 地址并发上限（可选）
+                - jsonMode: 服务端是否支持 response_format JSON 模式（可选），默认 False
+                - generationStats: 按行动类型的生成统计（可选），默认使用进程内共享的统计
         """
         self.api_key = config.get("apiKey")
         self.model_name = config.get("modelName")
         self.api_url = config.get("apiUrl")
+        self.scheduler = config.get("scheduler") or default_scheduler
+        self.json_mode = bool(config.get("jsonMode"))
+        self.stats = config.get("generationStats") or default_generation_stats
+        # 同一客户端的请求复用连接（连接池是线程安全的）
+        self.session = requests.Session()
+        for prefix in ("https://", "http://"):
+            self.session.mount(prefix, HTTPAdapter(pool_connections=1, pool_maxsize=16))
+        self.headers = {
+            "Content-Type": "application/json",
+            "Accept": "text/event-stream, application/json",
+            "Authorization": f"Bearer {self.api_key}",
+        }
+        if config.get("rateLimit") or config.get("maxConcurrency"):
+            self.scheduler.configure(
+                self.api_url,
+                rate=config.get("rateLimit"),
+                burst=config.get("rateLimit"),
+                max_concurrency=config.get("maxConcurrency"),
+            )
 
-    def chat(self, messages: List[Dict[str, str]]) -> str:
+    def chat(
+        self,
+        messages: List[Dict[str, str]],
+        cancel_event: Optional[threading.Event] = None,
+        priority: Priority = Priority.NORMAL,
+        generation: Optional[Dict[str, Any]] = None,
+    ) -> str:
         """
         调用大语言模型接口
 
         Args:
             messages: 消息列表，每个消息包含 role 和 content
+            cancel_event: 取消事件（可选），排队或请求期间被设置时立即放弃并抛出 LLMCancelledError
+            priority: 调度优先级，默认 NORMAL；SPECULATIVE / BACKGROUND 请求可能被关键请求丢弃或抢占（LLMRequestShed）
+            generation: 生成参数（可选），见 generation_settings.get_generation_settings；
+                请求完成后客户端把响应的 finish_reason 写入其中的 finishReason（解析器据此判断发言是否被截断）
 
         Returns:
             模型生成的文本
         """
-        print(f"[LLM]   Messages: {len(messages)} 条")
+        print(f"[LLM]   Messages: {len(messages)} 条, 优先级: {priority.name}")
+
+        queued_at = time.time()
+        ticket = self.scheduler.reserve(self.api_url, priority, cancel_event)
+        queued = int((time.time() - queued_at) * 1000)
+        if queued > 0:
+            print(f"[LLM]   排队 {queued}ms")
+        # 调用方取消或被关键请求抢占时，工作线程都会关闭连接
+        request_cancel = AnyEvent(cancel_event, ticket.preempt_event)
+        try:
+            future = _POST_EXECUTOR.submit(self._chat, messages, request_cancel, generation)
+        except BaseException:
+            self.scheduler.release(self.api_url, ticket)
+            raise
+        # 名额在工作线程结束（连接关闭）后才归还，调用方因取消先返回时不会超出并发上限
+        future.add_done_callback(lambda _: self.scheduler.release(self.api_url, ticket))
+        while True:
+            try:
+                return future.result(timeout=0.05)
+            except FutureTimeoutError:
+                pass
+            except LLMCancelledError:
+                if ticket.preempt_event.is_set():
+                    raise LLMRequestShed(f"{priority.name} 请求被关键请求抢占")
+                raise
+            if ticket.preempt_event.is_set():
+                print(f"[LLM] ⏹ {priority.name} 请求被关键请求抢占")
+                raise LLMRequestShed(f"{priority.name} 请求被关键请求抢占")
+            if cancel_event is not None and cancel_event.is_set():
+                print("[LLM] ⏹ 请求被取消（回合已过期）")
+                raise LLMCancelledError("LLM 请求已取消")
+
+    def _chat(self, messages: List[Dict[str, str]], cancel_event, generation: Optional[Dict[str, Any]] = None) -> str:
+        """
+        以流式（SSE）请求发送并解析响应，在调度器分配的名额内、共享线程池中执行
 
+        取消事件（任何带 is_set() 的对象）在每个数据块之间检查，被设置时关闭连接，服务端随即停止生成；
+        还在等第一个数据块时无法打断（requests 不能中断正在等待的 socket），最多等到 30 秒超时。
+        """
         start_time = time.time()
         try:
-            response = requests.post(
-                self.api_url,
-                headers={
-                    "Content-Type": "application/json",
-                    "Accept": "application/json",
-                    "Authorization": f"Bearer {self.api_key}",
-                },
-                json={
-                    "model": self.model_name,
-                    "messages": messages,
-                },
-                timeout=30,
-            )
+            payload = {
+                "model": self.model_name,
+                "messages": messages,
+                "stream": True,
+            }
+            payload.update(build_generation_payload(generation, self.json_mode))
+            response = self.session.post(self.api_url, headers=self.headers, json=payload, timeout=30, stream=True)
+            with response:
+                if not response.ok:
+                    elapsed = int((time.time() - start_time) * 1000)
+                    print(
+                        f"[LLM] ❌ 响应失败: {response.status_code} {response.reason} ({elapsed}ms)"
+                    )
+                    print(f"[LLM] 错误详情: {response.text}")
+                    raise Exception(f"HTTP {response.status_code}: {response.reason}")
+                if "text/event-stream" in response.headers.get("Content-Type", ""):
+                    content, finish_reason, completion_tokens = self._read_stream(response, cancel_event)
+                else:
+                    # 服务端忽略了 stream 参数，按普通响应解析
+                    content, finish_reason, completion_tokens = self._read_body(response)
 
             elapsed = int((time.time() - start_time) * 1000)
-
-            if not response.ok:
-                error_text = response.text
-                print(
-                    f"[LLM] ❌ 响应失败: {response.status_code} {response.reason} ({elapsed}ms)"
-                )
-                print(f"[LLM] 错误详情: {error_text}")
-                raise Exception(f"HTTP {response.status_code}: {response.reason}")
-
-            data = response.json()
-            print(f"[LLM] ✅ 响应成功 ({elapsed}ms)")
-
-            # 解析响应
-            if data.get("choices") and len(data["choices"]) > 0:
-                content = data["choices"][0].get("message", {}).get("content", "")
-                return content
-            else:
-                raise Exception("LLM 响应中没有 choices 字段")
+            print(f"[LLM] ✅ 响应成功 ({elapsed}ms, {completion_tokens} tokens)")
+            if generation:
+                generation["finishReason"] = finish_reason
+                truncated = finish_reason == "length"
+                if truncated:
+                    print(f"[LLM] ⚠ 输出达到 max_tokens={generation.get('maxTokens')} 被截断")
+                self.stats.record(generation.get("actionType", "unknown"), completion_tokens, elapsed, truncated)
+            return restore_stop_sequence(content, generation, finish_reason)
         except requests.exceptions.RequestException as e:
             print(f"[LLM] 请求出错: {str(e)}")
             raise
 
+    @staticmethod
+    def _read_stream(response: requests.Response, cancel_event) -> Tuple[str, Optional[str], int]:
+        """
+        逐行读取 SSE 响应
+
+        Returns:
+            (文本, finish_reason, 生成的 token 数)；服务端没有返回 usage 时按内容块数估算 token 数
+        """
+        parts: List[str] = []
+        finish_reason = None
+        usage = None
+        for line in response.iter_lines():
+            if cancel_event is not None and cancel_event.is_set():
+                raise LLMCancelledError("LLM 请求已取消")
+            if not line.startswith(b"data:"):
+                continue
+            data = line[5:].strip()
+            # [DONE] 之后继续读到流结束，连接才能放回连接池复用
+            if data == b"[DONE]":
+                continue
+            chunk = json.loads(data)
+            usage = chunk.get("usage") or usage
+            for choice in chunk.get("choices") or []:
+                delta = (choice.get("delta") or {}).get("content")
+                if delta:
+                    parts.append(delta)
+                finish_reason = choice.get("finish_reason") or finish_reason
+        completion_tokens = (usage or {}).get("completion_tokens", len(parts))
+        return "".join(parts), finish_reason, completion_tokens
+
+    @staticmethod
+    def _read_body(response: requests.Response) -> Tuple[str, Optional[str], int]:
+        """解析非流式响应，返回值同 _read_stream"""
+        data = json.loads(response.content)
+        if not data.get("choices"):
+            raise Exception("LLM 响应中没有 choices 字段")
+        choice = data["choices"][0]
+        content = choice.get("message", {}).get("content", "") or ""
+        completion_tokens = (data.get("usage") or {}).get("completion_tokens", 0)
+        return content, choice.get("finish_reason"), completion_tokens
@@ -0,0 +1,235 @@
+"""
+LLM 请求调度器
+
+所有 LLMClient 共享一个进程内调度器，按 API 地址（endpoint）分别限制：
+- 令牌桶限速（每秒请求数 + 突发容量）
+- 并发上限
+
+请求按优先级排队（CRITICAL < NORMAL < SPECULATIVE < BACKGROUND，数值小的先出队），同一优先级先来先出。
+CRITICAL 请求到达时：
+- 队列中的 SPECULATIVE / BACKGROUND 请求直接丢弃（抛出 LLMRequestShed）
+- 没有空闲并发时，抢占正在进行的 SPECULATIVE / BACKGROUND 请求（设置票据的抢占事件，客户端据此关闭连接）
+排队期间调用方的取消事件被设置时放弃排队，抛出 LLMCancelledError（与请求进行中被取消一致）。
+reserve 得到的名额由调用方在请求真正结束（连接关闭）后 release，取消后提前返回的调用方不会提前让出名额。
+"""
+import heapq
+import itertools
+import threading
+import time
+from enum import IntEnum
+from typing import Dict, List, Optional
+
+
+class Priority(IntEnum):
+    """请求优先级，数值越小越优先"""
+
+    CRITICAL = 0  # 截止时间临近的回合
+    NORMAL = 1  # 普通回合决策
+    SPECULATIVE = 2  # 可以放弃的额外请求（行动不合法时的重问等）
+    BACKGROUND = 3  # 后台任务（离线基准等）
+
+
+PREEMPTIBLE = (Priority.SPECULATIVE, Priority.BACKGROUND)
+
+
+class LLMCancelledError(Exception):
+    """请求所属的回合已过期，LLM 请求（排队中或进行中）被取消"""
+
+
+class LLMRequestShed(Exception):
+    """低优先级请求因关键请求到达而被丢弃或抢占"""
+
+
+class TokenBucket:
+    """令牌桶"""
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 桶容量（允许的突发请求数）
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def delay(self) -> float:
+        """距离下一个可用令牌还需要等待的秒数，0 表示现在可用"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self.tokens -= 1
+
+
+class AnyEvent:
+    """多个事件的组合视图，任意一个被设置即视为设置（供 LLMClient 轮询 is_set）"""
+
+    def __init__(self, *events: Optional[threading.Event]):
+        self.events = [e for e in events if e is not None]
+
+    def is_set(self) -> bool:
+        return any(e.is_set() for e in self.events)
+
+
+class Ticket:
+    """一次排队中的请求"""
+
+    __slots__ = ("priority", "seq", "preempt_event", "shed")
+
+    def __init__(self, priority: Priority, seq: int):
+        self.priority = priority
+        self.seq = seq
+        # 进行中的请求被关键请求抢占时设置
+        self.preempt_event = threading.Event()
+        # 排队中被关键请求挤掉
+        self.shed = False
+
+    def __lt__(self, other: "Ticket") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class EndpointLimiter:
+    """单个 endpoint 的限速和并发状态"""
+
+    def __init__(self, rate: float, burst: float, max_concurrency: int):
+        self.bucket = TokenBucket(rate, burst)
+        self.max_concurrency = max_concurrency
+        self.waiting: List[Ticket] = []
+        self.in_flight: List[Ticket] = []
+
+
+class LLMScheduler:
+    """按 endpoint 限速、限并发的优先级调度器"""
+
+    DEFAULT_RATE = 5.0
+    DEFAULT_BURST = 5.0
+    DEFAULT_MAX_CONCURRENCY = 4
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.endpoints: Dict[str, EndpointLimiter] = {}
+        self.counter = itertools.count()
+
+    def configure(
+        self,
+        endpoint: str,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+    ):
+        """
+        设置某个 endpoint 的限制（未设置的使用默认值）
+
+        Args:
+            endpoint: API 地址
+            rate: 每秒请求数
+            burst: 突发容量
+            max_concurrency: 并发上限
+        """
+        with self.cond:
+            limiter = self._limiter(endpoint)
+            if rate is not None:
+                limiter.bucket.rate = rate
+            if burst is not None:
+                limiter.bucket.capacity = burst
+                limiter.bucket.tokens = min(limiter.bucket.tokens, burst)
+            if max_concurrency is not None:
+                limiter.max_concurrency = max_concurrency
+            self.cond.notify_all()
+
+    def _limiter(self, endpoint: str) -> EndpointLimiter:
+        limiter = self.endpoints.get(endpoint)
+        if limiter is None:
+            limiter = EndpointLimiter(self.DEFAULT_RATE, self.DEFAULT_BURST, self.DEFAULT_MAX_CONCURRENCY)
+            self.endpoints[endpoint] = limiter
+        return limiter
+
+    def _make_room_for_critical(self, limiter: EndpointLimiter):
+        """关键请求到达：丢弃排队中的低优先级请求，并发已满时抢占一个进行中的低优先级请求"""
+        kept = []
+        for ticket in limiter.waiting:
+            if ticket.priority in PREEMPTIBLE:
+                ticket.shed = True
+            else:
+                kept.append(ticket)
+        if len(kept) != len(limiter.waiting):
+            limiter.waiting = kept
+            heapq.heapify(limiter.waiting)
+        if len(limiter.in_flight) >= limiter.max_concurrency:
+            victims = sorted(
+                (t for t in limiter.in_flight if t.priority in PREEMPTIBLE and not t.preempt_event.is_set()),
+                reverse=True,
+            )
+            if victims:
+                victims[0].preempt_event.set()
+
+    def reserve(
+        self,
+        endpoint: str,
+        priority: Priority = Priority.NORMAL,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> Ticket:
+        """
+        排队获取一个请求名额，用完后必须调用 release 归还
+
+        Args:
+            endpoint: API 地址
+            priority: 优先级
+            cancel_event: 调用方的取消事件（可选），排队期间被设置时放弃排队
+
+        Returns:
+            占用名额的票据（请求进行中被抢占时其 preempt_event 会被设置）
+
+        Raises:
+            LLMRequestShed: 排队中被关键请求挤掉
+            LLMCancelledError: 排队期间被调用方取消
+        """
+        with self.cond:
+            limiter = self._limiter(endpoint)
+            ticket = Ticket(priority, next(self.counter))
+            heapq.heappush(limiter.waiting, ticket)
+            if priority == Priority.CRITICAL:
+                self._make_room_for_critical(limiter)
+                self.cond.notify_all()
+
+            while True:
+                if ticket.shed:
+                    raise LLMRequestShed(f"{priority.name} 请求被关键请求挤掉")
+                if cancel_event is not None and cancel_event.is_set():
+                    limiter.waiting.remove(ticket)
+                    heapq.heapify(limiter.waiting)
+                    self.cond.notify_all()
+                    raise LLMCancelledError("排队期间请求被取消")
+                wait = 0.05
+                if limiter.waiting[0] is ticket and len(limiter.in_flight) < limiter.max_concurrency:
+                    delay = limiter.bucket.delay()
+                    if delay == 0:
+                        limiter.bucket.consume()
+                        heapq.heappop(limiter.waiting)
+                        limiter.in_flight.append(ticket)
+                        self.cond.notify_all()
+                        return ticket
+                    wait = min(wait, delay)
+                self.cond.wait(wait)
+
+    def release(self, endpoint: str, ticket: Ticket):
+        """归还 reserve 得到的名额"""
+        with self.cond:
+            self._limiter(endpoint).in_flight.remove(ticket)
+            self.cond.notify_all()
+
+    def stats(self, endpoint: str) -> Dict[str, int]:
+        """当前排队数和进行中的请求数"""
+        with self.cond:
+            limiter = self._limiter(endpoint)
+            return {"waiting": len(limiter.waiting), "inFlight": len(limiter.in_flight)}
+
+
+# 进程内共享的默认调度器
+default_scheduler = LLMScheduler()
@@ -0,0 +1,242 @@
+"""
+LLM 替身
+
+与 LLMClient.chat 接口兼容的客户端，用于离线自对弈、回放和测试：
+- StubLLMClient: 不联网，从行动提示词里读出行动类型和可选目标，随机给出一个合法的 JSON 行动
+- CachedLLMClient: 包装真实客户端，按消息内容缓存响应到 SQLite，同样的提示词只调用一次
+- start_stub_llm_server: 本地 OpenAI 兼容 HTTP 替身，第 i 个请求用种子 seed + i 的 StubLLMClient 生成响应，
+  不同语言的 Agent 按相同顺序请求时得到相同的响应；请求带 "stream": true 时按 SSE 分块返回
+"""
+import hashlib
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+try:
+    from .llm_scheduler import Priority
+except ImportError:
+    from llm_scheduler import Priority
+
+_ACTION_TYPE = re.compile(r"行动类型：(\w+)")
+_TARGET_LINE = re.compile(r"(?:可杀目标|可验目标|可投票目标|PK 候选人)：([\d, ]+)")
+_KILLED_PLAYER = re.compile(r"今晚被杀的玩家：(\d+)")
+_HEAL_AVAILABLE = "解药状态：有"
+
+STUB_SPEECHES = [
+    "我是好人，过。",
+    "目前信息不多，我先听后置位发言。",
+    "我觉得前面有人发言有点划水，需要再观察。",
+]
+
+
+class StubLLMClient:
+    """随机合法行动的离线 LLM 替身"""
+
+    def __init__(self, seed: Optional[int] = None):
+        """
+        Args:
+            seed: 随机种子（可选），用于复现
+        """
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    def chat(
+        self,
+        messages: List[Dict[str, str]],
+        cancel_event: Optional[threading.Event] = None,
+        priority: Priority = Priority.NORMAL,
+        generation: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        根据最后一条行动提示给出随机合法行动
+
+        Args:
+            messages: 消息列表
+            cancel_event: 取消事件（忽略，替身立即返回）
+            priority: 调度优先级（忽略）
+            generation: 生成参数（忽略）
+
+        Returns:
+            JSON 行动文本
+        """
+        self.calls += 1
+        prompt = messages[-1]["content"]
+        match = _ACTION_TYPE.search(prompt)
+        action_type = match.group(1) if match else "skip"
+        action: Dict[str, Any] = {"actionType": action_type}
+
+        targets_match = _TARGET_LINE.search(prompt)
+        targets = [int(t) for t in re.findall(r"\d+", targets_match.group(1))] if targets_match else []
+
+        if action_type in ("kill", "check", "vote", "pk_vote"):
+            action["target"] = self.rng.choice(targets) if targets else None
+        elif action_type == "witch_action":
+            killed = _KILLED_PLAYER.search(prompt)
+            if killed and _HEAL_AVAILABLE in prompt and self.rng.random() < 0.5:
+                action["action"] = "heal"
+            else:
+                action["action"] = "skip"
+        elif action_type in ("speech", "last_words", "pk_speech"):
+            action["content"] = self.rng.choice(STUB_SPEECHES)
+        return json.dumps(action, ensure_ascii=False)
+
+
+class CachedLLMClient:
+    """按消息内容缓存响应的 LLM 客户端包装"""
+
+    def __init__(self, client: Any, cache_path: str):
+        """
+        Args:
+            client: 真实的 LLM 客户端（需要 chat 方法）
+            cache_path: SQLite 缓存文件路径（可被多个进程共享）
+        """
+        self.client = client
+        self.cache_path = cache_path
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, response TEXT NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.cache_path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def cache_key(messages: List[Dict[str, str]]) -> str:
+        payload = json.dumps(messages, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def chat(
+        self,
+        messages: List[Dict[str, str]],
+        cancel_event: Optional[threading.Event] = None,
+        priority: Priority = Priority.NORMAL,
+        generation: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        命中缓存直接返回，否则调用真实客户端并写入缓存
+
+        Args:
+            messages: 消息列表
+            cancel_event: 取消事件（透传给真实客户端）
+            priority: 调度优先级（透传给真实客户端）
+            generation: 生成参数（透传给真实客户端，不影响缓存键）
+
+        Returns:
+            模型生成的文本
+        """
+        key = self.cache_key(messages)
+        conn = self._connect()
+        row = conn.execute("SELECT response FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row:
+            self.hits += 1
+            return row[0]
+        self.misses += 1
+        response = self.client.chat(messages, cancel_event, priority, generation)
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO llm_cache (key, response) VALUES (?, ?)", (key, response))
+        return response
+
+
+class StubLLMServerState:
+    """本地 LLM 替身服务器的请求记录"""
+
+    def __init__(self, seed: int, delay_ms: int):
+        self.seed = seed
+        self.delay_ms = delay_ms
+        self.lock = threading.Lock()
+        # 每个请求: {"body": 请求体, "receivedAt": 到达时间, "respondedAt": 响应时间, "content": 响应文本}
+        self.requests: List[Dict[str, Any]] = []
+
+    def respond(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        received_at = time.time()
+        with self.lock:
+            index = len(self.requests)
+            entry = {"body": body, "receivedAt": received_at}
+            self.requests.append(entry)
+
+        content = StubLLMClient(self.seed + index).chat(body.get("messages") or [])
+        finish_reason = "stop"
+        for stop in body.get("stop") or []:
+            if stop in content:
+                content = content[: content.index(stop)]
+        if self.delay_ms:
+            time.sleep(self.delay_ms / 1000)
+
+        entry["content"] = content
+        entry["respondedAt"] = time.time()
+        return {
+            "id": f"stub-{index}",
+            "object": "chat.completion",
+            "model": body.get("model"),
+            "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": finish_reason}
+            ],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(content), "total_tokens": len(content)},
+        }
+
+
+def start_stub_llm_server(seed: int = 0, delay_ms: int = 0, port: int = 0):
+    """
+    在后台线程启动 OpenAI 兼容的 LLM 替身服务器（任意路径的 POST 都按 chat/completions 处理）
+
+    Args:
+        seed: 随机种子
+        delay_ms: 每个响应的模拟耗时（毫秒）
+        port: 端口，0 表示自动分配
+
+    Returns:
+        (server, state)，server.server_address[1] 为实际端口
+    """
+    state = StubLLMServerState(seed, delay_ms)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            completion = state.respond(body)
+            if body.get("stream"):
+                self.send_stream(completion)
+                return
+            data = json.dumps(completion, ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def send_stream(self, completion: Dict[str, Any]):
+            """按 SSE 分块发送（每块几个字符），用 chunked 编码"""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            choice = completion["choices"][0]
+            content = choice["message"]["content"]
+            events = [{"choices": [{"index": 0, "delta": {"content": content[i : i + 4]}}]} for i in range(0, len(content), 4)]
+            events.append(
+                {"choices": [{"index": 0, "delta": {}, "finish_reason": choice["finish_reason"]}], "usage": completion["usage"]}
+            )
+            for event in events + ["[DONE]"]:
+                text = event if isinstance(event, str) else json.dumps(event, ensure_ascii=False)
+                data = f"data: {text}\n\n".encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.write(b"0\r\n\r\n")
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
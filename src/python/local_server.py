@@ -0,0 +1,192 @@
+"""
+本地游戏服务器替身
+
+实现 /ready、/status、/action 三个接口，用于本地联调和基准测试：
+- /status 返回 ETag（状态版本号），支持 If-None-Match 返回 304
+- 响应头 X-Status-Version 携带同一个版本号
+- 状态可以来自 STATUS_DATA.md 或 JSON 文件，也可以由调用方通过 set_status 更新
+
+用法:
+    python local_server.py --port 3000 [--status-file ../../STATUS_DATA.md] [--no-version]
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_STATUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "STATUS_DATA.md")
+
+_ROUTE = re.compile(r"^/api/player-agent/game/([^/]+)/(ready|status|action)$")
+
+
+def load_status_file(path: str) -> Dict[str, Any]:
+    """
+    读取游戏状态样例
+
+    Args:
+        path: .md（取第一个 json 代码块）或 .json 文件，
+              内容可以是 {"gameStatus": ...}、{"data": ...} 或状态本身
+
+    Returns:
+        游戏状态字典
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if path.endswith(".md"):
+        match = re.search(r"```json\s*([\s\S]*?)```", text)
+        text = match.group(1) if match else text
+    data = json.loads(text)
+    return data.get("gameStatus") or data.get("data") or data
+
+
+class GameState:
+    """线程安全的游戏状态容器，每次修改递增版本号"""
+
+    def __init__(self, status: Dict[str, Any]):
+        self.lock = threading.Lock()
+        self.version = 1
+        self.status = status
+        self.body = b""
+        self.actions: List[Dict[str, Any]] = []
+        self.ready_count = 0
+        self.on_action: Optional[Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]] = None
+        # 为 False 时不返回 ETag / X-Status-Version，模拟不提供版本信息的服务器
+        self.send_version = True
+        # 时间戳（time.time()），供 conformance.py 计算各阶段耗时
+        self.served_at: Dict[int, float] = {}
+        self.ready_at: List[float] = []
+        self.action_at: List[float] = []
+        self._encode()
+
+    def _encode(self):
+        self.body = json.dumps(
+            {"success": True, "data": self.status, "version": self.version}, ensure_ascii=False
+        ).encode("utf-8")
+
+    def set_status(self, status: Dict[str, Any]):
+        """替换状态并递增版本号"""
+        with self.lock:
+            self.status = status
+            self.version += 1
+            self._encode()
+
+    def snapshot(self):
+        with self.lock:
+            return self.version, self.body
+
+    def mark_served(self, version: int):
+        """记录某个版本第一次完整返回给客户端的时间"""
+        with self.lock:
+            self.served_at.setdefault(version, time.time())
+
+    def submit(self, action: Dict[str, Any]) -> Dict[str, Any]:
+        with self.lock:
+            self.actions.append(action)
+            self.action_at.append(time.time())
+        if self.on_action:
+            result = self.on_action(action)
+            if result is not None:
+                return result
+        return {"success": True, "message": "Action submitted successfully"}
+
+
+def make_handler(state: GameState):
+    """创建绑定到指定状态的请求处理类"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, code: int, body: bytes = b"", headers: Optional[Dict[str, str]] = None):
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+
+        def _send_json(self, code: int, data: Dict[str, Any]):
+            self._send(code, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+        def do_GET(self):
+            match = _ROUTE.match(self.path)
+            if not match or match.group(2) != "status":
+                self._send_json(404, {"success": False, "error": {"code": "NOT_FOUND", "message": self.path}})
+                return
+            version, body = state.snapshot()
+            if not state.send_version:
+                state.mark_served(version)
+                self._send(200, body)
+                return
+            etag = f'"{version}"'
+            headers = {"ETag": etag, "X-Status-Version": str(version)}
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304, headers=headers)
+                return
+            state.mark_served(version)
+            self._send(200, body, headers)
+
+        def do_POST(self):
+            match = _ROUTE.match(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            if not match:
+                self._send_json(404, {"success": False, "error": {"code": "NOT_FOUND", "message": self.path}})
+                return
+            if match.group(2) == "ready":
+                state.ready_count += 1
+                state.ready_at.append(time.time())
+                self._send_json(200, {"success": True, "message": "Player ready"})
+            elif match.group(2) == "action":
+                result = state.submit(json.loads(raw or b"{}"))
+                self._send_json(200 if result.get("success") else 400, result)
+            else:
+                self._send_json(405, {"success": False, "error": {"code": "INVALID_REQUEST", "message": "POST"}})
+
+    return Handler
+
+
+def start_server(status: Dict[str, Any], port: int = 0):
+    """
+    在后台线程启动服务器
+
+    Args:
+        status: 初始游戏状态
+        port: 端口，0 表示自动分配
+
+    Returns:
+        (server, state)，server.server_address[1] 为实际端口
+    """
+    state = GameState(status)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地游戏服务器替身")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--status-file", default=DEFAULT_STATUS_FILE)
+    parser.add_argument("--no-version", action="store_true", help="不返回 ETag / X-Status-Version")
+    args = parser.parse_args()
+
+    state = GameState(load_status_file(args.status_file))
+    state.send_version = not args.no_version
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(state))
+    print(f"[Server] 本地服务器已启动: http://127.0.0.1:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
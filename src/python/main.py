@@ -6,6 +6,7 @@ import sys
 import signal
 import time
 from agent import PlayerAgent
+from profiler import ProfilingHooks
 
 # 从环境变量读取配置（按照文档规范）
 GAME_ID = os.getenv("WEREWOLF_GAME_ID")
@@ -14,7 +15,7 @@ PLAYER_INDEX = os.getenv("WEREWOLF_PLAYER_INDEX")
 PLAYER_ROLE = os.getenv("WEREWOLF_PLAYER_ROLE")
 GAME_TOKEN = os.getenv("WEREWOLF_GAME_TOKEN")
 API_BASE_URL = os.getenv("WEREWOLF_API_BASE_URL")
-POLL_INTERVAL = 2000
+POLL_INTERVAL = int(os.getenv("WEREWOLF_POLL_INTERVAL", "2000"))
 
 # 任务信息(可能不存在任务，所以需要判断)
 TASK_TYPE = os.getenv("PLAYER_TASK_TYPE")
@@ -25,9 +26,49 @@ TASK_REWARD = os.getenv("PLAYER_TASK_REWARD")
 # 模型调用的Key
 MODEL_KEY = os.getenv("DEEPSEEK_KEY")  # 这里以deepseek为例，其他模型需要参照文档配置
 MODEL_NAME = "deepseek-v3"  # 模型名
-DEEPSEEK_API_URL = (
-    "https://ep-llm-test.zhenguanyu.com/gateway-cn-test/openai-compatible/v1/chat/completions"
+# LLM_API_URL 可指向其他 OpenAI 兼容服务（例如 conformance.py 启动的本地替身）
+DEEPSEEK_API_URL = os.getenv(
+    "LLM_API_URL", "https://ep-llm-test.zhenguanyu.com/gateway-cn-test/openai-compatible/v1/chat/completions"
 )
+# 服务端是否支持 response_format JSON 模式：默认关闭，确认网关会转发 response_format 后再设为 1
+LLM_JSON_MODE = os.getenv("LLM_JSON_MODE", "0") == "1"
+
+# 按行动类型路由的模型配置：选目标的行动走 fast，发言走 strong，时间紧张时退回 fast
+# 默认两者都是 MODEL_NAME，此时不启用路由；用环境变量把其中之一换成其他模型后才生效（需要对应的 key 和地址）
+MODEL_PROFILES = {
+    "fast": {
+        "modelName": os.getenv("LLM_FAST_MODEL", MODEL_NAME),
+        "apiUrl": os.getenv("LLM_FAST_API_URL", DEEPSEEK_API_URL),
+        "apiKey": os.getenv(os.getenv("LLM_FAST_KEY_ENV", "DEEPSEEK_KEY")),
+        "jsonMode": LLM_JSON_MODE,
+    },
+    "strong": {
+        "modelName": os.getenv("LLM_STRONG_MODEL", MODEL_NAME),
+        "apiUrl": os.getenv("LLM_STRONG_API_URL", DEEPSEEK_API_URL),
+        "apiKey": os.getenv(os.getenv("LLM_STRONG_KEY_ENV", "DEEPSEEK_KEY")),
+        "jsonMode": LLM_JSON_MODE,
+    },
+}
+
+# 跨局对手画像库（SQLite 文件），置空则不启用
+OPPONENT_STORE_PATH = os.getenv("OPPONENT_STORE", "opponents.sqlite3")
+
+# 服务器的胜负规则（side 屠边 / parity 狼人数不少于好人数），确认后再配置；置空则身份推算不假设规则
+WIN_RULE = os.getenv("WEREWOLF_WIN_RULE") or None
+
+# 检查点文件：容器重启后从这里恢复（需要放在持久化的目录），置空则不启用
+CHECKPOINT_PATH = os.getenv("AGENT_CHECKPOINT", f"agent_checkpoint_{PLAYER_ID}.json")
+
+# 轨迹文件（gzip JSONL），配置后记录 /status、LLM 请求和提交的行动，可用 replay.py 回放
+TRACE_PATH = os.getenv("AGENT_TRACE")
+
+# 剖析输出目录（线程栈转储、采样折叠栈）和控制文件（写入 stacks / profile 触发），控制文件置空则只响应信号
+PROFILE_DIR = os.getenv("AGENT_PROFILE_DIR", ".")
+PROFILE_CONTROL_FILE = os.getenv("AGENT_PROFILE_CONTROL")
+
+# 同一进程内所有 Agent 共享的 LLM 限流（每秒请求数、并发数）
+LLM_RATE_LIMIT = 5
+LLM_MAX_CONCURRENCY = 4
 
 # 构建任务信息（如果有）
 task = None
@@ -64,6 +105,14 @@ def main():
                 "llmApiKey": MODEL_KEY,
                 "llmModelName": MODEL_NAME,
                 "llmApiUrl": DEEPSEEK_API_URL,
+                "llmRateLimit": LLM_RATE_LIMIT,
+                "llmMaxConcurrency": LLM_MAX_CONCURRENCY,
+                "llmJsonMode": LLM_JSON_MODE,
+                "llmModelProfiles": MODEL_PROFILES,
+                "opponentStorePath": OPPONENT_STORE_PATH or None,
+                "winRule": WIN_RULE,
+                "checkpointPath": CHECKPOINT_PATH or None,
+                "tracePath": TRACE_PATH,
             }
         )
 
@@ -76,6 +125,9 @@ def main():
         signal.signal(signal.SIGINT, signal_handler)
         signal.signal(signal.SIGTERM, signal_handler)
 
+        # 剖析钩子：SIGUSR1 转储线程栈，SIGUSR2 开始 / 停止采样
+        ProfilingHooks(PROFILE_DIR, PROFILE_CONTROL_FILE or None).install()
+
         # 启动 Agent
         agent.start()
 
@@ -0,0 +1,70 @@
+"""
+模型路由
+
+按行动类型（可选再细分阶段）把 LLM 请求路由到不同的模型配置（profile）：
+- 只需从少量候选里选目标的行动（杀人、验人、女巫、投票）走快速模型
+- 需要长篇说服力的发言走强模型
+- 剩余时间不足时自动退回最快的模型
+"""
+from typing import Any, Dict, Optional, Tuple
+
+FAST = "fast"
+STRONG = "strong"
+
+DEFAULT_ROUTES: Dict[str, str] = {
+    "kill": FAST,
+    "check": FAST,
+    "witch_action": FAST,
+    "vote": FAST,
+    "pk_vote": FAST,
+    "speech": STRONG,
+    "last_words": STRONG,
+    "pk_speech": STRONG,
+}
+
+# 剩余时间不超过该秒数时改用最快的模型
+DEFAULT_TIGHT_SECONDS = 6
+
+
+class ModelRouter:
+    """行动类型 -> 模型配置的路由表"""
+
+    def __init__(
+        self,
+        profiles: Dict[str, Dict[str, Any]],
+        routes: Optional[Dict[Any, str]] = None,
+        fastest: str = FAST,
+        default: Optional[str] = None,
+        tight_seconds: int = DEFAULT_TIGHT_SECONDS,
+    ):
+        """
+        Args:
+            profiles: 模型配置，profile 名 -> {"modelName", "apiUrl", "apiKey", ...}
+            routes: 路由表，键为 actionType 或 (actionType, phase)，值为 profile 名；默认 DEFAULT_ROUTES
+            fastest: 时间紧张时使用的 profile
+            default: 路由表未命中时使用的 profile，默认与 fastest 相同
+            tight_seconds: 剩余时间不超过该秒数时改用 fastest
+        """
+        self.profiles = profiles
+        self.routes = dict(DEFAULT_ROUTES if routes is None else routes)
+        self.fastest = fastest if fastest in profiles else next(iter(profiles))
+        self.default = default if default in profiles else self.fastest
+        self.tight_seconds = tight_seconds
+
+    def route(self, action_type: str, phase: Optional[str] = None, remaining_seconds: Optional[int] = None) -> str:
+        """
+        选择 profile
+
+        Args:
+            action_type: 行动类型
+            phase: 当前阶段（可选）
+            remaining_seconds: 剩余秒数（可选）
+
+        Returns:
+            profile 名
+        """
+        if remaining_seconds is not None and remaining_seconds <= self.tight_seconds:
+            return self.fastest
+        key: Tuple[str, Optional[str]] = (action_type, phase)
+        profile = self.routes.get(key) or self.routes.get(action_type) or self.default
+        return profile if profile in self.profiles else self.default
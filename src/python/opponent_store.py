@@ -0,0 +1,268 @@
+"""
+对手画像库
+
+按对手名字（players[].name）跨局累计行为统计，存放在 SQLite：
+- 跳预言家次数、其中与他人对跳的次数
+- 投票次数、跟票次数（投给已经有人投的目标）、弃票次数
+- 夜里出局次数（被刀或被毒）、被放逐次数
+- 刀人偏好：刀人次数、其中刀已声明预言家 / 女巫的次数（只有和他同为狼人时才看得到刀人消息）
+
+只记录行为，不记录身份：身份每局随机发放，某人以往当过几次狼对这一局没有参考价值。
+
+启动时一次性把整张表读进内存字典，回合内按名字 O(1) 查询；每局结束时从最终的 game_status 统计并写回。
+"""
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+try:
+    from .game_view import GameView, PlayerView, as_view
+    from .speech_index import SPEECH_METATYPES, SpeechIndex
+except ImportError:
+    from game_view import GameView, PlayerView, as_view
+    from speech_index import SPEECH_METATYPES, SpeechIndex
+
+_GOD_CLAIMS = ("SEER", "WITCH")
+_VOTE_PHASES = ("day_vote", "pk_vote")
+
+STAT_FIELDS = (
+    "games",
+    "seer_claims",
+    "counter_claims",
+    "votes",
+    "follow_votes",
+    "abstains",
+    "night_deaths",
+    "exiled",
+    "night_kills",
+    "kills_on_claimers",
+)
+
+
+class OpponentProfile:
+    """单个对手的累计统计"""
+
+    __slots__ = ("name",) + STAT_FIELDS
+
+    def __init__(self, name: str, **counts: int):
+        self.name = name
+        for field in STAT_FIELDS:
+            setattr(self, field, counts.get(field, 0))
+
+    def add(self, counts: Dict[str, int]):
+        for field, value in counts.items():
+            setattr(self, field, getattr(self, field) + value)
+
+    @property
+    def follow_rate(self) -> float:
+        """跟票率"""
+        return self.follow_votes / self.votes if self.votes else 0.0
+
+    def summary(self) -> str:
+        """一行中文描述，供提示词使用"""
+        parts = [f"{self.games} 局"]
+        if self.seer_claims:
+            parts.append(f"跳预言家 {self.seer_claims} 次（对跳 {self.counter_claims} 次）")
+        if self.votes:
+            parts.append(f"跟票率 {self.follow_rate:.0%}")
+        if self.abstains:
+            parts.append(f"弃票 {self.abstains} 次")
+        if self.night_deaths:
+            parts.append(f"夜里出局 {self.night_deaths} 次")
+        if self.night_kills:
+            parts.append(f"当狼人时刀人 {self.night_kills} 次（其中刀神职声明者 {self.kills_on_claimers} 次）")
+        return "，".join(parts)
+
+
+def extract_game_stats(game_status: Union[GameView, Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
+    """
+    从一局结束时的 game_status 统计每个对手本局的行为
+
+    Args:
+        game_status: 游戏状态（GameView 或原始字典，含完整 history）
+
+    Returns:
+        对手名字 -> 本局各统计项的增量（不含自己）
+    """
+    view = as_view(game_status)
+    my_index = view.my_index
+    names = {p.index: p.name for p in view.players if p.name}
+    counts = {index: dict.fromkeys(STAT_FIELDS, 0) for index in names if index != my_index}
+    for entry in counts.values():
+        entry["games"] = 1
+
+    # 按发言顺序增量索引身份声明（跳预言家和刀人时判断目标之前是否声明过神职都用这份索引）
+    speeches = SpeechIndex()
+    phase = None
+    claimed: List[int] = []
+    vote_round = None
+    voted_targets: set = set()
+    for msg in view.history:
+        metadata = msg.get("metadata") or {}
+        metatype = str(metadata.get("metatype", "")).lower()
+        index = msg.get("playerIndex")
+        speeches.index_message(msg)
+
+        if metatype == "phase_transition":
+            phase = metadata.get("toPhase")
+            continue
+
+        if metatype == "player_dead":
+            dead = metadata.get("playerIndex", index)
+            if dead in counts:
+                counts[dead]["exiled" if phase in _VOTE_PHASES else "night_deaths"] += 1
+            continue
+
+        if index not in counts:
+            continue
+
+        if metatype in SPEECH_METATYPES:
+            if speeches.claims.get(index) == "SEER" and index not in claimed:
+                counts[index]["seer_claims"] += 1
+                if claimed:
+                    counts[index]["counter_claims"] += 1
+                claimed.append(index)
+        elif metatype == "vote":
+            round_key = (msg.get("day"), metadata.get("voteType"))
+            if round_key != vote_round:
+                vote_round = round_key
+                voted_targets = set()
+            target = metadata.get("target")
+            counts[index]["votes"] += 1
+            if target is None:
+                counts[index]["abstains"] += 1
+            elif target in voted_targets:
+                counts[index]["follow_votes"] += 1
+            voted_targets.add(target)
+        elif metatype == "kill":
+            counts[index]["night_kills"] += 1
+            if speeches.claims.get(metadata.get("target")) in _GOD_CLAIMS:
+                counts[index]["kills_on_claimers"] += 1
+
+    return {names[index]: entry for index, entry in counts.items()}
+
+
+class OpponentStore:
+    """SQLite 持久化 + 内存字典查询的对手画像库"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: SQLite 文件路径
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        columns = ", ".join(f"{field} INTEGER NOT NULL DEFAULT 0" for field in STAT_FIELDS)
+        with self.conn:
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS opponents (name TEXT PRIMARY KEY, {columns})")
+            # 旧版本建的表缺少新增的统计列
+            existing = {row[1] for row in self.conn.execute("PRAGMA table_info(opponents)")}
+            for field in STAT_FIELDS:
+                if field not in existing:
+                    self.conn.execute(f"ALTER TABLE opponents ADD COLUMN {field} INTEGER NOT NULL DEFAULT 0")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS recorded_games (game_id TEXT PRIMARY KEY)")
+        rows = self.conn.execute(f"SELECT name, {', '.join(STAT_FIELDS)} FROM opponents").fetchall()
+        self.profiles: Dict[str, OpponentProfile] = {
+            row[0]: OpponentProfile(row[0], **dict(zip(STAT_FIELDS, row[1:]))) for row in rows
+        }
+        print(f"[画像] 已加载 {len(self.profiles)} 个对手画像: {path}")
+
+    def get(self, name: Optional[str]) -> Optional[OpponentProfile]:
+        """按名字查询画像，没有记录时返回 None"""
+        return self.profiles.get(name) if name else None
+
+    def lookup_players(self, players: Iterable[PlayerView], my_index: Any = None) -> Dict[int, OpponentProfile]:
+        """
+        查询本局其他玩家的画像
+
+        Args:
+            players: GameView.players
+            my_index: 我的编号（排除）
+
+        Returns:
+            玩家编号 -> 画像（只含有记录的玩家）
+        """
+        result = {}
+        for player in players:
+            profile = self.profiles.get(player.name)
+            if profile and player.index != my_index:
+                result[player.index] = profile
+        return result
+
+    def record_game(self, game_status: Union[GameView, Dict[str, Any]]) -> bool:
+        """
+        一局结束时写入本局统计；同一局只记录一次（同进程的多个 Agent 会各自调用）
+
+        Args:
+            game_status: 结束时的游戏状态
+
+        Returns:
+            是否写入
+        """
+        view = as_view(game_status)
+        game_id = view.game_id
+        stats = extract_game_stats(view)
+        if not game_id or not stats:
+            return False
+
+        assignments = ", ".join(f"{field} = {field} + excluded.{field}" for field in STAT_FIELDS)
+        sql = (
+            f"INSERT INTO opponents (name, {', '.join(STAT_FIELDS)}) "
+            f"VALUES (?, {', '.join('?' for _ in STAT_FIELDS)}) "
+            f"ON CONFLICT(name) DO UPDATE SET {assignments}"
+        )
+        with self.lock:
+            with self.conn:
+                cursor = self.conn.execute("INSERT OR IGNORE INTO recorded_games (game_id) VALUES (?)", (game_id,))
+                if cursor.rowcount == 0:
+                    return False
+                self.conn.executemany(
+                    sql, [(name, *(counts[field] for field in STAT_FIELDS)) for name, counts in stats.items()]
+                )
+            for name, counts in stats.items():
+                profile = self.profiles.get(name)
+                if profile is None:
+                    self.profiles[name] = OpponentProfile(name, **counts)
+                else:
+                    profile.add(counts)
+        print(f"[画像] 已记录对局 {game_id}: {len(stats)} 个对手")
+        return True
+
+    def close(self):
+        self.conn.close()
+
+
+def build_opponent_block(store: Optional[OpponentStore], game_status: Union[GameView, Dict[str, Any]]) -> str:
+    """
+    构建系统提示词中的对手画像段落，没有任何记录时返回空字符串
+
+    Args:
+        store: 对手画像库（可选）
+        game_status: 游戏状态
+
+    Returns:
+        提示词段落
+    """
+    if store is None:
+        return ""
+    view = as_view(game_status)
+    profiles = store.lookup_players(view.players, view.my_index)
+    if not profiles:
+        return ""
+    lines = [f"- {index} 号玩家（{profile.name}）：{profile.summary()}\n" for index, profile in sorted(profiles.items())]
+    return "对手历史画像（来自以往对局）：\n" + "".join(lines) + "\n"
+
+
+_stores: Dict[str, OpponentStore] = {}
+_stores_lock = threading.Lock()
+
+
+def open_store(path: str) -> OpponentStore:
+    """同一进程内按路径共享画像库实例"""
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = OpponentStore(path)
+            _stores[path] = store
+        return store
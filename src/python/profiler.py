@@ -0,0 +1,272 @@
+"""
+运行时剖析钩子
+
+线上 Agent 错过截止时间时，用来判断是卡在 requests、Timer 线程还是提示词构建：
+- 线程栈转储：打印所有线程当前的调用栈（带线程名），同时写入 stacks-<pid>-<时间>.txt
+- 采样剖析器：后台线程定时采样所有线程的调用栈，停止时写出折叠栈文件
+  profile-<pid>-<时间>.folded（每行 "线程;帧;帧;... 次数"，可直接交给 flamegraph.pl / speedscope）
+
+触发方式（运行时切换，不需要重启）：
+- 信号：SIGUSR1 转储线程栈，SIGUSR2 开始 / 停止采样（只注册这两个信号，不改动 SIGINT / SIGTERM）
+- 控制文件：写入 "stacks" 或 "profile"（同上）、"start" / "stop"，处理后文件被删除，例如
+      echo profile > agent.ctl
+
+未开启采样时没有任何额外开销；配置了控制文件时由一个守护线程每秒检查一次。
+"""
+import atexit
+import os
+import re
+import signal
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Callable, Dict, Optional
+
+_THREAD_SEQ = re.compile(r"-\d+")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _thread_names() -> Dict[int, str]:
+    return {thread.ident: thread.name for thread in threading.enumerate()}
+
+
+def format_stacks() -> str:
+    """所有线程当前的调用栈（文本）"""
+    names = _thread_names()
+    lines = []
+    for ident, frame in sys._current_frames().items():
+        lines.append(f'Thread "{names.get(ident, "?")}" (id {ident}):')
+        lines.extend(line.rstrip("\n") for line in traceback.format_stack(frame))
+        lines.append("")
+    return "\n".join(lines)
+
+
+class SamplingProfiler:
+    """
+    采样剖析器
+
+    后台线程每隔 interval 秒调用一次 sys._current_frames()，把每个线程的栈折叠成一行计数，
+    不插桩、不使用 sys.setprofile，对被采样线程几乎没有额外开销。
+    """
+
+    def __init__(self, interval: float = 0.01):
+        """
+        Args:
+            interval: 采样间隔（秒）
+        """
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        if self.running:
+            return
+        self.counts.clear()
+        self.samples = 0
+        self.started_at = time.time()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        """
+        停止采样
+
+        Returns:
+            折叠栈计数（"线程;帧;..." -> 次数）
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        return self.counts
+
+    def _run(self):
+        me = threading.get_ident()
+        names = _thread_names()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            # 线程名只在出现新线程时刷新（Timer 线程每次轮询都会新建）
+            if any(ident not in names for ident in frames):
+                names = _thread_names()
+            for ident, frame in frames.items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                # Timer / 决策线程名带序号，去掉序号后同类线程合并到一起
+                stack.append(_THREAD_SEQ.sub("", names.get(ident, "?")))
+                self.counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def write_collapsed(self, path: str) -> int:
+        """
+        写出折叠栈文件
+
+        Args:
+            path: 输出路径
+
+        Returns:
+            写入的行数
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+        return len(self.counts)
+
+
+class ProfilingHooks:
+    """信号 / 控制文件触发的剖析钩子"""
+
+    def __init__(
+        self,
+        output_dir: str = ".",
+        control_path: Optional[str] = None,
+        interval: float = 0.01,
+        control_check_interval: float = 1.0,
+    ):
+        """
+        Args:
+            output_dir: 栈转储和折叠栈文件的输出目录
+            control_path: 控制文件路径（None 表示不启用）
+            interval: 采样间隔（秒）
+            control_check_interval: 控制文件检查间隔（秒）
+        """
+        self.output_dir = output_dir
+        self.control_path = control_path
+        self.control_check_interval = control_check_interval
+        self.profiler = SamplingProfiler(interval)
+        # 信号处理函数可能在持锁时重入主线程
+        self._lock = threading.RLock()
+        self._watcher: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+
+    def install(self) -> "ProfilingHooks":
+        """
+        注册 SIGUSR1 / SIGUSR2（平台不支持时跳过）并启动控制文件监视线程
+
+        必须在主线程调用（signal.signal 的限制）。
+        """
+        handlers: Dict[str, Callable[[], object]] = {"SIGUSR1": self.dump_stacks, "SIGUSR2": self.toggle_profiler}
+        for name, action in handlers.items():
+            signum = getattr(signal, name, None)
+            if signum is not None:
+                signal.signal(signum, lambda sig, frame, action=action: action())
+        if self.control_path:
+            self._watcher = threading.Thread(target=self._watch_control_file, name="profiling-control", daemon=True)
+            self._watcher.start()
+        # 进程退出时还在采样的话，把已有结果写出来
+        atexit.register(self.close)
+        return self
+
+    def close(self):
+        """停止监视线程，正在采样时写出结果"""
+        self._closed.set()
+        if self.profiler.running:
+            self.stop_profiler()
+
+    def _output_path(self, prefix: str, suffix: str) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        return os.path.join(self.output_dir, f"{prefix}-{os.getpid()}-{stamp}{suffix}")
+
+    def dump_stacks(self) -> Optional[str]:
+        """
+        转储所有线程的调用栈到标准错误和文件
+
+        Returns:
+            转储文件路径（写文件失败时为 None）
+        """
+        text = format_stacks()
+        sys.stderr.write(text + "\n")
+        try:
+            path = self._output_path("stacks", ".txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        except OSError as e:
+            print(f"[剖析] ⚠ 写入线程栈失败: {e}")
+            return None
+        print(f"[剖析] 线程栈已写入 {path}")
+        return path
+
+    def start_profiler(self):
+        with self._lock:
+            if self.profiler.running:
+                return
+            self.profiler.start()
+        print(f"[剖析] 开始采样（间隔 {self.profiler.interval * 1000:.0f}ms）")
+
+    def stop_profiler(self) -> Optional[str]:
+        """
+        停止采样并写出折叠栈文件
+
+        Returns:
+            折叠栈文件路径（未在采样或写入失败时为 None）
+        """
+        with self._lock:
+            if not self.profiler.running:
+                return None
+            self.profiler.stop()
+        elapsed = time.time() - (self.profiler.started_at or time.time())
+        try:
+            path = self._output_path("profile", ".folded")
+            lines = self.profiler.write_collapsed(path)
+        except OSError as e:
+            print(f"[剖析] ⚠ 写入折叠栈失败: {e}")
+            return None
+        print(f"[剖析] 停止采样：{elapsed:.1f}s，{self.profiler.samples} 次采样，{lines} 个栈 -> {path}")
+        return path
+
+    def toggle_profiler(self):
+        if self.profiler.running:
+            self.stop_profiler()
+        else:
+            self.start_profiler()
+
+    def handle_command(self, command: str):
+        """
+        执行控制命令
+
+        Args:
+            command: stacks / profile（切换）/ start / stop
+        """
+        actions = {
+            "stacks": self.dump_stacks,
+            "profile": self.toggle_profiler,
+            "start": self.start_profiler,
+            "stop": self.stop_profiler,
+        }
+        action = actions.get(command.strip().lower())
+        if action is None:
+            print(f"[剖析] ⚠ 未知控制命令: {command.strip()!r}")
+            return
+        action()
+
+    def _watch_control_file(self):
+        while not self._closed.wait(self.control_check_interval):
+            try:
+                with open(self.control_path, encoding="utf-8") as f:
+                    content = f.read()
+                os.remove(self.control_path)
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                print(f"[剖析] ⚠ 读取控制文件失败: {e}")
+                continue
+            for command in content.split():
+                self.handle_command(command)
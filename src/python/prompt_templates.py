@@ -0,0 +1,323 @@
+"""
+提示词模板
+
+把提示词结构编译成“静态片段 + 槽位”的模板，每局游戏只编译一次：
+- 一局内不变的内容（玩家编号、角色、任务段落、对手画像、角色相关判断、行动格式、玩家名单）在开局时填入模板
+- 每个回合只填充易变字段（天数、阶段、存活状态、药水、行动上下文）
+- 历史消息按消息 id 缓存渲染结果，每条只渲染一次；发言要点索引同样按消息 id 增量更新
+
+输出与 context_builder.build_llm_messages 完全一致。
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+try:
+    from .context_builder import (
+        build_task_block,
+        build_history_line,
+        build_task_reminder,
+        build_action_detail,
+        get_action_format,
+    )
+    from .opponent_store import build_opponent_block
+    from .speech_index import SpeechIndex
+    from .role_solver import RoleSolver
+    from .game_view import GameView, ActionContextView, PlayerView, Role, as_view, as_context
+except ImportError:
+    from context_builder import (
+        build_task_block,
+        build_history_line,
+        build_task_reminder,
+        build_action_detail,
+        get_action_format,
+    )
+    from opponent_store import build_opponent_block
+    from speech_index import SpeechIndex
+    from role_solver import RoleSolver
+    from game_view import GameView, ActionContextView, PlayerView, Role, as_view, as_context
+
+HISTORY_HEADER = "游戏历史消息：\n\n"
+
+_SLOT = re.compile(r"\{(\w+)\}")
+
+
+class PromptTemplate:
+    """编译后的模板：statics[0] + slot[0] + statics[1] + ... + statics[-1]"""
+
+    __slots__ = ("statics", "slots")
+
+    def __init__(self, statics: Tuple[str, ...], slots: Tuple[str, ...]):
+        self.statics = statics
+        self.slots = slots
+
+    @classmethod
+    def compile(cls, text: str) -> "PromptTemplate":
+        """
+        编译模板文本，{name} 为槽位
+
+        Args:
+            text: 模板文本
+
+        Returns:
+            编译后的模板
+        """
+        pieces = _SLOT.split(text)
+        return cls(tuple(pieces[0::2]), tuple(pieces[1::2]))
+
+    def partial(self, **values: Any) -> "PromptTemplate":
+        """
+        填入部分槽位，返回新的模板（相邻静态片段会合并）
+
+        Args:
+            values: 槽位值
+
+        Returns:
+            剩余槽位的模板
+        """
+        statics = [self.statics[0]]
+        slots = []
+        for slot, static in zip(self.slots, self.statics[1:]):
+            if slot in values:
+                statics[-1] += str(values[slot]) + static
+            else:
+                slots.append(slot)
+                statics.append(static)
+        return PromptTemplate(tuple(statics), tuple(slots))
+
+    def render(self, values: Dict[str, Any]) -> str:
+        """
+        填入全部剩余槽位
+
+        Args:
+            values: 槽位值
+
+        Returns:
+            渲染结果
+        """
+        parts = [self.statics[0]]
+        for slot, static in zip(self.slots, self.statics[1:]):
+            parts.append(str(values[slot]))
+            parts.append(static)
+        return "".join(parts)
+
+
+SYSTEM_TEMPLATE = PromptTemplate.compile(
+    "你是一个狼人杀游戏的AI玩家。\n\n"
+    "当前游戏信息：\n"
+    "- 你是 {my_player_index} 号玩家\n"
+    "- 你的角色是：{my_role}\n"
+    "- 当前是第 {day} 天\n"
+    "- 当前阶段：{phase}\n\n"
+    "{task_block}"
+    "{opponent_block}"
+    "玩家信息：\n"
+    "{roster}\n"
+    "存活玩家编号：{alive}\n\n"
+    "{role_info}"
+)
+
+ACTION_TEMPLATE = PromptTemplate.compile(
+    "\n现在轮到你行动了！\n\n"
+    "行动类型：{action_type}\n"
+    "剩余时间：{remaining} 秒\n"
+    "提示：{hint}\n\n"
+    "{task_reminder}"
+    "{action_detail}"
+    "\n请根据以上信息做出决策，并严格按照以下 JSON 格式回复（只输出 JSON，不要输出分析过程）：\n"
+    "{action_format}"
+)
+
+
+class GamePromptBuilder:
+    """按局缓存静态片段的提示词构建器"""
+
+    def __init__(
+        self,
+        task: Optional[Dict[str, Any]] = None,
+        opponent_store: Any = None,
+        speech_index: Optional[SpeechIndex] = None,
+        role_solver: Optional[RoleSolver] = None,
+    ):
+        """
+        Args:
+            task: 任务信息（可选）
+            opponent_store: 对手画像库（可选），开局时查询一次
+            speech_index: 发言要点索引（可选），传入时与调用方共享
+            role_solver: 身份推算（可选），传入时与调用方共享
+        """
+        self.task = task
+        self.opponent_store = opponent_store
+        self.speech_index = speech_index or SpeechIndex()
+        self.role_solver = role_solver or RoleSolver()
+        self.game_key: Optional[Tuple[Any, Any, Any]] = None
+        self.system_template: Optional[PromptTemplate] = None
+        self.action_templates: Dict[str, PromptTemplate] = {}
+        self.roster_prefixes: Dict[Tuple[Any, Any], str] = {}
+        self.is_witch = False
+        self.is_werewolf = False
+        # 已渲染的历史：(消息数, 最后一条消息 id, 渲染好的文本)，整体替换，检查点线程读到的总是一致的快照
+        self.history_state: Tuple[int, Any, str] = (0, None, HISTORY_HEADER)
+        self.restored: Optional[Dict[str, Any]] = None
+
+    def get_checkpoint_state(self) -> Tuple[Dict[str, Any], str]:
+        """
+        已渲染历史的快照，供检查点保存
+
+        Returns:
+            (状态, 渲染好的历史文本)；文本只追加增长，由检查点单独增量保存
+        """
+        count, last_id, text = self.history_state
+        state = {
+            "gameKey": list(self.game_key) if self.game_key else None,
+            "historyCount": count,
+            "historyLastId": last_id,
+            "speechIndex": self.speech_index.get_state(),
+        }
+        return state, text
+
+    def restore_checkpoint_state(self, state: Dict[str, Any], history_text: Optional[str] = None):
+        """从检查点恢复已渲染的历史，在下一次准备同一局时生效（旧版检查点的历史文本内联在 state 里）"""
+        if state.get("gameKey"):
+            self.restored = dict(state, historyText=history_text or state.get("historyText"))
+
+    def _prepare_game(self, view: GameView):
+        """新的一局（或我的编号/角色变化）时编译静态部分"""
+        game_key = (view.game_id, view.my_index, view.my_role_text)
+        if game_key == self.game_key:
+            return
+        self.game_key = game_key
+        self.system_template = SYSTEM_TEMPLATE.partial(
+            my_player_index=view.my_index,
+            my_role=view.my_role_text,
+            task_block=build_task_block(self.task),
+            opponent_block=build_opponent_block(self.opponent_store, view),
+        )
+        self.action_templates = {}
+        self.roster_prefixes = {}
+        self.is_witch = view.my_role is Role.WITCH
+        self.is_werewolf = view.my_role is Role.WEREWOLF
+        self.history_state = (0, None, HISTORY_HEADER)
+        self.speech_index.reset()
+        # 身份推算不写检查点，恢复后按完整历史重建（只看少数几类消息）
+        self.role_solver.reset()
+        if self.restored and tuple(self.restored["gameKey"]) == game_key:
+            if self.restored.get("historyText"):
+                self.history_state = (
+                    self.restored.get("historyCount", 0),
+                    self.restored.get("historyLastId"),
+                    self.restored["historyText"],
+                )
+            self.speech_index.restore_state(self.restored.get("speechIndex") or {})
+        self.restored = None
+
+    def _roster(self, players: Tuple[PlayerView, ...]) -> str:
+        lines = []
+        for player in players:
+            key = (player.index, player.name)
+            prefix = self.roster_prefixes.get(key)
+            if prefix is None:
+                prefix = f"- {key[0]} 号玩家：{key[1]}，"
+                self.roster_prefixes[key] = prefix
+            status = "存活" if player.is_alive else "已死亡"
+            role_info = f" (角色: {player.role_text})" if player.role_text else ""
+            lines.append(f"{prefix}{status}{role_info}\n")
+        return "".join(lines)
+
+    def _role_info(self, view: GameView) -> str:
+        if self.is_witch:
+            has_heal = "有" if view.has_heal_potion else "无"
+            has_poison = "有" if view.has_poison_potion else "无"
+            return f"女巫药水状态：解药{has_heal}，毒药{has_poison}\n\n"
+        if self.is_werewolf:
+            teammates = view.werewolf_teammates(alive_only=True)
+            if teammates:
+                return f"你的狼人队友：{', '.join(map(str, teammates))} 号玩家\n\n"
+        return ""
+
+    def build_system_prompt(self, game_status: Union[GameView, Dict[str, Any]]) -> str:
+        """构建系统提示词"""
+        view = as_view(game_status)
+        self._prepare_game(view)
+        return self.system_template.render(
+            {
+                "day": view.day,
+                "phase": view.phase_text,
+                "roster": self._roster(view.players),
+                "alive": ", ".join(map(str, view.alive)),
+                "role_info": self._role_info(view),
+            }
+        )
+
+    def build_history_content(self, game_status: Union[GameView, Dict[str, Any]]) -> Optional[str]:
+        """构建历史消息内容，只渲染新增的消息"""
+        view = as_view(game_status)
+        self._prepare_game(view)
+        history = view.history
+        if not history:
+            return None
+
+        known, last_id, text = self.history_state
+        # 历史只追加不修改；前缀对不上时（极少见）整体重建
+        if known > len(history) or (known and history[known - 1].get("id") != last_id):
+            known, text = 0, HISTORY_HEADER
+        if len(history) > known:
+            # 只保留拼好的一整段文本，不保留逐条的渲染结果
+            text += "".join(build_history_line(msg) for msg in history[known:])
+            self.history_state = (len(history), history[-1].get("id"), text)
+        self.speech_index.update(history)
+        self.role_solver.update(view)
+        return text + self.speech_index.summary() + self.role_solver.summary(view.my_index, view.alive)
+
+    def release(self):
+        """释放本局缓存的历史、发言索引和身份推算（游戏结束后调用）"""
+        self.game_key = None
+        self.history_state = (0, None, HISTORY_HEADER)
+        self.speech_index.reset()
+        self.role_solver.reset()
+
+    def build_action_prompt(
+        self,
+        game_status: Union[GameView, Dict[str, Any]],
+        action_context: Union[ActionContextView, Dict[str, Any]],
+    ) -> str:
+        """构建行动提示词"""
+        view = as_view(game_status)
+        context = as_context(action_context)
+        self._prepare_game(view)
+        action_type = context.action_type
+        template = self.action_templates.get(action_type)
+        if template is None:
+            template = ACTION_TEMPLATE.partial(action_type=action_type, action_format=get_action_format(action_type))
+            self.action_templates[action_type] = template
+        return template.render(
+            {
+                "remaining": context.remaining_seconds(),
+                "hint": context.hint or "请根据当前情况做出决策",
+                "task_reminder": build_task_reminder(view, action_type, self.task) if self.task else "",
+                "action_detail": build_action_detail(context),
+            }
+        )
+
+    def build_messages(
+        self,
+        game_status: Union[GameView, Dict[str, Any]],
+        action_context: Union[ActionContextView, Dict[str, Any]],
+    ) -> List[Dict[str, str]]:
+        """
+        构建 LLM 消息上下文
+
+        Args:
+            game_status: 游戏状态（GameView 或原始字典）
+            action_context: 行动上下文（ActionContextView 或原始字典）
+
+        Returns:
+            消息列表
+        """
+        view = as_view(game_status)
+        context = as_context(action_context)
+        messages = [{"role": "system", "content": self.build_system_prompt(view)}]
+        history_content = self.build_history_content(view)
+        if history_content:
+            messages.append({"role": "user", "content": history_content})
+        messages.append({"role": "user", "content": self.build_action_prompt(view, context)})
+        return messages
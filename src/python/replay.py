@@ -0,0 +1,244 @@
+"""
+轨迹回放
+
+把 trace_recorder 写下的轨迹重新喂给 PlayerAgent：
+- /status 按记录顺序返回（还原状态变化），行动截止时间平移到回放时刻，剩余时间与录制时一致
+- LLM 按记录顺序返回录制时的响应（或抛出录制时的错误），不联网
+- 提交的行动与录制时的行动逐条对比
+
+回放不等待轮询间隔，每个回合的决策线程结束后立即进入下一条状态，远快于真实时间，
+可用于性能分析（--profile）和回归测试（行动不一致时退出码为 1）。
+兜底策略的随机选择用 --seed 固定，因此只有 LLM 决定的行动能与录制结果严格对比。
+
+用法:
+    python replay.py trace.jsonl.gz [--verbose] [--profile] [--seed 0]
+"""
+import argparse
+import contextlib
+import cProfile
+import io
+import os
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from agent import PlayerAgent
+from llm_client import LLMCancelledError, LLMRequestShed
+from llm_scheduler import Priority
+from trace_recorder import apply_status_delta, read_trace
+
+
+def shift_deadlines(status: Dict[str, Any], offset_seconds: float) -> Dict[str, Any]:
+    """
+    把状态中的行动截止时间整体平移
+
+    Args:
+        status: 游戏状态
+        offset_seconds: 平移秒数
+
+    Returns:
+        平移后的状态（浅拷贝，不修改原状态）
+    """
+    my_turn = status.get("myTurn")
+    if not my_turn or not my_turn.get("canAct"):
+        return status
+    my_turn = dict(my_turn)
+    if isinstance(my_turn.get("deadline"), (int, float)):
+        my_turn["deadline"] = int(my_turn["deadline"] + offset_seconds * 1000)
+    context = my_turn.get("actionContext")
+    if context and context.get("deadline"):
+        try:
+            deadline = datetime.fromisoformat(context["deadline"].replace("Z", "+00:00"))
+            shifted = (deadline + timedelta(seconds=offset_seconds)).isoformat().replace("+00:00", "Z")
+            my_turn["actionContext"] = dict(context, deadline=shifted)
+        except ValueError:
+            pass
+    return dict(status, myTurn=my_turn)
+
+
+class ReplayApiClient:
+    """按轨迹返回响应的 ApiClient 替身"""
+
+    def __init__(self, action_records: List[Dict[str, Any]]):
+        self.next_response: Dict[str, Any] = {"success": False}
+        self.action_records = deque(action_records)
+        self.submitted: List[Dict[str, Any]] = []
+
+    def get_game_status(self, game_id: str) -> Dict[str, Any]:
+        return self.next_response
+
+    def reset_status_cache(self):
+        pass
+
+    def send_ready(self, game_id: str) -> Dict[str, Any]:
+        return {"success": True, "message": "replay"}
+
+    def submit_action(self, game_id: str, action: Dict[str, Any]) -> Dict[str, Any]:
+        self.submitted.append(action)
+        record = self.action_records.popleft() if self.action_records else {}
+        if record.get("error"):
+            raise Exception(record["error"])
+        return record.get("response") or {"success": True, "message": "replay"}
+
+
+class ReplayLLMClient:
+    """按录制顺序返回响应的 LLM 替身"""
+
+    def __init__(self, llm_records: List[Dict[str, Any]]):
+        self.records = deque(llm_records)
+        self.model_name = "replay"
+        self.calls = 0
+
+    def chat(
+        self,
+        messages: List[Dict[str, str]],
+        cancel_event: Optional[threading.Event] = None,
+        priority: Priority = Priority.NORMAL,
+        generation: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        self.calls += 1
+        if not self.records:
+            raise Exception("轨迹中没有更多 LLM 响应")
+        record = self.records.popleft()
+        error = record.get("error")
+        if error:
+            if error.startswith("LLMCancelledError"):
+                raise LLMCancelledError(error)
+            if error.startswith("LLMRequestShed"):
+                raise LLMRequestShed(error)
+            raise Exception(error)
+        if generation is not None and record.get("finishReason"):
+            generation["finishReason"] = record["finishReason"]
+        return record.get("response", "")
+
+
+def replay_trace(path: str, seed: int = 0, profilers: Optional[List[cProfile.Profile]] = None) -> Dict[str, Any]:
+    """
+    回放一个轨迹文件
+
+    Args:
+        path: 轨迹文件路径
+        seed: 兜底策略的随机种子
+        profilers: 传入列表时，每个决策线程用单独的 cProfile 分析并追加到列表中（cProfile 只分析当前线程）
+
+    Returns:
+        回放结果：polls、decisions（回合 -> 决策耗时毫秒）、actions、recordedActions、mismatches、elapsed
+    """
+    records = list(read_trace(path))
+    meta = next((r for r in records if r["kind"] == "meta"), {})
+    action_records = [r for r in records if r["kind"] == "action"]
+    llm_records = [r for r in records if r["kind"] == "llm"]
+
+    random.seed(seed)
+    agent = PlayerAgent(
+        {"gameId": meta.get("gameId"), "playerId": meta.get("playerId"), "playerIndex": meta.get("playerIndex")}
+    )
+    api_client = ReplayApiClient(action_records)
+    agent.api_client = api_client
+    agent.strategy.llm_client = ReplayLLMClient(llm_records)
+    agent.strategy.router = None
+    agent.is_running = True
+    if profilers is not None:
+        run_turn = agent.handle_my_turn_async
+
+        def profiled_turn(*args):
+            profiler = cProfile.Profile()
+            profilers.append(profiler)
+            profiler.runcall(run_turn, *args)
+
+        agent.handle_my_turn_async = profiled_turn
+
+    status: Optional[Dict[str, Any]] = None
+    decisions: List[Any] = []
+    polls = 0
+    start = time.perf_counter()
+    for record in records:
+        if record["kind"] != "status":
+            continue
+        if not agent.is_running:
+            break
+        if not record.get("success", True):
+            api_client.next_response = {"success": False}
+        elif record.get("unchanged"):
+            api_client.next_response = {"success": True, "unchanged": True}
+        else:
+            delta = {k: record[k] for k in ("full", "set", "unset", "historyAppend") if k in record}
+            status = apply_status_delta(status, delta)
+            offset = time.time() - record["wall"]
+            api_client.next_response = {"success": True, "data": shift_deadlines(status, offset)}
+
+        polls += 1
+        turn_start = time.perf_counter()
+        thread = agent.poll_once()
+        if thread:
+            thread.join()
+            decisions.append((agent.turn_tracker.turn_key, (time.perf_counter() - turn_start) * 1000))
+    elapsed = time.perf_counter() - start
+    agent.stop()
+
+    recorded = [r.get("action") for r in action_records]
+    mismatches = [
+        (i, want, got) for i, (want, got) in enumerate(zip(recorded, api_client.submitted)) if want != got
+    ]
+    if len(recorded) != len(api_client.submitted):
+        mismatches.append((min(len(recorded), len(api_client.submitted)), len(recorded), len(api_client.submitted)))
+    return {
+        "polls": polls,
+        "decisions": decisions,
+        "actions": api_client.submitted,
+        "recordedActions": recorded,
+        "mismatches": mismatches,
+        "elapsed": elapsed,
+        "recordedSeconds": records[-1]["t"] if records else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回放 Agent 轨迹")
+    parser.add_argument("trace")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="显示 Agent 日志")
+    parser.add_argument("--profile", action="store_true", help="用 cProfile 分析回放过程")
+    args = parser.parse_args()
+
+    profiler = cProfile.Profile() if args.profile else None
+    turn_profilers: Optional[List[cProfile.Profile]] = [] if args.profile else None
+    with contextlib.ExitStack() as stack:
+        if not args.verbose:
+            stack.enter_context(contextlib.redirect_stdout(open(os.devnull, "w")))
+        if profiler:
+            profiler.enable()
+        result = replay_trace(args.trace, args.seed, turn_profilers)
+        if profiler:
+            profiler.disable()
+
+    print(
+        f"[回放] {result['polls']} 次轮询，{len(result['decisions'])} 个回合，"
+        f"用时 {result['elapsed']:.2f}s（录制时长 {result['recordedSeconds']:.1f}s）"
+    )
+    for turn_key, ms in result["decisions"]:
+        print(f"[回放]   {turn_key:<24} {ms:8.1f}ms")
+    if result["mismatches"]:
+        print(f"[回放] ✗ {len(result['mismatches'])} 个行动与录制不一致")
+        for index, want, got in result["mismatches"]:
+            print(f"[回放]   #{index}: 录制 {want}，回放 {got}")
+    else:
+        print(f"[回放] ✓ {len(result['actions'])} 个行动与录制一致")
+
+    if profiler:
+        out = io.StringIO()
+        stats = pstats.Stats(profiler, stream=out)
+        for turn_profiler in turn_profilers:
+            stats.add(turn_profiler)
+        stats.sort_stats("cumulative").print_stats(20)
+        print(out.getvalue())
+
+    raise SystemExit(1 if result["mismatches"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""
+身份推算
+
+6 人局（2 狼人、1 预言家、1 女巫、2 村民）的身份分配只有 C(6,2) × 4 × 3 = 180 种。这里把每种分配编码成
+(狼人位掩码, 预言家位掩码, 女巫位掩码)，按已知的硬事实逐条过滤，剩下的就是与事实一致的所有可能，
+每个玩家是狼人的概率 = 他是狼人的可能数 / 总可能数（精确值，不是估计）。
+
+使用的事实（都是确定信息，发言里的声明和报验人不算）：
+- 我的角色；玩家列表里可见的角色（狼人队友、结算时公布的身份）
+- 历史中我能看到的夜间行动：验人结果（验人者是预言家，目标是狼人 / 好人）、刀人者是狼人、用药者是女巫
+- 一夜死两人说明女巫用了毒药，那一夜开始时女巫还活着
+- 游戏还在进行（只在配置了胜负规则时使用，服务器没有公开规则，默认不用）：
+  side 为屠边（狼人、村民、神职都还有人存活），parity 为狼人数少于好人数。只用阶段转换之前公布的死亡
+  （遗言在胜负判定之前，最近一次死亡不能说明游戏还没结束）
+
+胜负规则只是假设，规则配错时会排除掉真实分配；需要确定结论的地方（女巫毒人）用 certain_wolves()，只看硬事实。
+
+历史按消息 id 增量处理；出现与已有事实矛盾的信息（例如数据异常）时忽略该条，不会把可能清空。
+其他人数的对局没有固定配置，推算不启用。
+"""
+from itertools import combinations
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+try:
+    from .game_view import GameView, Phase, Role, as_view
+except ImportError:
+    from game_view import GameView, Phase, Role, as_view
+
+# 人数 -> (狼人数, 预言家数, 女巫数)，其余为村民
+ROLE_COUNTS = {6: (2, 1, 1)}
+# 可选的胜负规则：side 屠边，parity 狼人数不少于好人数时狼人胜
+WIN_RULES = ("side", "parity")
+
+# (狼人位掩码, 预言家位掩码, 女巫位掩码)
+World = Tuple[int, int, int]
+
+
+def enumerate_worlds(size: int, wolves: int, seers: int, witches: int) -> List[World]:
+    """
+    枚举所有身份分配
+
+    Args:
+        size: 玩家人数（第 i 个座位对应第 i 位）
+        wolves: 狼人数
+        seers: 预言家数
+        witches: 女巫数
+
+    Returns:
+        位掩码三元组列表
+    """
+    seats = range(size)
+    worlds = []
+    for wolf_seats in combinations(seats, wolves):
+        wolf_mask = sum(1 << s for s in wolf_seats)
+        rest = [s for s in seats if not wolf_mask >> s & 1]
+        for seer_seats in combinations(rest, seers):
+            seer_mask = sum(1 << s for s in seer_seats)
+            rest2 = [s for s in rest if not seer_mask >> s & 1]
+            for witch_seats in combinations(rest2, witches):
+                worlds.append((wolf_mask, seer_mask, sum(1 << s for s in witch_seats)))
+    return worlds
+
+
+def _has_role(world: World, bit: int, role: Role) -> bool:
+    wolf, seer, witch = world
+    if role is Role.WEREWOLF:
+        return bool(wolf & bit)
+    if role is Role.SEER:
+        return bool(seer & bit)
+    if role is Role.WITCH:
+        return bool(witch & bit)
+    return not (wolf | seer | witch) & bit
+
+
+def _game_continues(world: World, alive: int, win_rule: str) -> bool:
+    """按胜负规则，存活玩家为 alive 时这种分配下游戏是否还在进行"""
+    wolf, seer, witch = world
+    if not wolf & alive:
+        return False
+    if win_rule == "side":
+        return bool((seer | witch) & alive) and bool(~(wolf | seer | witch) & alive)
+    return bin(wolf & alive).count("1") < bin(~wolf & alive).count("1")
+
+
+class RoleSolver:
+    """增量身份推算"""
+
+    def __init__(self, win_rule: Optional[str] = None):
+        """
+        Args:
+            win_rule: 胜负规则（WIN_RULES 之一，可选），配置后用“游戏还在进行”进一步缩小可能
+        """
+        if win_rule is not None and win_rule not in WIN_RULES:
+            raise ValueError(f"未知的胜负规则: {win_rule}")
+        self.win_rule = win_rule
+        self.reset()
+
+    def reset(self):
+        """清空（新的一局）"""
+        self.players: Tuple[Any, ...] = ()
+        self.bits: Dict[Any, int] = {}
+        self.all_mask = 0
+        self.worlds: List[World] = []
+        # 已应用的身份事实 (玩家, 角色)，避免每次轮询重复过滤
+        self.known_roles: set = set()
+        # 已处理的消息数和最后一条消息 id（只用于前缀校验）
+        self.seen_count = 0
+        self.last_id: Any = None
+        self.phase: Optional[Phase] = None
+        self.dead_mask = 0
+        # 最近一次阶段转换时已公布的死亡（之后游戏仍在进行）
+        self.settled_dead = 0
+        self.night_start_dead = 0
+        self.night_dead = 0
+        self.finished = False
+        # 与已有事实矛盾而被忽略的信息数
+        self.conflicts = 0
+        # ((可能数, 死亡掩码, 是否结束), 玩家 -> 狼人可能数, 总可能数)
+        self._cache: Optional[Tuple[Tuple[int, int, bool], Dict[Any, int], int]] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.worlds)
+
+    def _setup(self, view: GameView) -> bool:
+        """按玩家列表准备全部可能；人数没有固定配置时返回 False"""
+        players = tuple(sorted(p.index for p in view.players if p.index is not None))
+        if players == self.players:
+            return self.enabled
+        self.reset()
+        self.players = players
+        counts = ROLE_COUNTS.get(len(players))
+        if not counts:
+            return False
+        self.bits = {player: 1 << seat for seat, player in enumerate(players)}
+        self.all_mask = (1 << len(players)) - 1
+        self.worlds = enumerate_worlds(len(players), *counts)
+        return True
+
+    def _constrain(self, keep) -> bool:
+        kept = [w for w in self.worlds if keep(w)]
+        if not kept:
+            self.conflicts += 1
+            return False
+        self.worlds = kept
+        return True
+
+    def _fix_role(self, player: Any, role: Optional[Role]):
+        bit = self.bits.get(player)
+        if bit is None or role is None or (player, role) in self.known_roles:
+            return
+        self.known_roles.add((player, role))
+        self._constrain(lambda w: _has_role(w, bit, role))
+
+    def _fix_good(self, player: Any):
+        bit = self.bits.get(player)
+        if bit is not None:
+            self._constrain(lambda w: not w[0] & bit)
+
+    def _mark_dead(self, player: Any):
+        bit = self.bits.get(player, 0)
+        self.dead_mask |= bit
+        if bit and self.phase in (Phase.NIGHT, Phase.DAY_SPEECH) and not self.night_dead & bit:
+            self.night_dead |= bit
+            # 一夜两人死亡：女巫用了毒药，夜里开始时女巫还活着
+            if bin(self.night_dead).count("1") == 2:
+                before = self.night_start_dead
+                self._constrain(lambda w: not w[2] & before)
+
+    def update(self, game_status: Union[GameView, Dict[str, Any]]) -> int:
+        """
+        处理新增的历史消息和可见身份
+
+        Args:
+            game_status: 游戏状态（GameView 或原始字典）
+
+        Returns:
+            本次新处理的消息数
+        """
+        view = as_view(game_status)
+        history = view.history
+        known = self.seen_count
+        # 历史只追加；前缀对不上时整体重建
+        if known > len(history) or (known and history[known - 1].get("id") != self.last_id):
+            self.players = ()
+            known = 0
+        if not self._setup(view):
+            return 0
+        self._fix_role(view.my_index, view.my_role)
+        for player in view.players:
+            self._fix_role(player.index, player.role)
+        if view.status == "finished" or view.phase is Phase.GAME_OVER:
+            self.finished = True
+
+        for msg in history[known:]:
+            self._apply(msg)
+        if len(history) > known:
+            self.seen_count = len(history)
+            self.last_id = history[-1].get("id")
+        # 玩家列表里的死亡状态（不依赖死亡消息的格式）
+        for player in view.players:
+            if not player.is_alive:
+                self.dead_mask |= self.bits.get(player.index, 0)
+        return len(history) - known
+
+    def _apply(self, msg: Dict[str, Any]):
+        metadata = msg.get("metadata") or {}
+        metatype = str(metadata.get("metatype", "")).lower()
+        speaker = msg.get("playerIndex")
+        if metatype == "phase_transition":
+            self.phase = Phase.parse(metadata.get("toPhase"))
+            self.settled_dead = self.dead_mask
+            if self.phase is Phase.NIGHT:
+                self.night_start_dead = self.dead_mask
+                self.night_dead = 0
+            elif self.phase is Phase.GAME_OVER:
+                self.finished = True
+        elif metatype == "check" and speaker is not None:
+            self._fix_role(speaker, Role.SEER)
+            if str(metadata.get("result", "")).lower() == "werewolf":
+                self._fix_role(metadata.get("target"), Role.WEREWOLF)
+            else:
+                self._fix_good(metadata.get("target"))
+        elif metatype == "kill" and speaker is not None:
+            self._fix_role(speaker, Role.WEREWOLF)
+        elif metatype in ("heal", "poison") and speaker is not None:
+            self._fix_role(speaker, Role.WITCH)
+        elif metatype == "player_dead":
+            self._mark_dead(metadata.get("playerIndex", speaker))
+
+    # ---------- 查询 ----------
+
+    def _alive_worlds(self) -> List[World]:
+        """加上“游戏还在进行”的约束后的可能（未配置胜负规则、游戏结束后或约束矛盾时不加）"""
+        if self.win_rule is None or self.finished or not self.settled_dead:
+            return self.worlds
+        alive = self.all_mask & ~self.settled_dead
+        kept = [w for w in self.worlds if _game_continues(w, alive, self.win_rule)]
+        return kept or self.worlds
+
+    def _solve(self) -> Tuple[Dict[Any, int], int]:
+        # 可能只会减少，(可能数, 死亡掩码, 是否结束) 不变时结果不变
+        key = (len(self.worlds), self.settled_dead, self.finished)
+        if self._cache is None or self._cache[0] != key:
+            worlds = self._alive_worlds()
+            counts = {player: 0 for player in self.players}
+            for wolf, _, _ in worlds:
+                for player, bit in self.bits.items():
+                    if wolf & bit:
+                        counts[player] += 1
+            self._cache = (key, counts, len(worlds))
+        return self._cache[1], self._cache[2]
+
+    def certain_wolves(self) -> List[Any]:
+        """只按硬事实（不用胜负规则）确定是狼人的玩家"""
+        wolves = self.all_mask
+        for wolf, _, _ in self.worlds:
+            wolves &= wolf
+        return [player for player in self.players if self.worlds and wolves & self.bits[player]]
+
+    def world_count(self) -> int:
+        """与事实一致的可能数"""
+        return self._solve()[1] if self.enabled else 0
+
+    def probabilities(self) -> Dict[Any, float]:
+        """
+        每个玩家是狼人的精确概率
+
+        Returns:
+            玩家编号 -> 概率（推算未启用时为空字典）
+        """
+        if not self.enabled:
+            return {}
+        counts, total = self._solve()
+        return {player: count / total for player, count in counts.items()}
+
+    def summary(self, my_index: Any = None, alive: Optional[List[Any]] = None) -> str:
+        """
+        提示词用的简短摘要：存活的其他玩家的狼人概率；推算未启用或概率全部相同（没有信息）时返回空字符串
+
+        Args:
+            my_index: 我的编号（不列出）
+            alive: 存活玩家编号（可选，默认按已知死亡推算）
+
+        Returns:
+            多行文本（以换行结尾）
+        """
+        if not self.enabled:
+            return ""
+        counts, total = self._solve()
+        if alive is None:
+            alive = [p for p in self.players if not self.dead_mask & self.bits[p]]
+        listed = [p for p in alive if p != my_index and p in counts]
+        if len({counts[p] for p in listed}) <= 1:
+            return ""
+        # 整数运算四舍五入，与 JS 版一致
+        parts = [f"{p} 号 {(counts[p] * 200 + total) // (2 * total)}%" for p in listed]
+        return f"\n身份推算（按已知事实穷举，共 {total} 种可能）：\n- 狼人概率：{'，'.join(parts)}\n"
+
+
+def build_role_solver(game_status: Union[GameView, Dict[str, Any]], win_rule: Optional[str] = None) -> RoleSolver:
+    """从完整状态构建身份推算"""
+    solver = RoleSolver(win_rule)
+    solver.update(game_status)
+    return solver
@@ -0,0 +1,313 @@
+"""
+无界面狼人杀引擎
+
+在进程内按 README 的规则跑完整局游戏，用于自对弈比较策略：
+- 6 名玩家：2 狼人、1 预言家、1 女巫、2 村民
+- 阶段：night（狼人杀人 → 预言家验人 → 女巫行动）→ day_speech（遗言、发言）→ day_vote → 平票时 pk_speech / pk_vote
+- 胜负（屠边）：狼人全部出局好人胜；村民全部出局或神职全部出局狼人胜
+
+每次需要某个玩家行动时，都会为该玩家生成与 /status 接口相同结构的 game_status
+（含 myTurn.actionContext、按可见性过滤的 history），交给 GameStrategy.decide_action。
+"""
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    from .action_validator import validate_action
+except ImportError:
+    from action_validator import validate_action
+
+ROLES_6 = ["WEREWOLF", "WEREWOLF", "SEER", "WITCH", "VILLAGER", "VILLAGER"]
+ACTION_TIMEOUT_SECONDS = 15
+MAX_DAYS = 10
+
+# (玩家编号, 角色) -> 带 decide_action 协程方法的策略对象（通常是 GameStrategy）
+StrategyFactory = Callable[[int, str], Any]
+
+
+class SimulatedGame:
+    """一局模拟游戏"""
+
+    def __init__(self, strategy_factory: StrategyFactory, seed: Optional[int] = None, game_id: str = "sim"):
+        """
+        Args:
+            strategy_factory: 为每个座位创建策略的工厂
+            seed: 随机种子（身份分配、狼人分歧时的刀口选择）
+            game_id: 游戏 ID
+        """
+        self.rng = random.Random(seed)
+        self.game_id = game_id
+        roles = list(ROLES_6)
+        self.rng.shuffle(roles)
+        self.roles: Dict[int, str] = {i + 1: role for i, role in enumerate(roles)}
+        self.alive = set(self.roles)
+        self.strategies = {i: strategy_factory(i, role) for i, role in self.roles.items()}
+        self.day = 0
+        self.phase = "game_setting"
+        self.status = "running"
+        self.has_heal = True
+        self.has_poison = True
+        # (消息, 可见玩家集合；None 表示所有人可见)
+        self.history: List[Tuple[Dict[str, Any], Optional[frozenset]]] = []
+        self.clock = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        self.invalid_actions = 0
+        self.loop = asyncio.new_event_loop()
+
+    # ---------- 状态 ----------
+
+    def _now(self) -> str:
+        self.clock += timedelta(seconds=1)
+        return self.clock.isoformat().replace("+00:00", "Z")
+
+    def _add(self, msg: Dict[str, Any], visible_to: Optional[frozenset] = None):
+        msg.setdefault("id", f"{self.game_id}-{len(self.history)}")
+        msg.setdefault("timestamp", self._now())
+        self.history.append((msg, visible_to))
+
+    def _system(self, content: str, metadata: Dict[str, Any], with_phase: bool = True):
+        msg = {"type": "system", "content": content, "metadata": metadata}
+        if with_phase:
+            msg["phase"] = self.phase
+            msg["day"] = self.day
+        self._add(msg)
+
+    def _player(self, index: int, content: str, metadata: Dict[str, Any], visible_to: Optional[frozenset] = None):
+        msg = {"type": "player", "phase": self.phase, "day": self.day, "playerIndex": index}
+        msg["content"] = content
+        msg["metadata"] = metadata
+        self._add(msg, visible_to)
+
+    def _set_phase(self, phase: str):
+        self._system(
+            f"阶段转换：从 {self.phase} 转换到 {phase}",
+            {"metatype": "phase_transition", "fromPhase": self.phase, "toPhase": phase, "day": self.day},
+        )
+        self.phase = phase
+
+    def _wolves(self) -> List[int]:
+        return [i for i, role in self.roles.items() if role == "WEREWOLF"]
+
+    def status_for(self, index: int, action_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        生成某个玩家视角的 game_status（与 /status 接口的 data 结构一致）
+
+        Args:
+            index: 玩家编号
+            action_context: 当前行动上下文（可选），提供时 myTurn.canAct 为 True
+
+        Returns:
+            游戏状态字典
+        """
+        my_role = self.roles[index]
+        is_wolf = my_role == "WEREWOLF"
+        players = []
+        for i in sorted(self.roles):
+            player = {"playerIndex": i, "name": f"Sim Player {i}", "isAlive": i in self.alive}
+            if is_wolf and self.roles[i] == "WEREWOLF":
+                player["role"] = "WEREWOLF"
+            players.append(player)
+
+        status = {
+            "gameId": self.game_id,
+            "status": self.status,
+            "day": self.day,
+            "phase": self.phase,
+            "myPlayerIndex": index,
+            "myRole": my_role,
+            "myIsAlive": index in self.alive,
+            "players": players,
+            "alivePlayerIndexes": sorted(self.alive),
+            "history": [msg for msg, visible in self.history if visible is None or index in visible],
+        }
+        if my_role == "WITCH":
+            status["myHasHealPotion"] = self.has_heal
+            status["myHasPoisonPotion"] = self.has_poison
+
+        if action_context:
+            # 截止时间用真实时间，策略里按剩余时间做的判断（重试、优先级、路由）才与线上一致
+            deadline = datetime.now(timezone.utc) + timedelta(seconds=ACTION_TIMEOUT_SECONDS)
+            action_context = dict(action_context, deadline=deadline.isoformat().replace("+00:00", "Z"))
+            status["myTurn"] = {
+                "canAct": True,
+                "deadline": int(deadline.timestamp() * 1000),
+                "remainingTime": ACTION_TIMEOUT_SECONDS,
+                "actionType": action_context["actionType"],
+                "actionContext": action_context,
+            }
+        else:
+            status["myTurn"] = {"canAct": False}
+        return status
+
+    # ---------- 行动 ----------
+
+    def ask(self, index: int, action_context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        让玩家行动；非法行动视为被服务器拒绝（超时未行动），返回 None
+
+        Args:
+            index: 玩家编号
+            action_context: 行动上下文
+
+        Returns:
+            合法行动或 None
+        """
+        status = self.status_for(index, action_context)
+        action = self.loop.run_until_complete(self.strategies[index].decide_action(status))
+        if not action or validate_action(action, status["myTurn"]["actionContext"]):
+            self.invalid_actions += 1
+            return None
+        return action
+
+    def _speak(self, index: int, action_type: str, extra: Optional[Dict[str, Any]] = None):
+        context = dict(extra or {}, actionType=action_type)
+        action = self.ask(index, context)
+        content = (action or {}).get("content", "")
+        speech_type = "last_words" if action_type == "last_words" else ("pk" if action_type == "pk_speech" else "normal")
+        self._player(index, content, {"metatype": "say", "speechType": speech_type})
+
+    def _kill(self, index: int, reason: str):
+        self.alive.discard(index)
+        self._system(f"玩家{index}{reason}", {"metatype": "player_dead", "playerIndex": index}, with_phase=False)
+
+    # ---------- 流程 ----------
+
+    def winner(self) -> Optional[str]:
+        """胜负判定：返回 'villager'、'werewolf'，未结束返回 None"""
+        alive_roles = [self.roles[i] for i in self.alive]
+        if "WEREWOLF" not in alive_roles:
+            return "villager"
+        if "VILLAGER" not in alive_roles or ("SEER" not in alive_roles and "WITCH" not in alive_roles):
+            return "werewolf"
+        return None
+
+    def night(self) -> List[int]:
+        """夜晚阶段，返回夜里死亡的玩家"""
+        self.day += 1
+        self._set_phase("night")
+        alive = sorted(self.alive)
+        wolves = [i for i in self._wolves() if i in self.alive]
+        wolf_view = frozenset(self._wolves())
+
+        picks = []
+        for wolf in wolves:
+            action = self.ask(
+                wolf,
+                {"actionType": "kill", "availableTargets": alive, "teammates": [w for w in wolves if w != wolf]},
+            )
+            if action:
+                picks.append(action["target"])
+                self._player(wolf, f"玩家{wolf} 选择击杀玩家{action['target']}", {"metatype": "kill", "target": action["target"]}, wolf_view)
+        killed = self.rng.choice(picks) if picks else None
+
+        for seer in (i for i in alive if self.roles[i] == "SEER"):
+            action = self.ask(seer, {"actionType": "check", "availableTargets": [i for i in alive if i != seer]})
+            if action:
+                target = action["target"]
+                result = "werewolf" if self.roles[target] == "WEREWOLF" else "villager"
+                text = "狼人" if result == "werewolf" else "好人"
+                self._player(seer, f"玩家{seer} 验证玩家{target}，结果是{text}", {"metatype": "check", "target": target, "result": result}, frozenset([seer]))
+
+        deaths = {killed} if killed is not None else set()
+        for witch in (i for i in alive if self.roles[i] == "WITCH"):
+            action = self.ask(
+                witch,
+                {
+                    "actionType": "witch_action",
+                    "killedPlayer": killed,
+                    "hasHealPotion": self.has_heal,
+                    "hasPoisonPotion": self.has_poison,
+                    "availablePoisonTargets": [i for i in alive if i != witch] if self.has_poison else [],
+                },
+            )
+            if action and action["action"] == "heal":
+                self.has_heal = False
+                deaths.discard(killed)
+                self._player(witch, f"玩家{witch} 使用解药救了玩家{killed}", {"metatype": "heal", "target": killed}, frozenset([witch]))
+            elif action and action["action"] == "poison":
+                self.has_poison = False
+                deaths.add(action["target"])
+                self._player(witch, f"玩家{witch} 使用毒药毒了玩家{action['target']}", {"metatype": "poison", "target": action["target"]}, frozenset([witch]))
+        return sorted(deaths)
+
+    def day_phase(self, night_deaths: List[int]):
+        """白天阶段：公布死讯、遗言、发言、投票、PK"""
+        self._set_phase("day_speech")
+        if not night_deaths:
+            self._system("昨晚是平安夜", {"metatype": "peaceful_night"}, with_phase=False)
+        for index in night_deaths:
+            self._kill(index, "昨晚死亡")
+        if self.winner():
+            return
+        if self.day == 1:
+            for index in night_deaths:
+                self._speak(index, "last_words", {"deathReason": "夜晚死亡"})
+
+        for index in sorted(self.alive):
+            self._speak(index, "speech", {"speechOrder": len(self.alive)})
+
+        self._set_phase("day_vote")
+        out = self._vote(sorted(self.alive), sorted(self.alive), "vote", "availableTargets")
+        if out is None:
+            return
+        if isinstance(out, list):
+            candidates = out
+            self._set_phase("pk_speech")
+            for index in candidates:
+                self._speak(index, "pk_speech", {"pkCandidates": candidates})
+            self._set_phase("pk_vote")
+            voters = [i for i in sorted(self.alive) if i not in candidates] or sorted(self.alive)
+            out = self._vote(voters, candidates, "pk_vote", "pkCandidates")
+            if not isinstance(out, int):
+                self._system("PK 仍然平票，无人出局", {"metatype": "no_elimination"}, with_phase=False)
+                return
+        self._kill(out, "被投票出局")
+        self._speak(out, "last_words", {"deathReason": "被投票出局"})
+
+    def _vote(self, voters: List[int], candidates: List[int], action_type: str, key: str):
+        """投票；返回出局玩家、平票候选人列表，或无人得票时返回 None"""
+        tally: Dict[int, int] = {}
+        for voter in voters:
+            targets = [c for c in candidates if c != voter] if action_type == "vote" else candidates
+            action = self.ask(voter, {"actionType": action_type, key: targets})
+            target = (action or {}).get("target")
+            self._player(
+                voter,
+                f"玩家{voter} 投票给玩家{target}" if target is not None else f"玩家{voter} 弃票",
+                {"metatype": "vote", "target": target, "voteType": "pk" if action_type == "pk_vote" else "normal", "valid": True},
+            )
+            if target is not None:
+                tally[target] = tally.get(target, 0) + 1
+        if not tally:
+            return None
+        top = max(tally.values())
+        leaders = sorted(t for t, votes in tally.items() if votes == top)
+        return leaders[0] if len(leaders) == 1 else leaders
+
+    def run(self) -> Dict[str, Any]:
+        """
+        跑完整局
+
+        Returns:
+            结果：winner（villager/werewolf/draw）、roles、days、invalidActions
+        """
+        try:
+            self._system("游戏开始", {"metatype": "game_start", "playerCount": len(self.roles)}, with_phase=False)
+            winner = None
+            while self.day < MAX_DAYS:
+                deaths = self.night()
+                self.day_phase(deaths)
+                winner = self.winner()
+                if winner:
+                    break
+            self.status = "finished"
+            self.phase = "game_over"
+            return {
+                "winner": winner or "draw",
+                "roles": dict(self.roles),
+                "days": self.day,
+                "invalidActions": self.invalid_actions,
+            }
+        finally:
+            self.loop.close()
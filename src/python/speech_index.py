@@ -0,0 +1,292 @@
+"""
+发言要点索引
+
+从发言（speech / last_words / pk 发言）的自由文本里提取结构化事实，按消息 id 增量索引，每条发言只解析一次：
+- 身份声明：谁声称自己是预言家 / 女巫 / 平民 / 好人
+- 报验人：谁声称验了谁、结果是好人（金水）还是狼人（查杀）
+- 指认：谁说谁是狼、怀疑谁、要投谁
+
+结果以紧凑的结构化事实提供给提示词摘要和兜底策略。提取基于正则，只覆盖常见说法，仅供参考。
+"""
+import re
+from typing import Any, Dict, List, Optional
+
+ROLE_NAMES = {"预言家": "SEER", "女巫": "WITCH", "平民": "VILLAGER", "村民": "VILLAGER", "好人": "GOOD"}
+ROLE_LABELS = {"SEER": "预言家", "WITCH": "女巫", "VILLAGER": "平民", "GOOD": "好人"}
+CHECK_RESULTS = {"好人": "good", "金水": "good", "狼人": "werewolf", "狼": "werewolf", "查杀": "werewolf"}
+
+_ROLE = "预言家|女巫|平民|村民|好人"
+_NUM = r"(\d+)\s*号?\s*(?:玩家)?"
+# 第一人称声明：“我是预言家”“我的身份是女巫”“我作为女巫”“作为 3 号平民”，身份紧跟在“是 / 作为”后面；
+# “如果我是女巫”之类的假设不算，“我更倾向于是女巫用了救药”这类转述也不会命中；引号里的话见 _is_quoted
+_SELF_CLAIM = re.compile(
+    r"(?<!如果)(?<!假如)(?<!要是)(?<!假设)我(?:的身份)?(?:才|就|其实|确实|真的)?是(?:一?个|一名)?(?:真的?)?("
+    + _ROLE
+    + r")|我作为(?:\d+\s*号)?(?:玩家)?的?("
+    + _ROLE
+    + r")|作为\d+\s*号(?:玩家)?的?("
+    + _ROLE
+    + ")"
+)
+_CHECK_PATTERNS = [
+    # 验了 3 号，他是好人 / 查验 3 号玩家结果是狼人
+    re.compile(r"(?:查验|验)了?\s*" + _NUM + r"[，,]?\s*(?:他|她|结果)?(?:是|为)?\s*(?:一?[个张匹头只名])?(好人|金水|狼人|查杀|狼)"),
+    # 给 3 号发金水 / 给 3 号查杀
+    re.compile(r"给\s*" + _NUM + r"发?了?一?[个张]?(金水|查杀)"),
+    # 3 号是我的金水 / 查杀（本身就是第一人称）
+    re.compile(_NUM + r"是我的?(金水|查杀)"),
+    # 查杀 3 号
+    re.compile(r"(查杀)\s*" + _NUM.replace("(\\d+)", "(?P<target>\\d+)")),
+]
+# 报验人的主语：紧挨在报验说法前面的“我（昨晚）”，或者另一名玩家（转述别人的报验）
+_FIRST_PERSON = re.compile(r"我(?:昨晚|昨天晚上|昨天|今晚|首夜|第一晚|晚上|刚才|已经|也|就)*\s*$")
+_OTHER_SUBJECT = re.compile(r"\d+\s*号(?:玩家)?\s*$")
+_CLAUSE_END = re.compile(r"[，。！？,.!?；;\n]")
+# 引用别人的话：在引号里，或者紧跟在“说（：）”后面
+_QUOTE_PAIRS = (("“", "”"), ("「", "」"), ("『", "』"), ("‘", "’"))
+_REPORTED_SPEECH = re.compile(r"说[：:]?\s*$")
+_ACCUSATIONS = [
+    re.compile(_NUM + r"(?:[^，。！？,.!?\d]{0,4})(?:是|像|就是|肯定是|应该是|铁)(?:一?[个张匹头只名])?(?:狼人?|查杀)"),
+    re.compile(r"(?:怀疑|投|出|票|归票给?)\s*" + _NUM),
+]
+SPEECH_METATYPES = ("say", "last_words", "speech")
+
+
+class SpeechIndex:
+    """按消息 id 增量索引的发言要点"""
+
+    def __init__(self):
+        # 已索引的消息数和最后一条消息 id（只用于前缀校验，不保留全部 id）
+        self.seen_count = 0
+        self.last_id: Any = None
+        # 玩家 -> 最近一次声明的身份
+        self.claims: Dict[int, str] = {}
+        # 首次声明顺序（玩家, 身份），每对只记一次，长局里反复改口也不会增长
+        self.claim_order: List[List[Any]] = []
+        # {"speaker", "target", "result", "day"}，同一发言者对同一目标的同一结果只记一次
+        self.check_reports: List[Dict[str, Any]] = []
+        # {"speaker", "target", "day"}，同一对（发言者, 目标）只记一次，day 为最近一次
+        self.accusations: List[Dict[str, Any]] = []
+        # summary() 的缓存，索引有新消息时失效
+        self.summary_cache: Optional[str] = None
+
+    def reset(self):
+        self.__init__()
+
+    def update(self, history: List[Dict[str, Any]]) -> int:
+        """
+        索引新增的消息
+
+        Args:
+            history: 完整历史消息
+
+        Returns:
+            本次新索引的消息数
+        """
+        known = self.seen_count
+        # 历史只追加；前缀对不上时（新的一局或服务器重排）整体重建
+        if known > len(history) or (known and history[known - 1].get("id") != self.last_id):
+            self.reset()
+            known = 0
+        for msg in history[known:]:
+            self.index_message(msg)
+        if len(history) > known:
+            self.seen_count = len(history)
+            self.last_id = history[-1].get("id")
+            self.summary_cache = None
+        return len(history) - known
+
+    def index_message(self, msg: Dict[str, Any]):
+        """解析单条消息（非发言消息直接忽略）"""
+        metadata = msg.get("metadata") or {}
+        if str(metadata.get("metatype", "")).lower() not in SPEECH_METATYPES:
+            return
+        speaker = msg.get("playerIndex")
+        content = msg.get("content") or ""
+        day = msg.get("day")
+        if speaker is None or not content:
+            return
+
+        for match in _SELF_CLAIM.finditer(content):
+            if _is_quoted(content, match.start()):
+                continue
+            role = ROLE_NAMES[next(group for group in match.groups() if group)]
+            # “好人”声明不覆盖具体身份
+            if role == "GOOD" and speaker in self.claims:
+                continue
+            self.claims[speaker] = role
+            if [speaker, role] not in self.claim_order:
+                self.claim_order.append([speaker, role])
+
+        reported = set()
+        for pattern in _CHECK_PATTERNS:
+            for match in pattern.finditer(content):
+                groups = match.groupdict()
+                if groups.get("target"):
+                    target, word = int(groups["target"]), match.group(1)
+                else:
+                    target, word = int(match.group(1)), match.group(2)
+                if target == speaker or target in reported:
+                    continue
+                if pattern is not _CHECK_PATTERNS[2] and not self._reports_own_check(speaker, content, match.start()):
+                    continue
+                reported.add(target)
+                report = {"speaker": speaker, "target": target, "result": CHECK_RESULTS[word], "day": day}
+                if not any(
+                    r["speaker"] == speaker and r["target"] == target and r["result"] == report["result"]
+                    for r in self.check_reports
+                ):
+                    self.check_reports.append(report)
+
+        accused = set()
+        for pattern in _ACCUSATIONS:
+            for match in pattern.finditer(content):
+                target = int(match.group(1))
+                if target == speaker or target in accused:
+                    continue
+                # 已经作为查杀报过的不再重复记为指认
+                if any(
+                    r["speaker"] == speaker and r["target"] == target and r["result"] == "werewolf"
+                    for r in self.check_reports
+                ):
+                    continue
+                accused.add(target)
+                existing = next(
+                    (a for a in self.accusations if a["speaker"] == speaker and a["target"] == target), None
+                )
+                if existing:
+                    existing["day"] = day
+                else:
+                    self.accusations.append({"speaker": speaker, "target": target, "day": day})
+
+    def _reports_own_check(self, speaker: Any, content: str, position: int) -> bool:
+        """
+        报验说法是不是发言者自己的验人结果：主语是“我”，或者发言者声称预言家且没有转述别人
+
+        Args:
+            speaker: 发言者
+            content: 发言内容
+            position: 报验说法的起始位置
+        """
+        clause_start = 0
+        for clause_end in _CLAUSE_END.finditer(content, 0, position):
+            clause_start = clause_end.end()
+        prefix = content[clause_start:position]
+        if _OTHER_SUBJECT.search(prefix) or _is_quoted(content, position):
+            return False
+        return bool(_FIRST_PERSON.search(prefix)) or self.claims.get(speaker) == "SEER"
+
+    # ---------- 查询 ----------
+
+    def claimants(self, role: str) -> List[int]:
+        """当前声明为某身份的玩家（按首次声明顺序）"""
+        seen = []
+        for player, claimed in self.claim_order:
+            if claimed == role and self.claims.get(player) == role and player not in seen:
+                seen.append(player)
+        return seen
+
+    def reports_on(self, target: int) -> List[Dict[str, Any]]:
+        """关于某个玩家的报验人结果"""
+        return [r for r in self.check_reports if r["target"] == target]
+
+    def accusation_counts(self) -> Dict[int, int]:
+        """每个玩家被指认的次数（同一发言者只计一次）"""
+        counts: Dict[int, int] = {}
+        for target in (a["target"] for a in self.accusations):
+            counts[target] = counts.get(target, 0) + 1
+        return counts
+
+    def facts(self) -> Dict[str, Any]:
+        """结构化事实"""
+        return {
+            "claims": dict(self.claims),
+            "checkReports": list(self.check_reports),
+            "accusations": list(self.accusations),
+        }
+
+    def summary(self) -> str:
+        """
+        提示词用的简短摘要，没有任何要点时返回空字符串
+
+        Returns:
+            多行文本（以换行结尾）
+        """
+        if self.summary_cache is None:
+            self.summary_cache = self._render_summary()
+        return self.summary_cache
+
+    def _render_summary(self) -> str:
+        lines = []
+        if self.claims:
+            by_role: Dict[str, List[str]] = {}
+            for player, role in sorted(self.claims.items()):
+                by_role.setdefault(role, []).append(str(player))
+            parts = [f"{'、'.join(players)} 号{ROLE_LABELS[role]}" for role, players in by_role.items()]
+            lines.append(f"- 身份声明：{'；'.join(parts)}")
+        if self.check_reports:
+            parts = [
+                f"{r['speaker']} 号 → {r['target']} 号{'查杀' if r['result'] == 'werewolf' else '金水'}"
+                for r in self.check_reports
+            ]
+            lines.append(f"- 报验人：{'；'.join(parts)}")
+        if self.accusations:
+            pairs = [f"{a['speaker']}→{a['target']}" for a in self.accusations]
+            lines.append(f"- 指认 / 怀疑：{'，'.join(pairs)}")
+        if not lines:
+            return ""
+        return "\n发言要点（自动提取，仅供参考）：\n" + "\n".join(lines) + "\n"
+
+    # ---------- 检查点 ----------
+
+    def get_state(self) -> Dict[str, Any]:
+        return {
+            "seenCount": self.seen_count,
+            "lastId": self.last_id,
+            "claims": [[player, role] for player, role in self.claims.items()],
+            "claimOrder": list(self.claim_order),
+            "checkReports": list(self.check_reports),
+            "accusations": list(self.accusations),
+        }
+
+    def restore_state(self, state: Dict[str, Any]):
+        self.seen_count = state.get("seenCount", 0)
+        self.last_id = state.get("lastId")
+        self.claims = {player: role for player, role in state.get("claims", [])}
+        self.claim_order = [list(item) for item in state.get("claimOrder", [])]
+        self.check_reports = list(state.get("checkReports", []))
+        self.accusations = list(state.get("accusations", []))
+        self.summary_cache = None
+
+
+def _is_quoted(content: str, position: int) -> bool:
+    """
+    某个位置是不是在引用别人的话（引号里，或者紧跟在“说”后面）
+
+    Args:
+        content: 发言内容
+        position: 说法的起始位置
+    """
+    prefix = content[:position]
+    if _REPORTED_SPEECH.search(prefix):
+        return True
+    if any(prefix.rfind(left) > prefix.rfind(right) for left, right in _QUOTE_PAIRS):
+        return True
+    # 英文引号不分左右，按个数的奇偶判断
+    return prefix.count('"') % 2 == 1 or prefix.count("'") % 2 == 1
+
+
+def build_speech_index(history: List[Dict[str, Any]], index: Optional[SpeechIndex] = None) -> SpeechIndex:
+    """
+    构建（或增量更新）发言要点索引
+
+    Args:
+        history: 历史消息
+        index: 已有索引（可选）
+
+    Returns:
+        更新后的索引
+    """
+    index = index or SpeechIndex()
+    index.update(history)
+    return index
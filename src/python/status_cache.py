@@ -0,0 +1,62 @@
+"""
+状态内存复用
+
+每次轮询解析出的状态都是一份全新的对象树，长局里历史消息越来越多。这里在接收新状态时：
+- 历史前缀与上一次相同（按消息 id 校验）时直接复用上一次的消息对象，新解析出的副本立即释放
+- 玩家名、阶段、角色、消息类型等取值有限的字符串用 sys.intern 驻留，多座位宿主里各 Agent 共享同一份
+
+消息正文等不重复的长字符串不驻留。
+"""
+import sys
+from typing import Any, Dict, Optional
+
+# 顶层需要驻留的字段
+_STATUS_FIELDS = ("gameId", "status", "phase", "myRole")
+_PLAYER_FIELDS = ("name", "role")
+_MESSAGE_FIELDS = ("phase",)
+
+
+def _intern_fields(obj: Dict[str, Any], fields):
+    for field in fields:
+        value = obj.get(field)
+        if type(value) is str:
+            obj[field] = sys.intern(value)
+
+
+def _intern_message(msg: Dict[str, Any]):
+    _intern_fields(msg, _MESSAGE_FIELDS)
+    metadata = msg.get("metadata")
+    if isinstance(metadata, dict):
+        _intern_fields(metadata, ("metatype",))
+
+
+def share_status(previous: Optional[Dict[str, Any]], current: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    让新状态尽量复用上一次状态的对象，并驻留取值有限的字符串
+
+    Args:
+        previous: 上一次的状态（可为 None），不会被修改
+        current: 新解析的状态，会被原地修改
+
+    Returns:
+        current
+    """
+    _intern_fields(current, _STATUS_FIELDS)
+    for player in current.get("players") or []:
+        if isinstance(player, dict):
+            _intern_fields(player, _PLAYER_FIELDS)
+
+    history = current.get("history")
+    if not isinstance(history, list):
+        return current
+    old_history = (previous or {}).get("history") or []
+    known = len(old_history)
+    # 历史只追加；前缀一致时复用旧消息对象，否则全部当作新消息
+    if known and known <= len(history) and history[known - 1].get("id") == old_history[-1].get("id"):
+        history[:known] = old_history
+    else:
+        known = 0
+    for msg in history[known:]:
+        if isinstance(msg, dict):
+            _intern_message(msg)
+    return current
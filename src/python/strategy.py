@@ -4,15 +4,38 @@
 根据不同的角色和阶段做出决策
 """
 import json
-import re
-from typing import Dict, Any, Optional
+import threading
+from typing import Callable, Dict, Any, Optional, Tuple, Union
 
 try:
-    from .llm_client import LLMClient
-    from .context_builder import build_llm_messages
+    from .llm_client import LLMClient, LLMCancelledError, LLMRequestShed
+    from .llm_scheduler import Priority
+    from .prompt_templates import GamePromptBuilder
+    from .model_router import ModelRouter
+    from .generation_settings import get_generation_settings
+    from .action_parser import parse_action
+    from .action_validator import validate_action, correct_action, build_correction_prompt
+    from .fallback_strategy import decide_fallback_action
+    from .speech_index import SpeechIndex
+    from .role_solver import RoleSolver
+    from .game_view import GameView, ActionContextView, as_view
 except ImportError:
-    from llm_client import LLMClient
-    from context_builder import build_llm_messages
+    from llm_client import LLMClient, LLMCancelledError, LLMRequestShed
+    from llm_scheduler import Priority
+    from prompt_templates import GamePromptBuilder
+    from model_router import ModelRouter
+    from generation_settings import get_generation_settings
+    from action_parser import parse_action
+    from action_validator import validate_action, correct_action, build_correction_prompt
+    from fallback_strategy import decide_fallback_action
+    from speech_index import SpeechIndex
+    from role_solver import RoleSolver
+    from game_view import GameView, ActionContextView, as_view
+
+# 剩余时间不少于该秒数时，非法行动会带着错误信息重新询问 LLM 一次，否则直接本地修正
+REPROMPT_MIN_SECONDS = 6
+# 剩余时间不超过该秒数时，LLM 请求以 CRITICAL 优先级调度
+CRITICAL_SECONDS = 8
 
 
 class GameStrategy:
@@ -30,6 +53,13 @@ class GameStrategy:
                 - apiKey: LLM API Key
                 - modelName: LLM 模型名称
                 - apiUrl: LLM API 地址
+                - rateLimit: LLM API 每秒请求数上限（可选）
+                - maxConcurrency: LLM API 并发上限（可选）
+                - jsonMode: 服务端是否支持 JSON 模式（可选）
+                - modelProfiles: 多模型配置（可选），profile 名 -> {"modelName", "apiUrl", "apiKey", "jsonMode"}
+                - modelRoutes: 路由表（可选），actionType 或 (actionType, phase) -> profile 名
+                - opponentStore: 对手画像库 OpponentStore（可选）
+                - winRule: 身份推算使用的胜负规则（可选），见 role_solver.WIN_RULES
         """
         config = config or {}
         self.player_index = config.get("playerIndex")
@@ -39,6 +69,18 @@ class GameStrategy:
         self.model_name = config.get("modelName")
         self.api_url = config.get("apiUrl")
 
+        # 对手画像库（可选）：回合内按名字查询
+        self.opponent_store = config.get("opponentStore")
+
+        # 发言要点索引：提示词摘要和兜底策略共用，每条发言只解析一次
+        self.speech_index = SpeechIndex()
+
+        # 身份推算：提示词摘要和兜底策略共用，按历史增量更新
+        self.role_solver = RoleSolver(config.get("winRule"))
+
+        # 提示词构建器：每局编译一次静态部分
+        self.prompt_builder = GamePromptBuilder(self.task, self.opponent_store, self.speech_index, self.role_solver)
+
         # 如果配置了 API Key，创建 LLM 客户端
         if self.api_key:
             self.llm_client = LLMClient(
@@ -46,6 +88,9 @@ class GameStrategy:
                     "apiKey": self.api_key,
                     "modelName": self.model_name,
                     "apiUrl": self.api_url,
+                    "rateLimit": config.get("rateLimit"),
+                    "maxConcurrency": config.get("maxConcurrency"),
+                    "jsonMode": config.get("jsonMode"),
                 }
             )
             print(f"[策略] LLM 客户端已初始化: {self.model_name}")
@@ -53,42 +98,73 @@ class GameStrategy:
             print("[策略] ⚠ 未配置 LLM_API_KEY，将使用随机策略")
             self.llm_client = None
 
-    async def decide_action(self, game_status: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # 按行动类型路由到不同模型（modelProfiles 中至少有两个不同的模型时生效，都相同时路由没有意义）
+        self.llm_clients: Dict[str, LLMClient] = {}
+        profiles = {name: p for name, p in (config.get("modelProfiles") or {}).items() if p.get("apiKey")}
+        if len({(p.get("modelName"), p.get("apiUrl")) for p in profiles.values()}) > 1:
+            for name, profile in profiles.items():
+                self.llm_clients[name] = LLMClient(
+                    dict(profile, rateLimit=config.get("rateLimit"), maxConcurrency=config.get("maxConcurrency"))
+                )
+        elif profiles:
+            print("[策略] 各模型配置指向同一个模型，不启用模型路由")
+        self.router = ModelRouter(self.llm_clients, config.get("modelRoutes")) if self.llm_clients else None
+        if self.router:
+            print(f"[策略] 模型路由已启用: {', '.join(f'{k}={v.model_name}' for k, v in self.llm_clients.items())}")
+
+    async def decide_action(
+        self, game_status: Union[GameView, Dict[str, Any]], cancel_event: Optional[threading.Event] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         根据游戏状态决定行动
 
         Args:
-            game_status: 游戏状态
+            game_status: 游戏状态（GameView 或原始字典）
+            cancel_event: 回合取消事件（可选），回合过期时正在进行的 LLM 请求会被取消
 
         Returns:
             行动数据，如果不需要行动返回 None
         """
-        my_turn = game_status.get("myTurn", {})
+        view = as_view(game_status)
 
-        if not my_turn.get("canAct"):
+        if not view.turn.can_act:
             return None
 
-        action_type = my_turn.get("actionType")
-        action_context = my_turn.get("actionContext", {})
+        action_context = view.turn.context
 
-        print(f"[策略] 角色: {self.player_role}, 行动类型: {action_type}")
+        print(f"[策略] 角色: {self.player_role}, 行动类型: {view.turn.action_type}")
+
+        if not self.llm_client and not self.router:
+            return self.decide_fallback(view, action_context)
 
         try:
-            return self.decide_with_llm(game_status, action_context)
-        except Exception as error:
-            print(f"[策略] LLM 决策失败: {str(error)}")
-            # 这里可以进行一定的兜底逻辑，比如随机策略等
+            return self.decide_with_llm(view, action_context, cancel_event)
+        except LLMCancelledError:
+            print("[策略] 回合已过期，放弃本次决策")
             return None
+        except Exception as error:
+            print(f"[策略] LLM 决策失败: {str(error)}，使用兜底策略")
+            return self.decide_fallback(view, action_context)
+
+    def decide_fallback(self, view: GameView, action_context: ActionContextView) -> Dict[str, Any]:
+        """更新发言索引和身份推算后使用兜底策略"""
+        self.speech_index.update(view.history)
+        self.role_solver.update(view)
+        return decide_fallback_action(view, action_context, self.task, self.speech_index, self.role_solver)
 
     def decide_with_llm(
-        self, game_status: Dict[str, Any], action_context: Dict[str, Any]
+        self,
+        game_status: GameView,
+        action_context: ActionContextView,
+        cancel_event: Optional[threading.Event] = None,
     ) -> Dict[str, Any]:
         """
         使用 LLM 进行决策
 
         Args:
-            game_status: 游戏状态
-            action_context: 行动上下文
+            game_status: 游戏状态视图
+            action_context: 行动上下文视图
+            cancel_event: 回合取消事件（可选）
 
         Returns:
             行动数据
@@ -96,57 +172,111 @@ class GameStrategy:
         print("[策略] 🤖 使用 LLM 进行决策...")
 
         # 构建 LLM 消息
-        messages = build_llm_messages(game_status, action_context, self.task)
+        messages = self.prompt_builder.build_messages(game_status, action_context)
 
         # 调用 LLM
-        response = self.llm_client.chat(messages)
+        llm_client = self.select_llm_client(game_status, action_context)
+        priority = self.get_priority(action_context)
+        generation = get_generation_settings(action_context.action_type)
+        response = llm_client.chat(messages, cancel_event, priority, generation)
 
         # 解析 LLM 响应
-        action = self.parse_llm_response(response, action_context.get("actionType"))
+        truncated = generation.get("finishReason") == "length"
+        action = self.parse_llm_response(response, action_context.action_type, truncated)
 
         if not action:
             raise Exception("无法解析 LLM 响应")
 
+        # 提交前本地校验：时间充裕时带着错误信息重问一次，否则直接修正
+        errors = validate_action(action, action_context)
+        seconds_left = action_context.seconds_left()
+        if errors and (seconds_left is None or seconds_left >= REPROMPT_MIN_SECONDS):
+            print(f"[策略] ⚠ LLM 行动不合法，定向重试: {'; '.join(errors)}")
+            messages = messages + [
+                {"role": "assistant", "content": response},
+                {"role": "user", "content": build_correction_prompt(errors, action_context)},
+            ]
+            # 重问是可以放弃的额外请求：按 SPECULATIVE 调度，被关键请求挤掉时修正原行动
+            retry = None
+            try:
+                retry = self.parse_llm_response(
+                    self.select_llm_client(game_status, action_context).chat(
+                        messages, cancel_event, Priority.SPECULATIVE, generation
+                    ),
+                    action_context.action_type,
+                    generation.get("finishReason") == "length",
+                )
+            except LLMRequestShed:
+                print("[策略] 重问请求被关键请求挤掉，修正原行动")
+            if retry:
+                action = retry
+        action = correct_action(action, game_status, action_context, self.task, self.speech_index, self.role_solver)
+
         print(f"[策略] ✓ LLM 决策完成: {json.dumps(action, ensure_ascii=False, indent=2)}")
         return action
 
-    def parse_llm_response(self, response: str, expected_action_type: str) -> Optional[Dict[str, Any]]:
+    def wrap_llm_clients(self, wrap: Callable[[Any], Any]):
+        """
+        用 wrap(client) 包装所有 LLM 客户端（轨迹记录等）
+
+        Args:
+            wrap: 接收原客户端、返回兼容 chat 接口的新客户端
+        """
+        if self.llm_client:
+            self.llm_client = wrap(self.llm_client)
+        self.llm_clients = {name: wrap(client) for name, client in self.llm_clients.items()}
+        if self.router:
+            self.router.profiles = self.llm_clients
+
+    def release(self):
+        """释放本局的提示词缓存、发言索引和身份推算（游戏结束后调用）"""
+        self.prompt_builder.release()
+        self.speech_index.reset()
+        self.role_solver.reset()
+
+    def get_checkpoint_state(self) -> Tuple[Dict[str, Any], str]:
+        """需要写入检查点的策略状态和（只追加增长的）已渲染历史"""
+        builder_state, history_text = self.prompt_builder.get_checkpoint_state()
+        return {"promptBuilder": builder_state}, history_text
+
+    def restore_checkpoint_state(self, state: Dict[str, Any], history_text: Optional[str] = None):
+        """从检查点恢复策略状态"""
+        self.prompt_builder.restore_checkpoint_state(state.get("promptBuilder") or {}, history_text)
+
+    def select_llm_client(self, game_status: GameView, action_context: ActionContextView):
+        """按路由表为本次行动选择 LLM 客户端，未启用路由时使用默认客户端"""
+        if not self.router:
+            return self.llm_client
+        profile = self.router.route(action_context.action_type, game_status.phase_text, action_context.seconds_left())
+        llm_client = self.llm_clients[profile]
+        print(f"[策略] 模型路由: {action_context.action_type} -> {profile} ({llm_client.model_name})")
+        return llm_client
+
+    def get_priority(self, action_context: ActionContextView) -> Priority:
+        """根据剩余时间决定 LLM 请求的调度优先级（没有截止时间时为 NORMAL）"""
+        seconds_left = action_context.seconds_left()
+        if seconds_left is not None and seconds_left <= CRITICAL_SECONDS:
+            return Priority.CRITICAL
+        return Priority.NORMAL
+
+    def parse_llm_response(
+        self, response: str, expected_action_type: str, truncated: bool = False
+    ) -> Optional[Dict[str, Any]]:
         """
         解析 LLM 响应
 
         Args:
             response: LLM 响应文本
             expected_action_type: 期望的行动类型
+            truncated: 响应是否因 max_tokens 被截断
 
         Returns:
             解析后的行动对象
         """
         try:
-            # 尝试提取 JSON
-            json_str = response.strip()
-
-            # 如果响应包含代码块，提取 JSON
-            json_match = re.search(r"```(?:json)?\s*(\{[\s\S]*?\})\s*```", json_str)
-            if json_match:
-                json_str = json_match.group(1)
-            else:
-                # 尝试直接查找 JSON 对象
-                json_obj_match = re.search(r"\{[\s\S]*\}", json_str)
-                if json_obj_match:
-                    json_str = json_obj_match.group(0)
-
-            parsed = json.loads(json_str)
-
-            # 验证 actionType
-            if parsed.get("actionType") != expected_action_type:
-                print(
-                    f"[策略] ⚠ LLM 返回的 actionType ({parsed.get('actionType')}) 与期望的 ({expected_action_type}) 不匹配，使用期望的类型"
-                )
-                parsed["actionType"] = expected_action_type
-
-            return parsed
+            # 单遍提取 JSON 对象，必要时修复，并按 actionType 的 schema 校验
+            return parse_action(response, expected_action_type, truncated)
         except Exception as error:
             print(f"[策略] ❌ 解析 LLM 响应失败: {str(error)}")
             print(f"[策略] 原始响应: {response[:500]}")
             return None
-
@@ -0,0 +1,164 @@
+"""
+自对弈锦标赛
+
+用进程池并行跑大量 SimulatedGame，统计各策略分阵营的胜率（附 95% Wilson 置信区间）。
+每局每个座位从参赛策略中随机抽取一个，种子固定时结果可复现。
+
+可用策略:
+    fallback  GameStrategy，不配置 LLM（规则兜底策略）
+    stub      GameStrategy + StubLLMClient（随机合法行动）
+    cached    GameStrategy + CachedLLMClient(真实 LLM)，需要 DEEPSEEK_KEY，响应缓存在 --cache 指定的文件
+
+用法:
+    python tournament.py --games 2000 --workers 8 --strategies fallback,stub
+"""
+import argparse
+import contextlib
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from llm_stubs import CachedLLMClient, StubLLMClient
+from simulator import SimulatedGame
+from strategy import GameStrategy
+
+DEFAULT_MODEL = "deepseek-v3"
+DEFAULT_API_URL = "https://ep-llm-test.zhenguanyu.com/gateway-cn-test/openai-compatible/v1/chat/completions"
+
+
+def make_strategy(name: str, index: int, role: str, seed: int, cache_path: Optional[str] = None) -> GameStrategy:
+    """
+    按名字创建策略实例
+
+    Args:
+        name: 策略名
+        index: 玩家编号
+        role: 角色
+        seed: 随机种子
+        cache_path: cached 策略使用的缓存文件
+
+    Returns:
+        GameStrategy 实例
+    """
+    # 模拟器按屠边规则判定胜负，身份推算可以使用这条规则
+    strategy = GameStrategy({"playerIndex": index, "playerRole": role, "winRule": "side"})
+    if name == "stub":
+        strategy.llm_client = StubLLMClient(seed)
+    elif name == "cached":
+        from llm_client import LLMClient
+
+        client = LLMClient(
+            {"apiKey": os.getenv("DEEPSEEK_KEY"), "modelName": DEFAULT_MODEL, "apiUrl": DEFAULT_API_URL}
+        )
+        strategy.llm_client = CachedLLMClient(client, cache_path or "llm_cache.sqlite3")
+    elif name != "fallback":
+        raise ValueError(f"未知策略: {name}")
+    return strategy
+
+
+def play_batch(args: Tuple[List[str], List[int], Optional[str]]) -> List[Dict[str, Any]]:
+    """
+    在一个工作进程中顺序跑一批对局
+
+    Args:
+        args: (参赛策略名列表, 种子列表, 缓存路径)
+
+    Returns:
+        每局结果，seats 记录每个座位使用的策略
+    """
+    names, seeds, cache_path = args
+    results = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for seed in seeds:
+            rng = random.Random(seed)
+            seats = {i: rng.choice(names) for i in range(1, 7)}
+            game = SimulatedGame(
+                lambda index, role: make_strategy(seats[index], index, role, seed * 10 + index, cache_path),
+                seed=seed,
+                game_id=f"sim-{seed}",
+            )
+            result = game.run()
+            result["seats"] = seats
+            results.append(result)
+    return results
+
+
+def wilson_interval(wins: int, total: int, z: float = 1.96) -> Tuple[float, float]:
+    """胜率的 Wilson 置信区间"""
+    if total == 0:
+        return 0.0, 0.0
+    p = wins / total
+    denom = 1 + z * z / total
+    center = (p + z * z / (2 * total)) / denom
+    margin = z * math.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / denom
+    return center - margin, center + margin
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[Tuple[str, str], Tuple[int, int]]:
+    """按 (策略, 阵营) 统计 (胜场, 座位数)"""
+    stats: Dict[Tuple[str, str], List[int]] = {}
+    for result in results:
+        for index, name in result["seats"].items():
+            side = "werewolf" if result["roles"][index] == "WEREWOLF" else "villager"
+            entry = stats.setdefault((name, side), [0, 0])
+            entry[1] += 1
+            if result["winner"] == side:
+                entry[0] += 1
+    return {key: (wins, total) for key, (wins, total) in stats.items()}
+
+
+def run_tournament(
+    names: List[str], games: int, workers: int, seed: int = 0, cache_path: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    并行跑锦标赛
+
+    Args:
+        names: 参赛策略名
+        games: 对局数
+        workers: 进程数
+        seed: 起始种子
+        cache_path: cached 策略的缓存文件
+
+    Returns:
+        所有对局结果
+    """
+    seeds = list(range(seed, seed + games))
+    batch_size = max(1, math.ceil(games / (workers * 4)))
+    batches = [(names, seeds[i : i + batch_size], cache_path) for i in range(0, games, batch_size)]
+    results: List[Dict[str, Any]] = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for batch in executor.map(play_batch, batches):
+            results.extend(batch)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="狼人杀自对弈锦标赛")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--strategies", default="fallback,stub")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache", default=None, help="cached 策略的 SQLite 缓存文件")
+    args = parser.parse_args()
+
+    names = args.strategies.split(",")
+    start = time.time()
+    results = run_tournament(names, args.games, args.workers, args.seed, args.cache)
+    elapsed = time.time() - start
+
+    winners = [r["winner"] for r in results]
+    print(f"[锦标赛] {len(results)} 局，用时 {elapsed:.1f}s（{len(results) / elapsed * 3600:.0f} 局/小时）")
+    print(
+        f"[锦标赛] 好人胜 {winners.count('villager')}，狼人胜 {winners.count('werewolf')}，平局 {winners.count('draw')}"
+    )
+    for (name, side), (wins, total) in sorted(summarize(results).items()):
+        low, high = wilson_interval(wins, total)
+        print(f"[锦标赛] {name:<10} {side:<9} 胜率 {wins / total:.3f}  95% CI [{low:.3f}, {high:.3f}]  ({total} 座次)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+会话轨迹记录
+
+把一局中 Agent 的输入输出写入 gzip 压缩、只追加的 JSONL 轨迹文件，用于复现线上延迟尖刺和错误决策：
+- status: 每次 /status 响应，只记录相对上一次的变化（顶层字段差异 + 新追加的历史消息）
+- llm:    每次 LLM 请求的消息、响应、耗时、行动类型和错误
+- action: 每次提交的行动及服务器响应（或错误）
+- ready:  准备信号
+
+每条记录都带 wall（时间戳）和 t（相对记录开始的秒数）。每条记录后做一次 zlib 同步刷新，
+进程崩溃时已写入的记录仍然可读。回放见 replay.py。
+"""
+import gzip
+import json
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    from .llm_scheduler import Priority
+except ImportError:
+    from llm_scheduler import Priority
+
+TRACE_VERSION = 1
+
+
+def status_delta(previous: Optional[Dict[str, Any]], current: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    计算两次状态之间的变化
+
+    Args:
+        previous: 上一次的状态（None 表示第一次）
+        current: 本次状态
+
+    Returns:
+        {"full": 状态} 或 {"set": 变化的顶层字段, "unset": 删除的字段, "historyAppend": 新增历史}
+    """
+    if previous is None:
+        return {"full": current}
+    old_history = previous.get("history") or []
+    new_history = current.get("history") or []
+    # 历史只追加；前缀不一致时（极少见）直接记录完整状态
+    if len(new_history) < len(old_history) or (
+        old_history and new_history[len(old_history) - 1].get("id") != old_history[-1].get("id")
+    ):
+        return {"full": current}
+    delta: Dict[str, Any] = {}
+    changed = {k: v for k, v in current.items() if k != "history" and previous.get(k) != v}
+    removed = [k for k in previous if k not in current]
+    if changed:
+        delta["set"] = changed
+    if removed:
+        delta["unset"] = removed
+    if len(new_history) > len(old_history):
+        delta["historyAppend"] = new_history[len(old_history) :]
+    return delta
+
+
+def apply_status_delta(previous: Optional[Dict[str, Any]], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    把 status_delta 的结果应用到上一次的状态上
+
+    Args:
+        previous: 上一次的状态
+        delta: 状态变化
+
+    Returns:
+        本次的完整状态（新对象，不修改 previous）
+    """
+    if "full" in delta:
+        return delta["full"]
+    status = dict(previous or {})
+    for key in delta.get("unset", []):
+        status.pop(key, None)
+    status.update(delta.get("set", {}))
+    status["history"] = list((previous or {}).get("history") or []) + delta.get("historyAppend", [])
+    return status
+
+
+class TraceRecorder:
+    """gzip JSONL 轨迹写入器（线程安全）"""
+
+    def __init__(self, path: str, meta: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            path: 轨迹文件路径（追加写入，重启后继续写在同一个文件里）
+            meta: 写在开头的元信息（游戏 ID、玩家编号等）
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = gzip.open(path, "ab")
+        self.started = time.monotonic()
+        self.last_status: Optional[Dict[str, Any]] = None
+        self.record("meta", version=TRACE_VERSION, **(meta or {}))
+
+    def record(self, kind: str, **fields: Any):
+        """
+        写入一条记录
+
+        Args:
+            kind: 记录类型
+            fields: 记录内容（需可 JSON 序列化）
+        """
+        entry = {"kind": kind, "wall": time.time(), "t": round(time.monotonic() - self.started, 4)}
+        entry.update(fields)
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self.lock:
+            if self.file.closed:
+                return
+            self.file.write(line.encode("utf-8"))
+            self.file.flush(zlib.Z_SYNC_FLUSH)
+
+    def record_status(self, response: Dict[str, Any], elapsed_ms: int):
+        """
+        记录一次 /status 响应（只记录变化）
+
+        Args:
+            response: ApiClient.get_game_status 的返回值
+            elapsed_ms: 请求耗时
+        """
+        if not response.get("success"):
+            self.record("status", ms=elapsed_ms, success=False)
+            return
+        if response.get("unchanged"):
+            self.record("status", ms=elapsed_ms, unchanged=True)
+            return
+        data = response.get("data") or {}
+        with self.lock:
+            delta = status_delta(self.last_status, data)
+            self.last_status = data
+        self.record("status", ms=elapsed_ms, **delta)
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+
+
+class RecordingLLMClient:
+    """记录每次请求和响应的 LLM 客户端包装"""
+
+    def __init__(self, client: Any, recorder: TraceRecorder):
+        """
+        Args:
+            client: 被包装的客户端（需要 chat 方法）
+            recorder: 轨迹写入器
+        """
+        self.client = client
+        self.recorder = recorder
+        self.model_name = getattr(client, "model_name", None)
+
+    def chat(
+        self,
+        messages: List[Dict[str, str]],
+        cancel_event: Optional[threading.Event] = None,
+        priority: Priority = Priority.NORMAL,
+        generation: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """调用被包装的客户端并记录，参数同 LLMClient.chat"""
+        start = time.time()
+        fields = {
+            "model": self.model_name,
+            "priority": priority.name,
+            "actionType": (generation or {}).get("actionType"),
+            "messages": messages,
+        }
+        try:
+            response = self.client.chat(messages, cancel_event, priority, generation)
+        except Exception as error:
+            fields["error"] = f"{type(error).__name__}: {error}"
+            fields["ms"] = int((time.time() - start) * 1000)
+            self.recorder.record("llm", **fields)
+            raise
+        fields["response"] = response
+        if generation and generation.get("finishReason"):
+            fields["finishReason"] = generation["finishReason"]
+        fields["ms"] = int((time.time() - start) * 1000)
+        self.recorder.record("llm", **fields)
+        return response
+
+
+def read_trace(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    逐条读取轨迹；末尾被截断的记录（写入时崩溃）会被忽略
+
+    Args:
+        path: 轨迹文件路径
+
+    Yields:
+        记录字典
+    """
+    with gzip.open(path, "rb") as f:
+        try:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    return
+        except (EOFError, OSError, zlib.error):
+            return
@@ -0,0 +1,110 @@
+"""
+回合状态机
+
+每个回合（turn key = day-phase-actionType）依次经历:
+    IDLE -> DECIDING -> SUBMITTING -> DONE
+任意进行中的回合在轮询发现阶段已切换时转为 EXPIRED，并通过 cancel_event 通知正在进行的 LLM 请求取消。
+决策失败（未提交成功）的回合回到 IDLE，下次轮询可以重试。
+
+轮询线程（Timer）和决策线程都会访问状态，所有转换都在锁内完成。
+"""
+import threading
+from enum import Enum
+from typing import Optional
+
+
+class TurnState(str, Enum):
+    """回合状态"""
+
+    IDLE = "idle"
+    DECIDING = "deciding"
+    SUBMITTING = "submitting"
+    DONE = "done"
+    EXPIRED = "expired"
+
+
+ACTIVE_STATES = (TurnState.DECIDING, TurnState.SUBMITTING)
+
+
+class TurnTracker:
+    """跟踪当前回合的状态，并负责取消过期回合"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.turn_key: Optional[str] = None
+        self.state = TurnState.IDLE
+        self.cancel_event: Optional[threading.Event] = None
+
+    @property
+    def is_active(self) -> bool:
+        """是否有回合正在决策或提交"""
+        return self.state in ACTIVE_STATES
+
+    def begin(self, turn_key: str) -> Optional[threading.Event]:
+        """
+        开始决策一个回合
+
+        Args:
+            turn_key: 回合标识
+
+        Returns:
+            本回合的取消事件；该回合已在进行或已完成时返回 None
+        """
+        with self.lock:
+            if self.turn_key == turn_key and (self.is_active or self.state == TurnState.DONE):
+                return None
+            if self.turn_key != turn_key and self.is_active:
+                self._expire()
+            self.turn_key = turn_key
+            self.state = TurnState.DECIDING
+            self.cancel_event = threading.Event()
+            return self.cancel_event
+
+    def mark_submitting(self, turn_key: str) -> bool:
+        """
+        决策完成、准备提交
+
+        Returns:
+            回合仍然有效返回 True；已过期返回 False（不应再提交）
+        """
+        with self.lock:
+            if self.turn_key != turn_key or self.state != TurnState.DECIDING:
+                return False
+            self.state = TurnState.SUBMITTING
+            return True
+
+    def finish(self, turn_key: str, done: bool):
+        """
+        回合处理结束
+
+        Args:
+            turn_key: 回合标识
+            done: 是否已成功提交（或服务器确认已提交过）
+        """
+        with self.lock:
+            if self.turn_key != turn_key or self.state == TurnState.EXPIRED:
+                return
+            self.state = TurnState.DONE if done else TurnState.IDLE
+
+    def expire_stale(self, current_turn_key: Optional[str]) -> Optional[str]:
+        """
+        根据最新轮询结果让过期回合失效
+
+        Args:
+            current_turn_key: 当前可行动回合的标识，不能行动时为 None
+
+        Returns:
+            被取消的回合标识，没有取消时返回 None
+        """
+        with self.lock:
+            # 已经在提交中的请求无法撤回，只取消仍在决策的回合
+            if self.state != TurnState.DECIDING or self.turn_key == current_turn_key:
+                return None
+            expired_key = self.turn_key
+            self._expire()
+            return expired_key
+
+    def _expire(self):
+        self.state = TurnState.EXPIRED
+        if self.cancel_event:
+            self.cancel_event.set()